@@ -0,0 +1,277 @@
+# /// script
+# requires-python = ">=3.12"
+# dependencies = []
+# ///
+
+"""
+Release cadence and booking-horizon reports from the poll history.
+
+Answers questions the latest date alone can't: at what time of day (and
+on which weekdays) each venue releases new dates, how far ahead a date
+is when it first appears, how far ahead the listing reaches on each
+weekday, and how often anything changes.
+
+Every figure is computed by SQLite over the whole history in a single
+grouped pass: timestamps are bucketed, converted to local days and
+aggregated by the query engine, and Python only sees the aggregates (a
+few rows per venue and bucket). Reports over millions of polls take
+about as long as SQLite takes to scan them once, and memory does not
+grow with the history.
+
+A release is a poll in which at least one date was seen for the first
+time, after the first full listing of the pair (which is a baseline, not
+a release). Times are as seen by the poller, so they are only as precise
+as the poll interval.
+
+    python3 analytics.py
+    python3 analytics.py --db history.sqlite3 --bucket-minutes 15 --json report.json
+"""
+
+import argparse
+import json
+import time
+from pathlib import Path
+
+from history_store import DEFAULT_DB_PATH, HistoryStore
+from scheduler import MINUTES_PER_DAY
+
+
+WEEKDAYS = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+
+# SQLite's %w counts from Sunday; this maps it onto WEEKDAYS
+_SQLITE_WEEKDAY = "(CAST(strftime('%w', {}) AS INTEGER) + 6) % 7"
+
+# The first listing of a pair is its baseline: every date in it has the
+# pair's earliest first_seen. Everything after is read from observed_dates
+# (one row per date), never from the much larger polls table.
+_NEW_DATES = """
+WITH baseline AS (
+    SELECT venue, category, MIN(first_seen) AS started
+    FROM observed_dates GROUP BY venue, category
+), new_dates AS (
+    SELECT o.venue, o.category, o.raw, o.first_seen
+    FROM observed_dates o JOIN baseline b USING (venue, category)
+    WHERE o.first_seen > b.started
+)"""
+
+_RELEASES = _NEW_DATES + """, releases AS (
+    SELECT DISTINCT venue, category, first_seen AS at FROM new_dates
+)
+"""
+
+_LOCAL = "{}, 'unixepoch', 'localtime'"
+
+RELEASE_BUCKETS = _RELEASES + """
+SELECT venue, category,
+       (CAST(strftime('%H', at, 'unixepoch', 'localtime') AS INTEGER) * 60
+        + CAST(strftime('%M', at, 'unixepoch', 'localtime') AS INTEGER)) / :bucket AS bucket,
+       COUNT(*)
+FROM releases GROUP BY venue, category, bucket
+"""
+
+RELEASE_WEEKDAYS = _RELEASES + f"""
+SELECT venue, category, {_SQLITE_WEEKDAY.format(_LOCAL.format("at"))} AS weekday, COUNT(*)
+FROM releases GROUP BY venue, category, weekday
+"""
+
+LEAD_DAYS = _NEW_DATES + """
+SELECT venue, category,
+       CAST(julianday(raw) - julianday(date(first_seen, 'unixepoch', 'localtime'))
+            AS INTEGER) AS lead,
+       COUNT(*)
+FROM new_dates GROUP BY venue, category, lead
+"""
+
+# The one pass over polls: counts and the furthest listed date per pair
+# and hour, with plain arithmetic only. Every poll figure is read from this
+# summary, and the (slow) local-time conversion runs once per hour.
+POLL_HOURS = """
+CREATE TEMP TABLE poll_hours AS
+SELECT venue, category, CAST(polled_at / 3600 AS INTEGER) AS hour, COUNT(*) AS polls,
+       SUM(status = 'ok') AS ok, SUM(status = 'unchanged') AS unchanged,
+       SUM(status = 'error') AS errors, MIN(polled_at) AS first, MAX(polled_at) AS last,
+       MAX(CASE WHEN status = 'ok' THEN latest_date END) AS latest
+FROM polls WHERE status != 'imported' GROUP BY venue, category, hour
+"""
+
+POLL_COUNTS = """
+SELECT venue, category, SUM(polls), SUM(ok), SUM(unchanged), SUM(errors), MIN(first), MAX(last)
+FROM poll_hours GROUP BY venue, category
+"""
+
+# Furthest date listed on each local day, then averaged per weekday
+HORIZONS = f"""
+WITH daily AS (
+    SELECT venue, category, date(hour * 3600, 'unixepoch', 'localtime') AS day,
+           MAX(latest) AS latest
+    FROM poll_hours WHERE latest IS NOT NULL GROUP BY venue, category, day
+)
+SELECT venue, category, {_SQLITE_WEEKDAY.format("day")} AS weekday, COUNT(*),
+       MIN(horizon), AVG(horizon), MAX(horizon)
+FROM (SELECT venue, category, day,
+             CAST(julianday(latest) - julianday(day) AS INTEGER) AS horizon FROM daily)
+GROUP BY venue, category, weekday
+"""
+
+# Releases that moved the latest listed date further out
+LATEST_CHANGES = """
+WITH listed AS (
+    SELECT venue, category, first_seen, MAX(raw) AS furthest
+    FROM observed_dates GROUP BY venue, category, first_seen
+)
+SELECT venue, category, COUNT(*)
+FROM (SELECT venue, category, furthest,
+             MAX(furthest) OVER (PARTITION BY venue, category ORDER BY first_seen
+                                 ROWS BETWEEN UNBOUNDED PRECEDING AND 1 PRECEDING) AS before
+      FROM listed)
+WHERE before IS NOT NULL AND furthest > before
+GROUP BY venue, category
+"""
+
+
+def histogram_median(histogram: dict[int, int]) -> int | None:
+    """Median of the values a {value: count} histogram describes."""
+    total = sum(histogram.values())
+    seen = 0
+    for value in sorted(histogram):
+        seen += histogram[value]
+        if seen * 2 >= total:
+            return value
+    return None
+
+
+def bucket_label(bucket: int, bucket_minutes: int) -> str:
+    minutes = bucket * bucket_minutes
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def build_report(store: HistoryStore, bucket_minutes: int = 60) -> dict:
+    """Every pair's cadence, lead time and horizon figures, from grouped queries."""
+    if MINUTES_PER_DAY % bucket_minutes:
+        raise ValueError(f"Bucket size must divide a day: {bucket_minutes} minutes")
+    conn = store.conn
+    conn.execute("DROP TABLE IF EXISTS temp.poll_hours")
+    conn.execute(POLL_HOURS)
+    try:
+        return _report(conn, bucket_minutes)
+    finally:
+        conn.execute("DROP TABLE temp.poll_hours")
+
+
+def _report(conn, bucket_minutes: int) -> dict:
+    pairs: dict[tuple[str, str], dict] = {}
+    
+    for venue, category, polls, ok, unchanged, errors, first, last in conn.execute(POLL_COUNTS):
+        days = max((last - first) / 86400, 1 / 24)
+        pairs[(venue, category)] = {
+            "venue": venue, "category": category,
+            "first_poll": first, "last_poll": last, "days": round(days, 2),
+            "polls": polls, "ok": ok, "unchanged": unchanged, "errors": errors,
+            "releases": 0, "releases_per_day": 0.0, "latest_changes": 0,
+            "release_times": {}, "release_weekdays": {}, "lead_days": {}, "horizon": {},
+        }
+    
+    for venue, category, bucket, count in conn.execute(RELEASE_BUCKETS, {"bucket": bucket_minutes}):
+        pair = pairs[(venue, category)]
+        pair["release_times"][bucket_label(bucket, bucket_minutes)] = count
+        pair["releases"] += count
+    for pair in pairs.values():
+        pair["releases_per_day"] = round(pair["releases"] / pair["days"], 3)
+    
+    for venue, category, weekday, count in conn.execute(RELEASE_WEEKDAYS):
+        pairs[(venue, category)]["release_weekdays"][WEEKDAYS[weekday]] = count
+    
+    leads: dict[tuple[str, str], dict[int, int]] = {}
+    for venue, category, lead, count in conn.execute(LEAD_DAYS):
+        leads.setdefault((venue, category), {})[lead] = count
+    for key, histogram in leads.items():
+        pairs[key]["lead_days"] = {"min": min(histogram), "median": histogram_median(histogram),
+                                   "max": max(histogram), "histogram": histogram}
+    
+    for venue, category, weekday, days, low, mean, high in conn.execute(HORIZONS):
+        horizon = pairs[(venue, category)]["horizon"]
+        horizon.setdefault("by_weekday", {})[WEEKDAYS[weekday]] = round(mean, 2)
+        horizon["min"] = min(horizon.get("min", low), low)
+        horizon["max"] = max(horizon.get("max", high), high)
+        horizon["_days"] = horizon.get("_days", 0) + days
+        horizon["_sum"] = horizon.get("_sum", 0) + mean * days
+    for pair in pairs.values():
+        horizon = pair["horizon"]
+        if horizon:
+            horizon["mean"] = round(horizon.pop("_sum") / horizon.pop("_days"), 2)
+            horizon["by_weekday"] = {day: horizon["by_weekday"][day]
+                                     for day in WEEKDAYS if day in horizon["by_weekday"]}
+    
+    for venue, category, count in conn.execute(LATEST_CHANGES):
+        pairs[(venue, category)]["latest_changes"] = count
+    
+    return {"generated_at": time.time(), "bucket_minutes": bucket_minutes,
+            "pairs": list(pairs.values())}
+
+
+def describe_report(report: dict, width: int = 30) -> list[str]:
+    """The report as text, one block per pair."""
+    lines = []
+    for pair in report["pairs"]:
+        error_share = pair["errors"] / pair["polls"] if pair["polls"] else 0
+        lines.append(f"{pair['venue']} / {pair['category']}")
+        lines.append(f"  {pair['days']:g} days, {pair['polls']} polls ({error_share:.0%} errors), "
+                     f"{pair['releases']} releases ({pair['releases_per_day']:g}/day), "
+                     f"{pair['latest_changes']} moved the latest date")
+        
+        times = pair["release_times"]
+        if times:
+            busiest = max(times.values())
+            lines.append("  Releases by time of day:")
+            for label in sorted(times):
+                bar = "#" * max(1, round(times[label] / busiest * width))
+                lines.append(f"    {label}  {bar} {times[label]}")
+            weekdays = pair["release_weekdays"]
+            lines.append("  Releases by weekday: " + "  ".join(
+                f"{day} {weekdays.get(day, 0)}" for day in WEEKDAYS))
+        
+        lead = pair["lead_days"]
+        if lead:
+            lines.append(f"  Dates first listed {lead['min']}-{lead['max']} days ahead "
+                         f"(median {lead['median']})")
+        horizon = pair["horizon"]
+        if horizon:
+            lines.append(f"  Listing reaches {horizon['mean']:g} days ahead on average "
+                         f"({horizon['min']}-{horizon['max']}); by weekday: " + "  ".join(
+                             f"{day} {mean:g}" for day, mean in horizon["by_weekday"].items()))
+        lines.append("")
+    return lines
+
+
+def main() -> None:
+    """Print the report, and optionally save it as JSON."""
+    parser = argparse.ArgumentParser(description="Release cadence and horizon report.")
+    parser.add_argument("--db", type=Path, default=DEFAULT_DB_PATH,
+                        help=f"History database (default: {DEFAULT_DB_PATH})")
+    parser.add_argument("--bucket-minutes", type=int, default=60,
+                        help="Width of the time-of-day histogram buckets (default: 60)")
+    parser.add_argument("--json", type=Path, metavar="FILE",
+                        help="Also write the report to FILE as compact JSON")
+    args = parser.parse_args()
+    
+    if not args.db.exists():
+        parser.error(f"No history database at {args.db}")
+    started = time.perf_counter()
+    with HistoryStore(args.db) as store:
+        try:
+            report = build_report(store, args.bucket_minutes)
+        except ValueError as e:
+            parser.error(str(e))
+    elapsed = time.perf_counter() - started
+    
+    for line in describe_report(report):
+        print(line)
+    polls = sum(pair["polls"] for pair in report["pairs"])
+    print(f"{len(report['pairs'])} pairs, {polls} polls analysed in {elapsed:.2f}s")
+    if args.json:
+        args.json.write_text(json.dumps(report, separators=(",", ":")), encoding="utf-8")
+        print(f"Saved to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
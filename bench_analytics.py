@@ -0,0 +1,94 @@
+# /// script
+# requires-python = ">=3.12"
+# dependencies = []
+# ///
+
+"""
+Benchmark of the history report (analytics.py) on a large poll history.
+
+Fills a scratch history database with synthetic polls: every pair is
+polled every --interval seconds for as many days as it takes to reach
+--polls in total, lists the next 14 days, and gets a new date each day
+at about 07:00. Then times build_report() over it and prints the figures
+for the first pair, which should show that cadence.
+"""
+
+import argparse
+import math
+import random
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+from analytics import build_report, describe_report
+from history_store import HistoryStore
+
+
+def fill(store: HistoryStore, pairs: int, polls: int, interval: float, seed: int = 0) -> None:
+    """Synthetic polls and observed dates, inserted in bulk."""
+    rng = random.Random(seed)
+    days = max(1, round(polls / pairs * interval / 86400))
+    first_day = date.today() - timedelta(days=days)
+    start = datetime.combine(first_day, datetime.min.time()).timestamp()
+    per_pair = polls // pairs
+    
+    with store.cycle():
+        for index in range(pairs):
+            venue = f"venue-{index:03d}"
+            releases = [start + day * 86400 + rng.gauss(7 * 3600, 1200) for day in range(days + 1)]
+            
+            def poll_rows():
+                release = 0
+                for i in range(per_pair):
+                    at = start + i * interval
+                    while release + 1 < len(releases) and releases[release + 1] <= at:
+                        release += 1
+                    latest = first_day + timedelta(days=release + 14)
+                    yield venue, "fitness-classes-c", at, "ok", latest.isoformat(), 14
+            
+            store.conn.executemany(
+                "INSERT INTO polls (venue, category, polled_at, status, latest_date, date_count)"
+                " VALUES (?, ?, ?, ?, ?, ?)", poll_rows())
+            # Day 0's date is in the first listing; later ones are first
+            # seen by the first poll after their release
+            first_seen = [start] + [start + math.ceil((released - start) / interval) * interval
+                                    for released in releases[1:]]
+            store.conn.executemany(
+                "INSERT INTO observed_dates (venue, category, raw, first_seen, last_seen, present)"
+                " VALUES (?, ?, ?, ?, ?, 1)",
+                [(venue, "fitness-classes-c", (first_day + timedelta(days=day + 14)).isoformat(),
+                  first_seen[day], start + per_pair * interval)
+                 for day in range(days + 1) if first_seen[day] < start + per_pair * interval])
+
+
+def main() -> None:
+    """Build the history, time the report and print it for one pair."""
+    parser = argparse.ArgumentParser(description="Benchmark the history report.")
+    parser.add_argument("--polls", type=int, default=1_000_000,
+                        help="Polls in total (default: 1000000)")
+    parser.add_argument("--pairs", type=int, default=20, help="Venues (default: 20)")
+    parser.add_argument("--interval", type=float, default=60,
+                        help="Seconds between each pair's polls (default: 60)")
+    args = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory() as workdir, \
+            HistoryStore(Path(workdir) / "history.sqlite3") as store:
+        started = time.perf_counter()
+        fill(store, args.pairs, args.polls, args.interval)
+        print(f"Filled {args.polls} polls for {args.pairs} pairs "
+              f"in {time.perf_counter() - started:.1f}s")
+        
+        started = time.perf_counter()
+        report = build_report(store)
+        elapsed = time.perf_counter() - started
+        report["pairs"] = report["pairs"][:1]
+        print()
+        for line in describe_report(report):
+            print(line)
+        print(f"Report over {args.polls} polls: {elapsed:.2f}s "
+              f"({args.polls / elapsed / 1e6:.1f}M polls/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+# /// script
+# requires-python = ">=3.12"
+# dependencies = []
+# ///
+
+"""
+Benchmark of the booking page extractor (html_extract.py) on large pages.
+
+Builds booking pages the way stub_server.py serves them, grown with extra
+dates and per-date padding to 1, 10 and 50 MiB, saves them to a scratch
+directory (plain and gzip-compressed, like snapshot objects) and
+measures, for each size:
+
+- streaming: extract_file() reading 64 KiB chunks; throughput and peak
+  traced memory
+- whole page: reading the file into memory and parsing it in one feed(),
+  for comparison
+- the same page from a .gz snapshot object
+
+Pass saved pages (fit.html, snapshot objects) to benchmark those instead.
+"""
+
+import argparse
+import gzip
+import tempfile
+import time
+import tracemalloc
+from datetime import date
+from pathlib import Path
+
+from html_extract import extract, extract_file
+from stub_server import StubBetterAPI, StubConfig
+
+
+def build_page(size: int) -> bytes:
+    """A stub booking page padded out to roughly size bytes."""
+    days = 60
+    pad_bytes = max(0, size // (days * 2) - 100)
+    stub = StubBetterAPI(StubConfig(days=days, pad_bytes=pad_bytes))
+    try:
+        body, _ = stub._page_payload(date.today(), 0)
+    finally:
+        stub.server.server_close()
+    return body
+
+
+def measure(parse) -> dict:
+    """Run parse() under tracemalloc; wall time, peak memory and results."""
+    tracemalloc.start()
+    started = time.perf_counter()
+    extractor = parse()
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"seconds": elapsed, "peak_kib": peak / 1024, "dates": len(extractor.dates())}
+
+
+def bench_file(path: Path) -> list[tuple[str, dict]]:
+    """Streaming, whole-page and (for plain files) .gz runs on one page."""
+    runs = [("streaming", measure(lambda: extract_file(path)))]
+    if path.suffix != ".gz":
+        runs.append(("whole page", measure(lambda: extract([path.read_bytes()]))))
+    return runs
+
+
+def main() -> None:
+    """Run the benchmark and print a table."""
+    parser = argparse.ArgumentParser(description="Benchmark the booking page extractor.")
+    parser.add_argument("pages", type=Path, nargs="*", help="Saved pages to benchmark")
+    parser.add_argument("--sizes", type=float, nargs="+", default=[1, 10, 50],
+                        help="Generated page sizes in MiB (default: 1 10 50)")
+    args = parser.parse_args()
+    
+    print("=" * 78)
+    print("HTML EXTRACTION BENCHMARK")
+    print("=" * 78)
+    print(f"{'page':<28} {'mode':<11} {'MiB':>7} {'MiB/s':>8} {'ms':>8} {'peak KiB':>9} {'dates':>6}")
+    
+    with tempfile.TemporaryDirectory() as workdir:
+        pages = list(args.pages)
+        if not pages:
+            for mib in args.sizes:
+                body = build_page(int(mib * 1024 * 1024))
+                plain = Path(workdir) / f"page-{mib:g}MiB.html"
+                plain.write_bytes(body)
+                compressed = plain.with_suffix(".html.gz")
+                compressed.write_bytes(gzip.compress(body))
+                pages.extend([plain, compressed])
+        
+        for path in pages:
+            size_mib = (len(gzip.decompress(path.read_bytes())) if path.suffix == ".gz"
+                        else path.stat().st_size) / (1024 * 1024)
+            for mode, result in bench_file(path):
+                print(f"{path.name[:28]:<28} {mode:<11} {size_mib:>7.1f} "
+                      f"{size_mib / result['seconds']:>8.1f} {result['seconds'] * 1000:>8.0f} "
+                      f"{result['peak_kib']:>9.0f} {result['dates']:>6}")
+
+
+if __name__ == "__main__":
+    main()
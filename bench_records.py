@@ -0,0 +1,91 @@
+# /// script
+# requires-python = ">=3.12"
+# dependencies = []
+# ///
+
+"""
+Benchmark of the typed record layer (records.py).
+
+Builds /dates bodies the way stub_server.py serves them, one per venue,
+and measures:
+
+- decode throughput: records/s for plain json.loads() to dicts (what
+  scrape.py used to do) against DateDecoder on each installed backend
+  (msgspec, orjson, stdlib json)
+- memory: traced bytes held per 10,000 records once decoded, as dicts
+  and as DateRecords, with every venue's body kept alive the way a
+  long-running daemon keeps the latest dates per venue
+
+Install msgspec and/or orjson to include their rows.
+"""
+
+import argparse
+import gc
+import json
+import time
+import tracemalloc
+from datetime import date
+
+from records import BACKENDS, DateDecoder
+from stub_server import StubBetterAPI, StubConfig
+
+
+def build_bodies(venues: int, days: int) -> list[bytes]:
+    """One /dates body per venue, with release-day offsets so they differ a little."""
+    stub = StubBetterAPI(StubConfig(days=days))
+    try:
+        return [stub._dates_payload(date.today(), venue % 7)[0] for venue in range(venues)]
+    finally:
+        stub.server.server_close()
+
+
+def throughput(decode, bodies: list[bytes], rounds: int) -> float:
+    """Best records/s over rounds passes through every body."""
+    best = float("inf")
+    count = 0
+    for _ in range(rounds):
+        started = time.perf_counter()
+        count = sum(len(decode(body)) for body in bodies)
+        best = min(best, time.perf_counter() - started)
+    return count / best
+
+
+def held_per_10k(decode, bodies: list[bytes]) -> float:
+    """Traced bytes per 10,000 records kept after decoding every body."""
+    gc.collect()
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    kept = [decode(body) for body in bodies]
+    gc.collect()
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return (after - before) / sum(map(len, kept)) * 10_000
+
+
+def main() -> None:
+    """Run the benchmark and print a table."""
+    parser = argparse.ArgumentParser(description="Benchmark date decoding and record memory.")
+    parser.add_argument("--venues", type=int, default=500, help="Bodies to decode (default: 500)")
+    parser.add_argument("--days", type=int, default=60, help="Dates per body (default: 60)")
+    parser.add_argument("--rounds", type=int, default=5, help="Timed passes (default: 5)")
+    args = parser.parse_args()
+    
+    bodies = build_bodies(args.venues, args.days)
+    decoders = [("json.loads -> dicts", lambda body: json.loads(body)["data"])]
+    for backend in BACKENDS:
+        decoders.append((f"{backend} -> records", DateDecoder(backend).decode))
+    
+    print("=" * 70)
+    print("DATE RECORD BENCHMARK")
+    print("=" * 70)
+    print(f"{args.venues} bodies x {args.days} dates, "
+          f"{sum(map(len, bodies)) / 1024:.0f} KiB in total")
+    print(f"{'decoder':<24} {'records/s':>12} {'KiB per 10k held':>18}")
+    for name, decode in decoders:
+        rate = throughput(decode, bodies, args.rounds)
+        held = held_per_10k(decode, bodies)
+        print(f"{name:<24} {rate:>12,.0f} {held / 1024:>18.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+# /// script
+# requires-python = ">=3.12"
+# dependencies = [
+#     "requests",
+# ]
+# ///
+
+"""
+End-to-end benchmark of the scraping path against the local stub API.
+
+Starts stub_server.StubBetterAPI in-process, points scrape.py at it and,
+for watchlists of 1, 10 and 100 venues, measures:
+
+- fetch_watchlist() with a pooled session: requests/s and p50/p99
+  per-request latency over several cycles
+- a full main() cycle (fetch, diff, history store, reporting): wall time
+  and peak traced memory
+
+No request ever leaves the machine.
+"""
+
+import argparse
+import contextlib
+import io
+import resource
+import tempfile
+import threading
+import time
+import tracemalloc
+from pathlib import Path
+
+import scrape
+from stub_server import StubBetterAPI, StubConfig
+
+
+class TimedSession:
+    """Wraps a session and records how long each get() takes."""
+    
+    def __init__(self, session):
+        self.session = session
+        self.samples: list[float] = []
+        self._lock = threading.Lock()
+    
+    def get(self, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return self.session.get(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self.samples.append(elapsed)
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def bench_fetch(watchlist: list[tuple[str, str]], cycles: int, max_workers: int) -> dict:
+    """Drive fetch_watchlist() for several cycles over one pooled session."""
+    with scrape.create_session(pool_size=max_workers) as session:
+        timed = TimedSession(session)
+        errors = 0
+        started = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            for _ in range(cycles):
+                _, failed = scrape.fetch_watchlist(watchlist, max_workers=max_workers,
+                                                   session=timed)
+                errors += len(failed)
+        elapsed = time.perf_counter() - started
+    
+    return {
+        "requests": len(timed.samples),
+        "errors": errors,
+        "rps": len(timed.samples) / elapsed,
+        "p50_ms": percentile(timed.samples, 50) * 1000,
+        "p99_ms": percentile(timed.samples, 99) * 1000,
+        "cycle_ms": elapsed / cycles * 1000,
+    }
+
+
+def bench_main(watchlist: list[tuple[str, str]], max_workers: int) -> dict:
+    """Run one full main() cycle in a scratch directory, tracing memory."""
+    with tempfile.TemporaryDirectory() as workdir:
+        watchlist_file = Path(workdir) / "watchlist.txt"
+        watchlist_file.write_text("".join(f"{v}/{c}\n" for v, c in watchlist))
+        argv = ["--watchlist", str(watchlist_file), "--max-workers", str(max_workers),
+                "--db", str(Path(workdir) / "history.sqlite3"), "--no-cache",
+                # Measure the scraper, not the politeness limit
+                "--rate-limit", "0"]
+        
+        tracemalloc.start()
+        started = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()), contextlib.chdir(workdir):
+            scrape.main(argv)
+        elapsed = time.perf_counter() - started
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    
+    return {"cycle_ms": elapsed * 1000, "peak_kib": peak / 1024}
+
+
+def main() -> None:
+    """Run the benchmark suite and print a table."""
+    parser = argparse.ArgumentParser(description="Benchmark the scraper against a local stub API.")
+    parser.add_argument("--venues", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--cycles", type=int, default=5, help="fetch cycles per size (default: 5)")
+    parser.add_argument("--max-workers", type=int, default=16)
+    parser.add_argument("--latency", type=float, default=0.02, help="Stub latency in seconds")
+    parser.add_argument("--days", type=int, default=14, help="Dates per response")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of 403 responses")
+    args = parser.parse_args()
+    
+    config = StubConfig(latency=args.latency, days=args.days,
+                        error_rate_403=args.error_rate, seed=1)
+    
+    with StubBetterAPI(config) as stub:
+        scrape.API_BASE = stub.url
+        print("=" * 78)
+        print(f"SCRAPER BENCHMARK  stub={stub.url} latency={args.latency * 1000:.0f}ms "
+              f"days={args.days} workers={args.max_workers}")
+        print("=" * 78)
+        print(f"{'venues':>6} {'req/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'fetch ms':>9} "
+              f"{'errors':>6} {'main ms':>9} {'peak KiB':>9}")
+        
+        for count in args.venues:
+            watchlist = [(f"venue-{i:03d}", "fitness-classes-c") for i in range(count)]
+            fetch = bench_fetch(watchlist, args.cycles, args.max_workers)
+            full = bench_main(watchlist, args.max_workers)
+            print(f"{count:>6} {fetch['rps']:>9.1f} {fetch['p50_ms']:>8.1f} {fetch['p99_ms']:>8.1f} "
+                  f"{fetch['cycle_ms']:>9.1f} {fetch['errors']:>6} {full['cycle_ms']:>9.1f} "
+                  f"{full['peak_kib']:>9.0f}")
+        
+        print(f"\nStub served {stub.request_count} requests. "
+              f"Max RSS: {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+# /// script
+# requires-python = ">=3.12"
+# dependencies = [
+#     "requests",
+# ]
+# ///
+
+"""
+Cold-start benchmark for scrape.py.
+
+Measures two things:
+
+1. Import time: runs `python -X importtime -c "import scrape"` and reports
+   the total plus the slowest top-level imports.
+2. Exec to first byte: starts scrape.py as a fresh process pointed at a
+   local TCP listener (via MCR_FIT_SNIPER_API_BASE) and times how long it
+   takes from launching the process until the first byte of its request
+   arrives, for both the requests path and the --fast stdlib path.
+
+Use --record FILE to append the numbers as a JSON line, so startup
+regressions show up as a trend over time.
+"""
+
+import argparse
+import json
+import os
+import re
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+
+REPO_DIR = Path(__file__).resolve().parent
+STUB_BODY = b'{"data": [{"raw": "2026-01-01", "full_date_pretty": "Thursday 1st January", "today": false}]}'
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)")
+
+
+def measure_import_time(module: str = "scrape") -> tuple[float, list[tuple[str, float]]]:
+    """
+    Import a module under -X importtime.
+    
+    Returns:
+        tuple: (total_ms, [(direct_import, cumulative_ms), ...] slowest first)
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=REPO_DIR, capture_output=True, text=True, check=True,
+    )
+    # Lines are printed children-first, so the direct imports of `module`
+    # are the depth-1 lines since the previous top-level line.
+    children = []
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if not match:
+            continue
+        _, cumulative, indent, name = match.groups()
+        if len(indent) == 2:
+            children.append((name, int(cumulative) / 1000))
+        elif not indent:
+            if name == module:
+                children.sort(key=lambda item: item[1], reverse=True)
+                return int(cumulative) / 1000, children
+            children = []
+    raise RuntimeError(f"{module} not found in -X importtime output")
+
+
+def measure_first_byte(extra_args: list[str]) -> float:
+    """
+    Time from launching scrape.py to the first byte of its HTTP request.
+    
+    A one-shot local listener accepts the connection, records the arrival
+    of the first byte and answers with a small /dates payload.
+    """
+    listener = socket.create_server(("127.0.0.1", 0))
+    port = listener.getsockname()[1]
+    first_byte_at = []
+    
+    def serve():
+        conn, _ = listener.accept()
+        with conn:
+            conn.recv(1)
+            first_byte_at.append(time.perf_counter())
+            conn.settimeout(2)
+            try:
+                conn.recv(65536)
+            except socket.timeout:
+                pass
+            conn.sendall(b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                         b"Connection: close\r\n"
+                         b"Content-Length: " + str(len(STUB_BODY)).encode() + b"\r\n\r\n"
+                         + STUB_BODY)
+    
+    server = threading.Thread(target=serve, daemon=True)
+    server.start()
+    
+    env = dict(os.environ, MCR_FIT_SNIPER_API_BASE=f"http://127.0.0.1:{port}")
+    with tempfile.TemporaryDirectory() as workdir:
+        started = time.perf_counter()
+        subprocess.run(
+            [sys.executable, str(REPO_DIR / "scrape.py"), "--no-cache", *extra_args],
+            cwd=workdir, env=env, capture_output=True, check=True, timeout=60,
+        )
+    server.join(timeout=5)
+    listener.close()
+    return (first_byte_at[0] - started) * 1000
+
+
+def main() -> None:
+    """Run the cold-start benchmark and print a summary."""
+    parser = argparse.ArgumentParser(description="Benchmark scrape.py cold start.")
+    parser.add_argument("--runs", type=int, default=5, help="Runs per variant (default: 5)")
+    parser.add_argument("--record", type=Path, metavar="FILE",
+                        help="Append the results as a JSON line to FILE")
+    args = parser.parse_args()
+    
+    print("=" * 70)
+    print("COLD-START BENCHMARK")
+    print("=" * 70)
+    
+    import_ms, children = measure_import_time()
+    print(f"\nimport scrape: {import_ms:.1f} ms")
+    print("Slowest imports made by scrape (cumulative):")
+    for name, ms in children[:8]:
+        print(f"  {ms:8.1f} ms  {name}")
+    
+    results = {"import_scrape_ms": round(import_ms, 2)}
+    for label, extra_args in (("requests", []), ("fast", ["--fast"])):
+        samples = [measure_first_byte(extra_args) for _ in range(args.runs)]
+        median = statistics.median(samples)
+        results[f"first_byte_{label}_ms"] = round(median, 2)
+        print(f"\nExec to first byte ({label}): median {median:.1f} ms, "
+              f"min {min(samples):.1f} ms, max {max(samples):.1f} ms over {args.runs} runs")
+    
+    saving = results["first_byte_requests_ms"] - results["first_byte_fast_ms"]
+    print(f"\n--fast saves {saving:.1f} ms per cold start")
+    
+    if args.record:
+        results["timestamp"] = datetime.now().isoformat(timespec="seconds")
+        results["python"] = sys.version.split()[0]
+        with args.record.open("a", encoding="utf-8") as f:
+            f.write(json.dumps(results) + "\n")
+        print(f"Recorded in {args.record}")
+
+
+if __name__ == "__main__":
+    main()
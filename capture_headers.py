@@ -1,8 +1,6 @@
 # /// script
 # requires-python = ">=3.12"
-# dependencies = [
-#     "requests",
-# ]
+# dependencies = []
 # ///
 
 """
@@ -10,27 +8,27 @@ Browser header capture instructions.
 
 This script provides instructions and a simple server to help capture
 the exact headers your browser sends when making a successful request.
+
+Every visit to the page saves the browser's headers to the profile store
+(header_profiles.json, see header_profiles.py), keyed by a fingerprint of
+the browser, so scrape.py --headers-profile and diagnose_403.py --profile
+can use them directly. /headers.json returns the captured headers and the
+profile key as JSON. The server is threaded, and the page template is
+compiled once at startup rather than rebuilt on every request.
 """
 
+import argparse
+import html
 import http.server
-import socketserver
 import json
-from urllib.parse import urlparse, parse_qs
+import re
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
 
+from header_profiles import DEFAULT_PROFILES_PATH, ProfileStore
 
-class HeaderCaptureHandler(http.server.SimpleHTTPRequestHandler):
-    """Custom handler to capture and display HTTP headers."""
-    
-    def do_GET(self):
-        """Handle GET requests and display headers."""
-        if self.path == "/" or self.path.startswith("/?"):
-            # Serve the capture page
-            self.send_response(200)
-            self.send_header("Content-type", "text/html")
-            self.end_headers()
-            
-            html_content = """
-<!DOCTYPE html>
+
+PAGE_TEMPLATE = """<!DOCTYPE html>
 <html>
 <head>
     <title>Browser Header Capture</title>
@@ -165,26 +163,32 @@ class HeaderCaptureHandler(http.server.SimpleHTTPRequestHandler):
         <button class="copy-button" onclick="copyHeaders()">📋 Copy Headers as Python Dict</button>
         
         <h2>🔧 Next Steps</h2>
+        <div class="note">
+            These headers have been saved as profile <code>__PROFILE_KEY__</code> in
+            <code>header_profiles.json</code>. Add <code>?name=samsung</code> to this page's
+            address to give the profile a name as well.
+        </div>
+        
         <div class="step">
-            <strong>Option A:</strong> Use the captured headers in <code>diagnose_403.py</code>
+            <strong>Option A:</strong> Test the profile with <code>diagnose_403.py</code>
             <ul>
-                <li>Add a new test with your captured headers</li>
-                <li>Run the script to see if it works</li>
+                <li>Run <code>python3 diagnose_403.py --profile latest</code></li>
+                <li>The profile's headers are added to the tested combinations</li>
             </ul>
         </div>
         
         <div class="step">
-            <strong>Option B:</strong> Update <code>scrape.py</code> directly
+            <strong>Option B:</strong> Use the profile in <code>scrape.py</code>
             <ul>
-                <li>Add the working headers to the requests.get() call</li>
-                <li>Test the updated script</li>
+                <li>Run <code>python3 scrape.py --headers-profile latest</code></li>
+                <li>The browser's User-Agent and language headers are sent with every request</li>
             </ul>
         </div>
     </div>
     
     <script>
         // Display captured headers
-        const headers = """ + json.dumps(dict(self.headers)) + """;
+        const headers = __CAPTURED_HEADERS__;
         const headersDiv = document.getElementById('headers');
         
         let headerHtml = '<strong>Captured Headers:</strong><br><br>';
@@ -211,11 +215,57 @@ class HeaderCaptureHandler(http.server.SimpleHTTPRequestHandler):
     </script>
 </body>
 </html>
-            """
-            
-            self.wfile.write(html_content.encode())
+"""
+
+_PLACEHOLDER = re.compile(r"__([A-Z]+(?:_[A-Z]+)*)__")
+
+
+def compile_page(template: str) -> list[bytes | str]:
+    """Split a template into encoded literal chunks and placeholder names."""
+    pieces = _PLACEHOLDER.split(template)
+    return [piece.encode("utf-8") if i % 2 == 0 else piece for i, piece in enumerate(pieces)]
+
+
+def render_page(compiled: list[bytes | str], **fields: str) -> bytes:
+    """Fill in a compiled template; only the placeholders are encoded per request."""
+    return b"".join(piece if isinstance(piece, bytes) else fields[piece].encode("utf-8")
+                    for piece in compiled)
+
+
+PAGE = compile_page(PAGE_TEMPLATE)
+
+
+class HeaderCaptureHandler(http.server.BaseHTTPRequestHandler):
+    """Custom handler to capture and display HTTP headers."""
+    
+    store: ProfileStore  # set by make_server()
+    
+    def do_GET(self):
+        """Serve the capture page or the JSON endpoint, saving the headers."""
+        url = urlparse(self.path)
+        if url.path not in ("/", "/headers.json"):
+            self.send_error(404)
+            return
+        
+        headers = dict(self.headers)
+        name = parse_qs(url.query).get("name", [None])[0]
+        key = self.store.save(headers, name)
+        
+        if url.path == "/headers.json":
+            body = json.dumps({"profile": key, "name": name, "headers": headers},
+                              indent=2).encode("utf-8")
+            content_type = "application/json"
         else:
-            super().do_GET()
+            # "</" would end the <script> element early
+            captured = json.dumps(headers).replace("</", "<\\/")
+            body = render_page(PAGE, CAPTURED_HEADERS=captured, PROFILE_KEY=html.escape(name or key))
+            content_type = "text/html; charset=utf-8"
+        
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
     
     def log_message(self, format, *args):
         """Custom log message to show captured headers."""
@@ -227,32 +277,47 @@ class HeaderCaptureHandler(http.server.SimpleHTTPRequestHandler):
         print()
 
 
+def make_server(port: int = 8000, profiles: Path = DEFAULT_PROFILES_PATH,
+                host: str = "") -> http.server.ThreadingHTTPServer:
+    """Create a threaded capture server saving to the given profile store."""
+    handler = type("Handler", (HeaderCaptureHandler,), {"store": ProfileStore(profiles)})
+    server = http.server.ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
 def main():
     """Start the header capture server."""
-    PORT = 8000
+    parser = argparse.ArgumentParser(description="Capture the headers your browser sends.")
+    parser.add_argument("--port", type=int, default=8000, help="Port to listen on (default: 8000)")
+    parser.add_argument("--profiles", type=Path, default=DEFAULT_PROFILES_PATH,
+                        help=f"Profile store to save captures to (default: {DEFAULT_PROFILES_PATH})")
+    args = parser.parse_args()
+    port = args.port
     
     print("=" * 70)
     print("BROWSER HEADER CAPTURE SERVER")
     print("=" * 70)
     print()
-    print(f"Starting server on http://localhost:{PORT}")
+    print(f"Starting server on http://localhost:{port}")
     print()
     print("Instructions:")
-    print(f"1. Open your browser and navigate to: http://localhost:{PORT}")
+    print(f"1. Open your browser and navigate to: http://localhost:{port}")
     print("2. Follow the instructions on the page to capture your browser headers")
+    print(f"   (each visit saves a profile to {args.profiles})")
     print("3. Press Ctrl+C to stop the server when done")
     print()
     print("=" * 70)
     
     try:
-        with socketserver.TCPServer(("", PORT), HeaderCaptureHandler) as httpd:
+        with make_server(port, args.profiles) as httpd:
             httpd.serve_forever()
     except KeyboardInterrupt:
         print("\n\nServer stopped.")
     except OSError as e:
         if "Address already in use" in str(e):
-            print(f"\n✗ Error: Port {PORT} is already in use.")
-            print(f"  Try closing other applications or use a different port.")
+            print(f"\n✗ Error: Port {port} is already in use.")
+            print(f"  Try closing other applications or use --port with a different port.")
         else:
             print(f"\n✗ Error: {e}")
 
@@ -0,0 +1,109 @@
+"""
+Incremental change detection over the full set of listed dates.
+
+Instead of comparing only the last date in the list, the DateDiffer keeps
+the previous {raw date: pretty date} mapping for each (venue, category) and
+emits typed events for dates that were added, removed or changed. The set
+arithmetic runs on dict item views in C, so the Python-level work (and
+everything downstream: printing, notifications, storage) is proportional
+to the number of changes, not the length of the list.
+
+The same diff_mapping() works for any keyed snapshot, e.g. slots per date.
+"""
+
+from dataclasses import dataclass
+from typing import Hashable, Mapping
+
+from history_store import HistoryStore
+from records import DateRecord
+
+
+@dataclass(frozen=True, slots=True)
+class DateAdded:
+    venue: str
+    category: str
+    raw: str
+    pretty: str | None
+
+
+@dataclass(frozen=True, slots=True)
+class DateRemoved:
+    venue: str
+    category: str
+    raw: str
+    pretty: str | None
+
+
+@dataclass(frozen=True, slots=True)
+class DateChanged:
+    venue: str
+    category: str
+    raw: str
+    before: str | None
+    after: str | None
+
+
+DateEvent = DateAdded | DateRemoved | DateChanged
+
+
+def diff_mapping(previous: Mapping, current: Mapping) -> tuple[list, list, list]:
+    """
+    Diff two keyed snapshots.
+    
+    Returns:
+        tuple: (added_keys, removed_keys, changed_keys), each sorted
+    """
+    appeared = current.items() - previous.items()
+    if not appeared and len(current) == len(previous):
+        return [], [], []
+    vanished = previous.items() - current.items()
+    
+    appeared_keys = {key for key, _ in appeared}
+    vanished_keys = {key for key, _ in vanished}
+    changed = appeared_keys & vanished_keys
+    return (sorted(appeared_keys - changed), sorted(vanished_keys - changed),
+            sorted(changed))
+
+
+def dates_to_mapping(dates: list[DateRecord]) -> dict[str, str | None]:
+    """Key a list of dates by raw date. The "today" flag is ignored, as it
+    moves every day without anything becoming bookable."""
+    return {d.raw: d.pretty for d in dates}
+
+
+class DateDiffer:
+    """Remembers the last list per pair and turns each new list into events."""
+    
+    def __init__(self, store: HistoryStore):
+        self.store = store
+        self._state: dict[Hashable, dict[str, str | None]] = {}
+    
+    def diff(self, venue: str, category: str, dates: list[DateRecord]) -> tuple[list[DateEvent], bool]:
+        """
+        Diff a freshly fetched list against the previous one for the pair.
+        
+        The previous list is loaded from the history store the first time a
+        pair is seen in this process, and kept in memory after that.
+        
+        Returns:
+            tuple: (events, is_baseline) - is_baseline is True when there was
+            no earlier list to compare with, in which case events is empty
+        """
+        pair = (venue, category)
+        current = dates_to_mapping(dates)
+        
+        previous = self._state.get(pair)
+        if previous is None and self.store.has_listing(venue, category):
+            previous = self.store.current_dates(venue, category)
+        self._state[pair] = current
+        
+        if previous is None:
+            return [], True
+        
+        added, removed, changed = diff_mapping(previous, current)
+        events: list[DateEvent] = []
+        events.extend(DateAdded(venue, category, raw, current[raw]) for raw in added)
+        events.extend(DateRemoved(venue, category, raw, previous[raw]) for raw in removed)
+        events.extend(DateChanged(venue, category, raw, previous[raw], current[raw])
+                      for raw in changed)
+        return events, False
@@ -8,175 +8,342 @@
 """
 Diagnostic script to identify why we're getting 403 errors.
 
-This script tests various request configurations to identify what works
-and what causes 403 errors. It uses a scraper-friendly User-Agent by default.
+Instead of a handful of hand-written header sets tried one after another,
+the header matrix is generated from a few dimensions (User-Agent, Accept,
+Accept-Language, Referer/Origin and Sec-Fetch-*) and run concurrently on
+a thread pool, with a cap on requests per second so the diagnosis itself
+doesn't get us rate limited. From the first header set that gets a 200, a
+delta-debugging search (ddmin) removes headers until every remaining one
+is needed: the minimal header set.
+
+Results are cached by header fingerprint (target URL plus sorted headers)
+in .diagnose_403_cache.json, so a repeated run only sends combinations it
+hasn't tried recently.
+
+Both the booking page (HTML) and the /api/.../dates endpoint scrape.py
+actually uses can be tested:
+
+    python3 diagnose_403.py --target api
+    python3 diagnose_403.py --target page --matrix full
 """
 
+import argparse
+import hashlib
+import itertools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
 import requests
-from typing import Dict, Any
 
+from header_profiles import identity_headers, load_profile
+from ratelimit import DEFAULT_STATE_FILE, CoolingDown, RateLimitedSession
+from scrape import API_BASE, DEFAULT_CATEGORY, DEFAULT_VENUE
+from state_files import read_json, write_json_atomic
 
-def test_request(url: str, description: str, **kwargs) -> Dict[str, Any]:
-    """Test a request with given parameters and return results."""
-    print(f"\n{'='*70}")
-    print(f"Test: {description}")
-    print(f"{'='*70}")
-    
-    # Show what we're sending
-    if 'headers' in kwargs:
-        print("Headers:")
-        for key, value in kwargs['headers'].items():
-            print(f"  {key}: {value}")
+
+CACHE_FILE = Path(".diagnose_403_cache.json")
+
+TARGETS = {
+    "page": f"https://bookings.better.org.uk/location/{DEFAULT_VENUE}/{DEFAULT_CATEGORY}",
+    "api": f"{API_BASE}/api/activities/venue/{DEFAULT_VENUE}/activity-category/"
+           f"{DEFAULT_CATEGORY}/dates",
+}
+
+CHROME_UA = ("Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+             "(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36")
+SAMSUNG_UA = ("Mozilla/5.0 (Linux; Android 13; SM-S918B) AppleWebKit/537.36 "
+              "(KHTML, like Gecko) SamsungBrowser/23.0 Chrome/115.0.0.0 Mobile Safari/537.36")
+BOOKING_ORIGIN = "https://bookings.better.org.uk"
+BOOKING_PAGE = TARGETS["page"]
+
+# Each dimension maps a variant name to the headers it adds ({} = omit).
+# The last variant of each dimension is the most browser-like one.
+DIMENSIONS = {
+    "user-agent": {
+        "none": {},
+        "scraper": {"User-Agent": "mcr_fit_sniper/1.0 (+https://github.com/davegoopot/mcr_fit_sniper)"},
+        "basic": {"User-Agent": "Mozilla/5.0"},
+        "chrome": {"User-Agent": CHROME_UA},
+        "samsung": {"User-Agent": SAMSUNG_UA},
+    },
+    "accept": {
+        "none": {},
+        "json": {"Accept": "application/json"},
+        "html": {"Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,"
+                           "image/avif,image/webp,image/apng,*/*;q=0.8"},
+    },
+    "language": {
+        "none": {},
+        "en-gb": {"Accept-Language": "en-GB,en;q=0.9"},
+    },
+    "referer": {
+        "none": {},
+        "referer": {"Referer": BOOKING_PAGE},
+        "referer+origin": {"Referer": BOOKING_PAGE, "Origin": BOOKING_ORIGIN},
+    },
+    "sec-fetch": {
+        "none": {},
+        "cors": {"Sec-Fetch-Dest": "empty", "Sec-Fetch-Mode": "cors",
+                 "Sec-Fetch-Site": "same-site"},
+        "navigate": {"Sec-Fetch-Dest": "document", "Sec-Fetch-Mode": "navigate",
+                     "Sec-Fetch-Site": "none", "Sec-Fetch-User": "?1"},
+    },
+}
+
+
+def build_matrix(kind: str = "single") -> list[tuple[str, dict]]:
+    """
+    Generate (description, headers) combinations.
     
-    try:
-        response = requests.get(url, timeout=30, **kwargs)
-        print(f"✓ Status Code: {response.status_code}")
-        print(f"  Content Length: {len(response.text)} bytes")
-        print(f"  Response Headers:")
-        for key, value in response.headers.items():
-            print(f"    {key}: {value}")
-        
-        return {
-            "success": True,
-            "status_code": response.status_code,
-            "content_length": len(response.text),
-            "description": description
-        }
-    except requests.exceptions.HTTPError as e:
-        print(f"✗ HTTP Error: {e}")
-        print(f"  Status Code: {e.response.status_code if e.response else 'N/A'}")
-        return {
-            "success": False,
-            "error": str(e),
-            "status_code": e.response.status_code if e.response else None,
-            "description": description
-        }
-    except Exception as e:
-        print(f"✗ Error: {type(e).__name__}: {e}")
-        return {
-            "success": False,
-            "error": str(e),
-            "description": description
-        }
-
-
-def main() -> None:
-    """Run diagnostic tests to identify 403 issues."""
-    url = "https://bookings.better.org.uk/location/hough-end-leisure-centre/fitness-classes-c"
+    "full" is the cartesian product of every dimension. "single" keeps it
+    small: for each User-Agent, that UA alone, the UA plus one variant of
+    one other dimension at a time, and the UA plus the most browser-like
+    variant of everything.
+    """
+    names = list(DIMENSIONS)
+    if kind == "full":
+        choices = itertools.product(*(DIMENSIONS[name].items() for name in names))
+        return [(_describe(zip(names, (variant for variant, _ in combo))),
+                 _merge(headers for _, headers in combo)) for combo in choices]
     
-    print("=" * 70)
-    print("403 DIAGNOSTIC TOOL")
-    print("=" * 70)
-    print(f"Target URL: {url}")
-    print()
+    matrix = []
+    for ua_name, ua_headers in DIMENSIONS["user-agent"].items():
+        matrix.append((f"user-agent={ua_name}", dict(ua_headers)))
+        for name in names[1:]:
+            for variant, headers in DIMENSIONS[name].items():
+                if headers:
+                    matrix.append((f"user-agent={ua_name}, {name}={variant}",
+                                   {**ua_headers, **headers}))
+        browser_like = [list(DIMENSIONS[name].values())[-1] for name in names[1:]]
+        matrix.append((f"user-agent={ua_name}, all browser headers",
+                       _merge([ua_headers, *browser_like])))
+    return matrix
+
+
+def _describe(pairs) -> str:
+    return ", ".join(f"{name}={variant}" for name, variant in pairs if variant != "none") or "no headers"
+
+
+def _merge(header_dicts) -> dict:
+    merged = {}
+    for headers in header_dicts:
+        merged.update(headers)
+    return merged
+
+
+def fingerprint(url: str, headers: dict) -> str:
+    """Stable key for one (URL, header set) combination."""
+    canonical = url + "\n" + "\n".join(f"{k.lower()}: {v}" for k, v in sorted(headers.items()))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:24]
+
+
+class Prober:
+    """Send header combinations concurrently, rate-capped and cached."""
     
-    results = []
+    def __init__(self, url: str, workers: int = 8, rate: float = 4, timeout: float = 10,
+                 cache_file: Path = CACHE_FILE, cache_ttl: float = 6 * 3600,
+                 fresh: bool = False, ignore_cooldown: bool = False):
+        self.url = url
+        self.timeout = timeout
+        self.cache_file = cache_file
+        self.cache_ttl = cache_ttl
+        # Results from before this run are ignored with fresh, but results
+        # from earlier in the run are still reused (e.g. during ddmin)
+        self.not_before = time.time() - cache_ttl if not fresh else time.time()
+        self.sent = 0
+        self.cached = 0
+        self._cache = read_json(cache_file, {})
+        self._pool = ThreadPoolExecutor(max_workers=workers)
+        self._lock = threading.Lock()
+        session = requests.Session()
+        # requests adds its own User-Agent, Accept and Accept-Encoding unless told not to
+        session.headers.clear()
+        # 403s are what we're here to observe, so they don't start a cool-down,
+        # but 429s and cool-downs set by scrape.py are honoured
+        self._session = RateLimitedSession(
+            session, rate=rate, burst=1, cooldown_on_403=False,
+            state_file=None if ignore_cooldown else DEFAULT_STATE_FILE)
     
-    # Test 1: Basic request (no headers) - This is what the original script does
-    results.append(test_request(
-        url,
-        "Basic request (no custom headers)",
-    ))
+    def probe(self, headers: dict) -> dict:
+        """Status (or error) for one header set, from the cache if fresh."""
+        key = fingerprint(self.url, headers)
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is not None and entry["at"] >= self.not_before:
+                self.cached += 1
+                return entry
+        
+        entry = {"at": time.time(), "status": None, "error": None}
+        sent = True
+        try:
+            response = self._session.get(self.url, headers=headers, timeout=self.timeout)
+            entry["status"] = response.status_code
+            entry["length"] = len(response.content)
+        except OSError as e:
+            # requests.RequestException and ratelimit.CoolingDown are both OSErrors
+            entry["error"] = f"{type(e).__name__}: {e}"
+            sent = not isinstance(e, CoolingDown)
+        
+        with self._lock:
+            self.sent += sent
+            # Only an answer from the server says anything about the headers;
+            # timeouts, resets and cool-downs are retested next time
+            if entry["status"] is not None:
+                self._cache[key] = entry
+        return entry
     
-    # Test 2: Request with scraper-friendly User-Agent
-    results.append(test_request(
-        url,
-        "Request with scraper-friendly User-Agent (recommended)",
-        headers={
-            "User-Agent": "mcr_fit_sniper/1.0 (+https://github.com/davegoopot/mcr_fit_sniper)"
-        }
-    ))
+    def probe_many(self, header_sets: list[dict]) -> list[dict]:
+        """Probe several header sets concurrently, results in the same order."""
+        return list(self._pool.map(self.probe, header_sets))
     
-    # Test 3: Request with minimal User-Agent
-    results.append(test_request(
-        url,
-        "Request with basic User-Agent",
-        headers={
-            "User-Agent": "Mozilla/5.0"
-        }
-    ))
+    def passes(self, headers: dict) -> bool:
+        return self.probe(headers)["status"] == 200
     
-    # Test 4: Request with Chrome User-Agent
-    results.append(test_request(
-        url,
-        "Request with Chrome User-Agent (pretending to be a browser)",
-        headers={
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
-        }
-    ))
+    def save(self) -> None:
+        """Write the cache, without the entries too old to be reused."""
+        cutoff = time.time() - self.cache_ttl
+        with self._lock:
+            self._cache = {key: entry for key, entry in self._cache.items()
+                           if entry["at"] >= cutoff and entry["status"] is not None}
+            write_json_atomic(self.cache_file, self._cache)
     
-    # Test 5: Request with Samsung Android User-Agent (since it works in Samsung browser)
-    results.append(test_request(
-        url,
-        "Request with Samsung Android User-Agent (pretending to be a browser)",
-        headers={
-            "User-Agent": "Mozilla/5.0 (Linux; Android 13; SM-S918B) AppleWebKit/537.36 (KHTML, like Gecko) SamsungBrowser/23.0 Chrome/115.0.0.0 Mobile Safari/537.36"
-        }
-    ))
+    def close(self) -> None:
+        self._pool.shutdown()
+        self._session.close()
+
+
+def minimise(prober: Prober, headers: dict) -> dict:
+    """
+    Delta debugging (ddmin): shrink a passing header set until removing any
+    single header makes it fail.
     
-    # Test 6: Request with full browser headers
-    results.append(test_request(
-        url,
-        "Request with full browser headers (pretending to be a browser)",
-        headers={
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-            "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8",
-            "Accept-Language": "en-US,en;q=0.9",
-            "Accept-Encoding": "gzip, deflate, br",
-            "DNT": "1",
-            "Connection": "keep-alive",
-            "Upgrade-Insecure-Requests": "1",
-            "Sec-Fetch-Dest": "document",
-            "Sec-Fetch-Mode": "navigate",
-            "Sec-Fetch-Site": "none",
-            "Sec-Fetch-User": "?1",
-            "Cache-Control": "max-age=0"
-        }
-    ))
+    Each round splits the headers into n chunks and tests every chunk and
+    every complement concurrently. A passing chunk or complement becomes
+    the new set; otherwise the chunks are made finer.
+    """
+    items = sorted(headers.items())
+    if prober.passes({}):
+        return {}
     
-    # Test 7: Request with Referer header
-    results.append(test_request(
-        url,
-        "Request with Referer header (pretending to be a browser)",
-        headers={
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-            "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8",
-            "Accept-Language": "en-US,en;q=0.9",
-            "Referer": "https://bookings.better.org.uk/"
-        }
-    ))
+    n = 2
+    while len(items) >= 2:
+        size = -(-len(items) // n)
+        chunks = [items[i:i + size] for i in range(0, len(items), size)]
+        # With two chunks each complement is just the other chunk
+        complements = [[item for item in items if item not in chunk]
+                       for chunk in chunks] if len(chunks) > 2 else []
+        candidates = chunks + complements
+        results = prober.probe_many([dict(candidate) for candidate in candidates])
+        
+        passing = [i for i, result in enumerate(results) if result["status"] == 200]
+        if passing:
+            first = passing[0]
+            items = candidates[first]
+            # A passing chunk restarts at 2; a passing complement keeps the granularity
+            n = 2 if first < len(chunks) else max(n - 1, 2)
+            continue
+        if n >= len(items):
+            break
+        n = min(len(items), n * 2)
+    return dict(items)
+
+
+def describe_result(result: dict) -> str:
+    if result["error"]:
+        return f"error: {result['error']}"
+    return f"{result['status']} ({result.get('length', 0)} bytes)"
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Find which request headers avoid a 403.")
+    parser.add_argument("--target", choices=list(TARGETS), default="api",
+                        help="api: the dates endpoint scrape.py uses; page: the booking page "
+                             "(default: api)")
+    parser.add_argument("--url", help="Test this URL instead of a built-in target")
+    parser.add_argument("--matrix", choices=["single", "full"], default="single",
+                        help="single: vary one dimension at a time per User-Agent; "
+                             "full: every combination (default: single)")
+    parser.add_argument("--profile", metavar="KEY",
+                        help="Also test a browser profile saved by capture_headers.py "
+                             "(fingerprint, name or latest)")
+    parser.add_argument("--workers", type=int, default=8,
+                        help="Concurrent requests (default: 8)")
+    parser.add_argument("--rate", type=float, default=4,
+                        help="Maximum requests started per second (default: 4)")
+    parser.add_argument("--timeout", type=float, default=10,
+                        help="Per-request timeout in seconds (default: 10)")
+    parser.add_argument("--cache-ttl", type=float, default=6 * 3600,
+                        help="Reuse cached results younger than this many seconds (default: 21600)")
+    parser.add_argument("--ignore-cooldown", action="store_true",
+                        help="Send requests even if a previous run put the host in a cool-down")
+    parser.add_argument("--fresh", action="store_true",
+                        help="Ignore cached results and test everything again")
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> None:
+    """Run the header matrix, then minimise a working header set."""
+    args = parse_args(argv)
+    url = args.url or TARGETS[args.target]
+    matrix = build_matrix(args.matrix)
+    if args.profile:
+        captured = load_profile(args.profile)
+        matrix.append((f"profile={args.profile}, all captured headers", captured))
+        matrix.append((f"profile={args.profile}, identity headers", identity_headers(captured)))
     
-    # Summary
-    print("\n" + "=" * 70)
-    print("SUMMARY")
     print("=" * 70)
+    print("403 DIAGNOSTIC TOOL")
+    print("=" * 70)
+    print(f"Target URL: {url}")
+    print(f"Testing {len(matrix)} header combinations "
+          f"({args.workers} at a time, at most {args.rate:g} requests/s)...")
     
-    successful = [r for r in results if r["success"] and r.get("status_code") == 200]
-    failed = [r for r in results if not r["success"] or r.get("status_code") != 200]
-    
-    if successful:
-        print(f"\n✓ Successful requests ({len(successful)}):")
-        for result in successful:
-            print(f"  - {result['description']}")
-            print(f"    Status: {result['status_code']}, Content: {result['content_length']} bytes")
+    prober = Prober(url, workers=args.workers, rate=args.rate, timeout=args.timeout,
+                    cache_ttl=args.cache_ttl, fresh=args.fresh,
+                    ignore_cooldown=args.ignore_cooldown)
+    started = time.perf_counter()
+    try:
+        results = prober.probe_many([headers for _, headers in matrix])
+        
+        print("\n" + "=" * 70)
+        print("RESULTS")
+        print("=" * 70)
+        for (description, _), result in zip(matrix, results):
+            mark = "✓" if result["status"] == 200 else "✗"
+            print(f"  {mark} {describe_result(result):<28} {description}")
+        
+        working = [headers for (_, headers), result in zip(matrix, results)
+                   if result["status"] == 200]
+        minimal = None
+        if working:
+            print("\nSearching for the minimal working header set...")
+            # Start from the smallest working set; ddmin has less to remove
+            minimal = minimise(prober, min(working, key=len))
+    finally:
+        prober.save()
+        prober.close()
     
-    if failed:
-        print(f"\n✗ Failed requests ({len(failed)}):")
-        for result in failed:
-            print(f"  - {result['description']}")
-            status = result.get('status_code', 'N/A')
-            error = result.get('error', 'Unknown error')
-            print(f"    Status: {status}, Error: {error}")
+    elapsed = time.perf_counter() - started
+    print(f"\n{prober.sent} requests sent, {prober.cached} results from cache, "
+          f"{elapsed:.1f}s")
     
     print("\n" + "=" * 70)
     print("RECOMMENDATIONS")
     print("=" * 70)
     
-    if successful:
-        print("\nThe following approach(es) work:")
-        for result in successful:
-            print(f"  ✓ {result['description']}")
-        print("\nUpdate scrape.py to use headers from a successful test.")
+    if minimal is not None:
+        print(f"\n{len(working)} of {len(matrix)} combinations got a 200.")
+        if minimal:
+            print("Minimal header set (every header below is needed):")
+            print("    headers = {")
+            for name, value in minimal.items():
+                print(f"        {name!r}: {value!r},")
+            print("    }")
+            print("\nUpdate api_headers() in scrape.py to include these headers.")
+        else:
+            print("A request with no headers at all works; the 403 is not about headers.")
     else:
         print("\nAll tests failed. Possible reasons:")
         print("  1. Network/firewall blocking the domain")
@@ -186,7 +353,7 @@ def main() -> None:
         print("\nTry:")
         print("  - Running this script from a different network")
         print("  - Using a VPN")
-        print("  - Adding delays between requests")
+        print("  - Adding delays between requests (--rate 0.5)")
         print("  - Checking if the website works in a regular browser")
 
 
@@ -0,0 +1,211 @@
+# /// script
+# requires-python = ">=3.12"
+# dependencies = []
+# ///
+
+"""
+Bounded, structured event log for the scraper.
+
+Replaces appending all of scrape.py's output to scrape.log. Each event is
+one compact JSON line ({"ts", "level", "event", "venue", ...}) in
+logs/current.jsonl. At INFO only changes are logged (dates added or
+removed, a new latest date, errors); routine "nothing changed" polls are
+DEBUG.
+
+When the current file reaches max_bytes it is gzipped into a numbered
+segment and an entry is added to logs/index.json with the segment's
+first and last timestamps and the venues it mentions. Only the newest
+keep segments are kept. Queries use the index to open only the segments
+that can match, so asking about one venue over one week reads a few
+small files however long the scraper has been running.
+
+Also usable from the command line, for example:
+
+    python3 event_log.py --venue hough-end-leisure-centre --since 2026-10-01 --until 2026-10-07
+"""
+
+import argparse
+import json
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Iterator
+
+from state_files import read_json, write_json_atomic
+
+
+DEFAULT_LOG_DIR = Path("logs")
+
+LEVELS = {"DEBUG": 10, "INFO": 20, "WARNING": 30, "ERROR": 40}
+
+
+class EventLog:
+    """Append-only JSON-lines log with size-based, compressed rotation."""
+    
+    def __init__(self, directory: Path = DEFAULT_LOG_DIR, level: str = "INFO",
+                 max_bytes: int = 256 * 1024, keep: int = 20):
+        self.directory = directory
+        self.level = LEVELS[level]
+        self.max_bytes = max_bytes
+        self.keep = keep
+        self.current = directory / "current.jsonl"
+        self.index_file = directory / "index.json"
+        self._lock = threading.Lock()
+        directory.mkdir(parents=True, exist_ok=True)
+        self._file = self.current.open("a", encoding="utf-8")
+    
+    def enabled(self, level: str) -> bool:
+        """Would an event at this level be written?"""
+        return LEVELS[level] >= self.level
+    
+    def log(self, level: str, event: str, venue: str | None = None,
+            category: str | None = None, **fields) -> None:
+        """Write one event if level is at or above the configured level."""
+        if not self.enabled(level):
+            return
+        record = {"ts": datetime.now().isoformat(timespec="seconds"), "level": level,
+                  "event": event}
+        if venue is not None:
+            record["venue"] = venue
+        if category is not None:
+            record["category"] = category
+        record.update(fields)
+        line = json.dumps(record, separators=(",", ":"), ensure_ascii=False) + "\n"
+        
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+            if self._file.tell() >= self.max_bytes:
+                self._rotate()
+    
+    def debug(self, event: str, **fields) -> None:
+        self.log("DEBUG", event, **fields)
+    
+    def info(self, event: str, **fields) -> None:
+        self.log("INFO", event, **fields)
+    
+    def warning(self, event: str, **fields) -> None:
+        self.log("WARNING", event, **fields)
+    
+    def error(self, event: str, **fields) -> None:
+        self.log("ERROR", event, **fields)
+    
+    def _rotate(self) -> None:
+        """Compress the current file into a new segment and prune old ones."""
+        import gzip
+        
+        self._file.close()
+        
+        first = last = None
+        venues = set()
+        lines = 0
+        with self.current.open(encoding="utf-8") as f:
+            for line in f:
+                record = json.loads(line)
+                first = first or record["ts"]
+                last = record["ts"]
+                if "venue" in record:
+                    venues.add(record["venue"])
+                lines += 1
+        
+        index = read_json(self.index_file, {"segments": [], "next": 1})
+        name = f"segment-{index['next']:06d}.jsonl.gz"
+        with self.current.open("rb") as src, gzip.open(self.directory / name, "wb") as dst:
+            dst.writelines(src)
+        index["segments"].append({"file": name, "first": first, "last": last,
+                                  "venues": sorted(venues), "lines": lines})
+        index["next"] += 1
+        
+        while len(index["segments"]) > self.keep:
+            oldest = index["segments"].pop(0)
+            (self.directory / oldest["file"]).unlink(missing_ok=True)
+        
+        write_json_atomic(self.index_file, index)
+        # Truncate only once the segment and index are safely written
+        self._file = self.current.open("w", encoding="utf-8")
+    
+    def close(self) -> None:
+        with self._lock:
+            self._file.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _until_bound(until: str | None) -> str | None:
+    """A bare date means the end of that day."""
+    if until is not None and "T" not in until:
+        return until + "T23:59:59"
+    return until
+
+
+def query(directory: Path = DEFAULT_LOG_DIR, venue: str | None = None,
+          since: str | None = None, until: str | None = None,
+          event: str | None = None) -> Iterator[dict]:
+    """
+    Yield logged events, oldest first, optionally filtered by venue, event
+    name and an inclusive ISO time range.
+    
+    Segments whose time range or venue list cannot match are skipped using
+    index.json without being opened.
+    """
+    until = _until_bound(until)
+    # Cheap substring test before decoding each line
+    needle = f'"venue":{json.dumps(venue, ensure_ascii=False)}' if venue else None
+    
+    def matching(lines) -> Iterator[dict]:
+        for line in lines:
+            if needle and needle not in line:
+                continue
+            record = json.loads(line)
+            ts = record["ts"]
+            if since and ts < since:
+                continue
+            if until and ts > until:
+                continue
+            if event and record["event"] != event:
+                continue
+            yield record
+    
+    import gzip
+    
+    index = read_json(directory / "index.json", {"segments": []})
+    for segment in index["segments"]:
+        if since and segment["last"] < since:
+            continue
+        if until and segment["first"] > until:
+            continue
+        if venue and venue not in segment["venues"]:
+            continue
+        path = directory / segment["file"]
+        if not path.exists():
+            continue
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            yield from matching(f)
+    
+    current = directory / "current.jsonl"
+    if current.exists():
+        with current.open(encoding="utf-8") as f:
+            yield from matching(f)
+
+
+def main() -> None:
+    """Show logged events from the command line."""
+    parser = argparse.ArgumentParser(description="Show the scraper's logged events.")
+    parser.add_argument("--dir", type=Path, default=DEFAULT_LOG_DIR,
+                        help=f"Log directory (default: {DEFAULT_LOG_DIR})")
+    parser.add_argument("--venue")
+    parser.add_argument("--event", help="Only this event, e.g. latest_changed")
+    parser.add_argument("--since", help="ISO date or timestamp")
+    parser.add_argument("--until", help="ISO date or timestamp (a date includes the whole day)")
+    args = parser.parse_args()
+    
+    for record in query(args.dir, args.venue, args.since, args.until, args.event):
+        print(json.dumps(record, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+"""
+Minimal stdlib-only HTTP transport for the fast-start path.
+
+Importing requests (with urllib3, charset_normalizer and idna) is a large
+share of a one-shot run's startup time on a phone. For a single GET we
+don't need any of it: StdlibSession implements the small part of the
+requests.Session interface the scraper uses (get() returning an object
+with status_code, headers, content, json() and raise_for_status()) on top
+of http.client. Errors are OSError subclasses, like requests' own
+RequestException, so callers can catch both the same way.
+
+Each thread gets its own keep-alive connections, so one StdlibSession can
+be shared by the concurrent watchlist fetchers.
+"""
+
+import http.client
+import json
+import socket
+import threading
+import time
+from urllib.parse import urlsplit
+
+
+class TransportError(OSError):
+    """The request could not be completed (connection, protocol or HTTP error)."""
+    
+    def __init__(self, message: str, response: "StdlibResponse | None" = None):
+        super().__init__(message)
+        self.response = response
+
+
+class StdlibResponse:
+    """The parts of requests.Response the scraper relies on."""
+    
+    def __init__(self, url: str, status_code: int, reason: str,
+                 headers: http.client.HTTPMessage, content: bytes):
+        self.url = url
+        self.status_code = status_code
+        self.reason = reason
+        self.headers = headers
+        self.content = content
+        # Seconds spent on the DNS lookup, TCP connect and TLS handshake (new
+        # connections only), waiting for the response headers and reading
+        # the body; see metrics.InstrumentedSession
+        self.timings: dict[str, float] = {}
+    
+    @property
+    def text(self) -> str:
+        return self.content.decode(self.headers.get_content_charset() or "utf-8", "replace")
+    
+    def json(self):
+        return json.loads(self.content)
+    
+    def raise_for_status(self) -> None:
+        if self.status_code >= 400:
+            kind = "Client" if self.status_code < 500 else "Server"
+            raise TransportError(f"{self.status_code} {kind} Error: {self.reason} "
+                                 f"for url: {self.url}", self)
+
+
+class _TimedConnect:
+    """
+    Stand-in for socket.create_connection (http.client's _create_connection
+    hook) that times the DNS lookup and the TCP connect separately.
+    """
+    
+    def __init__(self):
+        self.dns = 0.0
+        self.tcp = 0.0
+    
+    def __call__(self, address, timeout=socket._GLOBAL_DEFAULT_TIMEOUT, source_address=None):
+        host, port = address
+        started = time.perf_counter()
+        addresses = socket.getaddrinfo(host, port, 0, socket.SOCK_STREAM)
+        resolved = time.perf_counter()
+        self.dns = resolved - started
+        error = None
+        # Each address in turn, as create_connection does, connecting to the
+        # whole sockaddr (IPv6 flow info and scope id included)
+        for family, type_, proto, _, sockaddr in addresses:
+            sock = None
+            try:
+                sock = socket.socket(family, type_, proto)
+                if timeout is not socket._GLOBAL_DEFAULT_TIMEOUT:
+                    sock.settimeout(timeout)
+                if source_address:
+                    sock.bind(source_address)
+                sock.connect(sockaddr)
+            except OSError as e:
+                if sock is not None:
+                    sock.close()
+                error = e
+                continue
+            self.tcp = time.perf_counter() - resolved
+            return sock
+        raise error or OSError(f"getaddrinfo returned no addresses for {host}")
+
+
+class StdlibSession:
+    """Keep-alive GETs over http.client, one connection per host."""
+    
+    def __init__(self):
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._all_connections: list[http.client.HTTPConnection] = []
+    
+    @property
+    def _connections(self) -> dict[tuple[str, str], http.client.HTTPConnection]:
+        """This thread's connections, keyed by (scheme, netloc)."""
+        connections = getattr(self._local, "connections", None)
+        if connections is None:
+            connections = self._local.connections = {}
+        return connections
+    
+    def _connection(self, scheme: str, netloc: str, timeout: float | None):
+        key = (scheme, netloc)
+        conn = self._connections.get(key)
+        if conn is not None:
+            # Each request's timeout applies, not the one the connection was opened with
+            conn.timeout = timeout
+            if conn.sock is not None:
+                conn.sock.settimeout(timeout)
+        else:
+            conn_class = http.client.HTTPSConnection if scheme == "https" else http.client.HTTPConnection
+            conn = self._connections[key] = conn_class(netloc, timeout=timeout)
+            conn._create_connection = _TimedConnect()
+            with self._lock:
+                self._all_connections.append(conn)
+        return key, conn
+    
+    def get(self, url: str, headers: dict | None = None, timeout: float | None = None) -> StdlibResponse:
+        parts = urlsplit(url)
+        path = parts.path or "/"
+        if parts.query:
+            path += "?" + parts.query
+        request_headers = {"Accept-Encoding": "gzip", **(headers or {})}
+        
+        # A reused keep-alive connection may have been closed by the server;
+        # retry once on a fresh connection in that case.
+        for attempt in (1, 2):
+            key, conn = self._connection(parts.scheme, parts.netloc, timeout)
+            reused = conn.sock is not None
+            try:
+                started = time.perf_counter()
+                if not reused:
+                    conn.connect()
+                connected = time.perf_counter()
+                conn.request("GET", path, headers=request_headers)
+                response = conn.getresponse()
+                headers_at = time.perf_counter()
+                body = response.read()
+                break
+            except (http.client.HTTPException, OSError) as e:
+                conn.close()
+                del self._connections[key]
+                with self._lock:
+                    self._all_connections.remove(conn)
+                if not reused or attempt == 2:
+                    raise TransportError(f"{type(e).__name__}: {e} for url: {url}") from e
+        
+        if response.getheader("Content-Encoding") == "gzip":
+            import gzip
+            body = gzip.decompress(body)
+        
+        result = StdlibResponse(url, response.status, response.reason, response.headers, body)
+        if reused:
+            result.timings = {"connect": connected - started}
+        else:
+            # The TLS handshake is whatever connect() spent beyond the socket
+            timer = conn._create_connection
+            result.timings = {"dns": timer.dns, "connect": timer.tcp}
+            if parts.scheme == "https":
+                result.timings["tls"] = connected - started - timer.dns - timer.tcp
+        result.timings["wait"] = headers_at - connected
+        result.timings["read"] = time.perf_counter() - headers_at
+        return result
+    
+    def close(self) -> None:
+        with self._lock:
+            for conn in self._all_connections:
+                conn.close()
+            self._all_connections.clear()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
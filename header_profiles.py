@@ -0,0 +1,133 @@
+# /// script
+# requires-python = ">=3.12"
+# dependencies = []
+# ///
+
+"""
+Persistent store of browser header profiles.
+
+capture_headers.py saves the headers a real browser sent as a profile,
+keyed by a fingerprint of that browser (a hash of its User-Agent and
+client-hint headers), so visiting the capture page twice from the same
+browser updates one profile instead of adding another. A profile can
+also be given a name. scrape.py and diagnose_403.py load a profile by
+fingerprint, name or "latest" with a single dict lookup, instead of
+copying header dicts into the source by hand.
+
+Also usable from the command line:
+
+    python3 header_profiles.py list
+    python3 header_profiles.py show samsung
+"""
+
+import argparse
+import hashlib
+import threading
+import time
+from pathlib import Path
+
+from state_files import read_json, write_json_atomic
+
+
+DEFAULT_PROFILES_PATH = Path("header_profiles.json")
+
+# Not worth keeping: connection details, or values that only make sense
+# for the local capture server (its host, cookies, referer and origin)
+SKIPPED_HEADERS = {"host", "connection", "content-length", "cookie", "referer", "origin",
+                   "keep-alive", "upgrade", "te", "if-none-match", "if-modified-since"}
+
+# Headers that identify the browser rather than one kind of request.
+# Accept and Sec-Fetch-* differ between a page load and an API call, and
+# Accept-Encoding may name codings (br, zstd) the HTTP client can't decode.
+IDENTITY_HEADERS = {"user-agent", "accept-language", "dnt", "sec-gpc"}
+
+
+def fingerprint(headers: dict) -> str:
+    """Identify a browser by its User-Agent and client hints (sec-ch-ua*)."""
+    parts = sorted((name.lower(), value) for name, value in headers.items()
+                   if name.lower() == "user-agent" or name.lower().startswith("sec-ch-ua"))
+    canonical = "\n".join(f"{name}: {value}" for name, value in parts)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:16]
+
+
+def identity_headers(headers: dict) -> dict:
+    """The part of a profile that can be sent with any request."""
+    return {name: value for name, value in headers.items()
+            if name.lower() in IDENTITY_HEADERS or name.lower().startswith("sec-ch-ua")}
+
+
+class ProfileStore:
+    """Header profiles in a JSON file, indexed by fingerprint and by name."""
+    
+    def __init__(self, path: Path = DEFAULT_PROFILES_PATH):
+        self.path = path
+        data = read_json(path, {})
+        self.profiles: dict[str, dict] = data.get("profiles", {})
+        self.names: dict[str, str] = data.get("names", {})
+        self.latest: str | None = data.get("latest")
+        self._lock = threading.Lock()
+    
+    def save(self, headers: dict, name: str | None = None) -> str:
+        """
+        Add or update the profile for the browser that sent these headers.
+        
+        Returns:
+            str: The profile's fingerprint
+        """
+        kept = {key: value for key, value in headers.items() if key.lower() not in SKIPPED_HEADERS}
+        key = fingerprint(kept)
+        with self._lock:
+            profile = self.profiles.get(key, {})
+            profile.update({"headers": kept, "captured_at": time.time()})
+            if name:
+                profile["name"] = name
+                self.names[name] = key
+            self.profiles[key] = profile
+            self.latest = key
+            write_json_atomic(self.path, {"profiles": self.profiles, "names": self.names,
+                                          "latest": self.latest})
+        return key
+    
+    def get(self, key: str) -> dict | None:
+        """Headers for a fingerprint, a name or "latest", or None."""
+        if key == "latest":
+            key = self.latest
+        else:
+            key = self.names.get(key, key)
+        profile = self.profiles.get(key)
+        return None if profile is None else profile["headers"]
+
+
+def load_profile(key: str, path: Path = DEFAULT_PROFILES_PATH) -> dict:
+    """Headers of a stored profile; raises KeyError with a hint if missing."""
+    headers = ProfileStore(path).get(key)
+    if headers is None:
+        raise KeyError(f"No header profile {key!r} in {path}; capture one with capture_headers.py")
+    return headers
+
+
+def main() -> None:
+    """List or show stored profiles."""
+    parser = argparse.ArgumentParser(description="Inspect captured browser header profiles.")
+    parser.add_argument("--profiles", type=Path, default=DEFAULT_PROFILES_PATH,
+                        help=f"Profile store (default: {DEFAULT_PROFILES_PATH})")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("list", help="List stored profiles")
+    show = commands.add_parser("show", help="Print one profile's headers")
+    show.add_argument("key", help="Fingerprint, name or latest")
+    args = parser.parse_args()
+    
+    store = ProfileStore(args.profiles)
+    if args.command == "list":
+        for key, profile in store.profiles.items():
+            marker = "*" if key == store.latest else " "
+            user_agent = next((value for name, value in profile["headers"].items()
+                               if name.lower() == "user-agent"), "")
+            print(f"{marker} {key}  {profile.get('name', '-'):<12} {user_agent}")
+    else:
+        for name, value in load_profile(args.key, args.profiles).items():
+            print(f"{name}: {value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,315 @@
+# /// script
+# requires-python = ">=3.12"
+# dependencies = []
+# ///
+
+"""
+SQLite history of polls, observed dates and slot snapshots.
+
+Replaces the single line in latestclass.txt with a local database in WAL
+mode. Every poll is kept, indexed by (venue, category, time), so the
+previous state of a pair is a single index lookup however much history
+has built up. All writes for one poll cycle go in a single transaction
+(see HistoryStore.cycle).
+
+Also usable from the command line, for example:
+
+    python3 history_store.py first-seen 2026-10-24 --venue hough-end-leisure-centre
+    python3 history_store.py polls --venue hough-end-leisure-centre --limit 20
+"""
+
+import argparse
+import json
+import sqlite3
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+from records import DateRecord
+
+
+DEFAULT_DB_PATH = Path("history.sqlite3")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS polls (
+    id INTEGER PRIMARY KEY,
+    venue TEXT NOT NULL,
+    category TEXT NOT NULL,
+    polled_at REAL NOT NULL,
+    status TEXT NOT NULL,
+    latest_date TEXT,
+    date_count INTEGER,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS polls_by_pair_time ON polls (venue, category, polled_at);
+-- Most polls are 'unchanged' or errors; this keeps previous_latest() a single probe
+CREATE INDEX IF NOT EXISTS polls_with_latest ON polls (venue, category, polled_at)
+    WHERE latest_date IS NOT NULL;
+
+CREATE TABLE IF NOT EXISTS observed_dates (
+    venue TEXT NOT NULL,
+    category TEXT NOT NULL,
+    raw TEXT NOT NULL,
+    pretty TEXT,
+    first_seen REAL NOT NULL,
+    last_seen REAL NOT NULL,
+    present INTEGER NOT NULL DEFAULT 1,
+    PRIMARY KEY (venue, category, raw)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS observed_dates_by_raw ON observed_dates (raw, venue);
+
+CREATE TABLE IF NOT EXISTS slot_snapshots (
+    poll_id INTEGER NOT NULL REFERENCES polls (id),
+    venue TEXT NOT NULL,
+    category TEXT NOT NULL,
+    date TEXT NOT NULL,
+    captured_at REAL NOT NULL,
+    slots TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS slot_snapshots_by_pair_date
+    ON slot_snapshots (venue, category, date, captured_at);
+"""
+
+
+class HistoryStore:
+    """Poll history for every watched (venue, category) pair."""
+    
+    def __init__(self, path: Path = DEFAULT_DB_PATH):
+        self.path = path
+        # Autocommit mode: transactions are opened explicitly by cycle()
+        self.conn = sqlite3.connect(path, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+    
+    def close(self) -> None:
+        self.conn.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
+    
+    @contextmanager
+    def cycle(self):
+        """Batch every write made inside the block into one transaction."""
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield self
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        self.conn.execute("COMMIT")
+    
+    def previous_latest(self, venue: str, category: str) -> str | None:
+        """Latest date recorded by the most recent successful poll of a pair."""
+        row = self.conn.execute(
+            "SELECT latest_date FROM polls"
+            " WHERE venue = ? AND category = ? AND latest_date IS NOT NULL"
+            " ORDER BY polled_at DESC LIMIT 1",
+            (venue, category),
+        ).fetchone()
+        return row[0] if row else None
+    
+    def record_poll(self, venue: str, category: str, dates: list[DateRecord],
+                    polled_at: float | None = None) -> int:
+        """
+        Record a poll that returned a full list of dates.
+        
+        Dates seen for the first time get first_seen set; dates missing from
+        the list are marked as no longer present.
+        
+        Returns:
+            int: The id of the new poll row
+        """
+        polled_at = polled_at or time.time()
+        latest = dates[-1].raw if dates else None
+        cursor = self.conn.execute(
+            "INSERT INTO polls (venue, category, polled_at, status, latest_date, date_count)"
+            " VALUES (?, ?, ?, 'ok', ?, ?)",
+            (venue, category, polled_at, latest, len(dates)),
+        )
+        self.conn.executemany(
+            "INSERT INTO observed_dates (venue, category, raw, pretty, first_seen, last_seen)"
+            " VALUES (?, ?, ?, ?, ?, ?)"
+            " ON CONFLICT (venue, category, raw) DO UPDATE SET"
+            "   pretty = excluded.pretty, last_seen = excluded.last_seen, present = 1",
+            [(venue, category, d.raw, d.pretty, polled_at, polled_at) for d in dates],
+        )
+        self.conn.execute(
+            "UPDATE observed_dates SET present = 0"
+            " WHERE venue = ? AND category = ? AND present = 1 AND last_seen < ?",
+            (venue, category, polled_at),
+        )
+        return cursor.lastrowid
+    
+    def record_unchanged(self, venue: str, category: str,
+                         polled_at: float | None = None) -> int:
+        """Record a poll whose response was unchanged since the previous one."""
+        polled_at = polled_at or time.time()
+        cursor = self.conn.execute(
+            "INSERT INTO polls (venue, category, polled_at, status) VALUES (?, ?, ?, 'unchanged')",
+            (venue, category, polled_at),
+        )
+        self.conn.execute(
+            "UPDATE observed_dates SET last_seen = ?"
+            " WHERE venue = ? AND category = ? AND present = 1",
+            (polled_at, venue, category),
+        )
+        return cursor.lastrowid
+    
+    def record_error(self, venue: str, category: str, error: str,
+                     polled_at: float | None = None) -> int:
+        """Record a failed poll."""
+        cursor = self.conn.execute(
+            "INSERT INTO polls (venue, category, polled_at, status, error)"
+            " VALUES (?, ?, ?, 'error', ?)",
+            (venue, category, polled_at or time.time(), error),
+        )
+        return cursor.lastrowid
+    
+    def import_latest(self, venue: str, category: str, latest_date: str,
+                      polled_at: float) -> None:
+        """Seed a pair's history from a legacy latestclass.txt value."""
+        self.conn.execute(
+            "INSERT INTO polls (venue, category, polled_at, status, latest_date)"
+            " VALUES (?, ?, ?, 'imported', ?)",
+            (venue, category, polled_at, latest_date),
+        )
+    
+    def record_slots(self, venue: str, category: str, date: str,
+                     slots: list[dict], captured_at: float | None = None) -> None:
+        """Store a snapshot of the sessions on one date, linked to the pair's latest poll."""
+        row = self.conn.execute(
+            "SELECT id FROM polls WHERE venue = ? AND category = ?"
+            " ORDER BY polled_at DESC LIMIT 1",
+            (venue, category),
+        ).fetchone()
+        if row is None:
+            raise ValueError(f"No poll recorded yet for {venue}/{category}")
+        poll_id = row[0]
+        self.conn.execute(
+            "INSERT INTO slot_snapshots (poll_id, venue, category, date, captured_at, slots)"
+            " VALUES (?, ?, ?, ?, ?, ?)",
+            (poll_id, venue, category, date, captured_at or time.time(),
+             json.dumps(slots, separators=(",", ":"))),
+        )
+    
+    def latest_slots(self, venue: str, category: str, date: str) -> tuple[float, list[dict]] | None:
+        """Most recent slot snapshot for a date: (captured_at, slots)."""
+        row = self.conn.execute(
+            "SELECT captured_at, slots FROM slot_snapshots"
+            " WHERE venue = ? AND category = ? AND date = ?"
+            " ORDER BY captured_at DESC LIMIT 1",
+            (venue, category, date),
+        ).fetchone()
+        return (row[0], json.loads(row[1])) if row else None
+    
+    def has_listing(self, venue: str, category: str) -> bool:
+        """True if a full list of dates has ever been recorded for the pair."""
+        row = self.conn.execute(
+            "SELECT 1 FROM polls WHERE venue = ? AND category = ? AND status = 'ok' LIMIT 1",
+            (venue, category),
+        ).fetchone()
+        return row is not None
+    
+    def current_dates(self, venue: str, category: str) -> dict[str, str | None]:
+        """Dates present in the most recent list for a pair, raw -> pretty."""
+        rows = self.conn.execute(
+            "SELECT raw, pretty FROM observed_dates"
+            " WHERE venue = ? AND category = ? AND present = 1 ORDER BY raw",
+            (venue, category),
+        )
+        return dict(rows.fetchall())
+    
+    def first_seen(self, raw: str, venue: str | None = None) -> list[tuple]:
+        """When a date first appeared: (venue, category, first_seen, last_seen, present)."""
+        query = ("SELECT venue, category, first_seen, last_seen, present"
+                 " FROM observed_dates WHERE raw = ?")
+        params: tuple = (raw,)
+        if venue:
+            query += " AND venue = ?"
+            params += (venue,)
+        return self.conn.execute(query + " ORDER BY first_seen", params).fetchall()
+    
+    def polls(self, venue: str, category: str | None = None, since: float | None = None,
+              until: float | None = None, limit: int = 50) -> list[tuple]:
+        """Most recent polls for a venue: (polled_at, category, status, latest_date, date_count, error)."""
+        query = ("SELECT polled_at, category, status, latest_date, date_count, error"
+                 " FROM polls WHERE venue = ?")
+        params: tuple = (venue,)
+        if category:
+            query += " AND category = ?"
+            params += (category,)
+        if since is not None:
+            query += " AND polled_at >= ?"
+            params += (since,)
+        if until is not None:
+            query += " AND polled_at < ?"
+            params += (until,)
+        query += " ORDER BY polled_at DESC LIMIT ?"
+        return self.conn.execute(query, params + (limit,)).fetchall()
+
+
+def _when(timestamp: float) -> str:
+    return datetime.fromtimestamp(timestamp).isoformat(sep=" ", timespec="seconds")
+
+
+def _timestamp(text: str | None) -> float | None:
+    return datetime.fromisoformat(text).timestamp() if text else None
+
+
+def main() -> None:
+    """Query the poll history from the command line."""
+    parser = argparse.ArgumentParser(description="Query the scraper's poll history.")
+    parser.add_argument("--db", type=Path, default=DEFAULT_DB_PATH,
+                        help=f"History database (default: {DEFAULT_DB_PATH})")
+    commands = parser.add_subparsers(dest="command", required=True)
+    
+    first_seen = commands.add_parser("first-seen", help="When did a date first appear?")
+    first_seen.add_argument("date", help="Raw date, YYYY-MM-DD")
+    first_seen.add_argument("--venue")
+    
+    polls = commands.add_parser("polls", help="Recent polls for a venue")
+    polls.add_argument("--venue", required=True)
+    polls.add_argument("--category")
+    polls.add_argument("--since", help="ISO timestamp")
+    polls.add_argument("--until", help="ISO timestamp")
+    polls.add_argument("--limit", type=int, default=50)
+    
+    dates = commands.add_parser("dates", help="Dates currently listed for a venue/category")
+    dates.add_argument("--venue", required=True)
+    dates.add_argument("--category", required=True)
+    
+    args = parser.parse_args()
+    
+    with HistoryStore(args.db) as store:
+        if args.command == "first-seen":
+            rows = store.first_seen(args.date, args.venue)
+            if not rows:
+                print(f"{args.date} has never been seen.")
+            for venue, category, first, last, present in rows:
+                state = "still listed" if present else f"gone since {_when(last)}"
+                print(f"{venue} / {category}: first seen {_when(first)} ({state})")
+        
+        elif args.command == "polls":
+            rows = store.polls(args.venue, args.category, _timestamp(args.since),
+                               _timestamp(args.until), args.limit)
+            for polled_at, category, status, latest, count, error in rows:
+                if status == "error":
+                    detail = error
+                elif status == "unchanged":
+                    detail = ""
+                else:
+                    detail = f"latest={latest} dates={count}"
+                print(f"{_when(polled_at)}  {category}  {status:9}  {detail}")
+        
+        elif args.command == "dates":
+            for raw, pretty in store.current_dates(args.venue, args.category).items():
+                print(f"{raw}  {pretty or ''}")
+
+
+if __name__ == "__main__":
+    main()
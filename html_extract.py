@@ -0,0 +1,276 @@
+# /// script
+# requires-python = ">=3.12"
+# dependencies = []
+# ///
+
+"""
+Extract class dates and sessions from the booking page HTML.
+
+When the JSON API is blocked (403, or a cool-down after one), the booking
+page at bookings.better.org.uk/location/{venue}/{category} is the only
+other source. This module pulls the same records out of it as
+fetch_active_dates() returns (DateRecords, see records.py), so scrape.py
+can switch sources without the rest of the pipeline noticing.
+
+Two places are searched:
+
+- embedded state: <script type="application/json"> blobs (such as
+  __NEXT_DATA__) and "window.__SOMETHING__ = {...}" assignments in inline
+  scripts. Only lists under the keys the API and booking app use for
+  them are read: date records (dicts with a YYYY-MM-DD "raw", or "date"
+  under a "dates"-like key) and sessions (dicts with "starts_at"). Dates
+  elsewhere in the state (publish dates, metadata) are not class dates;
+- markup: elements with a data-date="YYYY-MM-DD" attribute, or
+  <time datetime="YYYY-MM-DD">, for server-rendered pages.
+
+The page is parsed incrementally with html.parser as chunks arrive. No
+DOM is built: only the text of the <script> element currently open is
+buffered, and only long enough to decode it.
+
+Also usable from the command line, on saved pages or snapshots:
+
+    python3 html_extract.py fit.html
+    python3 html_extract.py snapshots/objects/ab/abcdef....gz
+"""
+
+import argparse
+import gzip
+import json
+import re
+from datetime import date
+from html.parser import HTMLParser
+from pathlib import Path
+from typing import Iterable
+
+from records import DateRecord, SchemaDrift, SlotRecord
+
+CHUNK_SIZE = 64 * 1024
+
+ISO_DATE = re.compile(r"\d{4}-\d{2}-\d{2}")
+
+# window.__INITIAL_STATE__ = {...}  /  window.__NUXT__={...}
+STATE_ASSIGNMENT = re.compile(r"window\.__\w+__\s*=\s*")
+
+JSON_SCRIPT_TYPES = {"application/json", "application/ld+json"}
+
+WHITESPACE = re.compile(r"\s*")
+
+# An end tag every html.parser version recognises as closing a <script>
+SCRIPT_END = re.compile(r"</script\s*>", re.IGNORECASE)
+
+# Longest tail of a chunk kept back in case it is the start of SCRIPT_END
+SCRIPT_END_MAX = 64
+
+# Lists of date records: the /dates response's "data", and what the
+# booking app calls them in its page state
+DATE_LIST_KEYS = {"data", "dates", "activeDates", "active_dates", "availableDates",
+                  "available_dates"}
+
+# Lists of sessions: the /times response's "data", and the page state's names
+SESSION_LIST_KEYS = {"data", "sessions", "slots", "times", "classes"}
+
+_decoder = json.JSONDecoder()
+
+
+def pretty_date(raw: str) -> str:
+    """The API's full_date_pretty format, e.g. "Friday 17 October"."""
+    day = date.fromisoformat(raw)
+    return f"{day:%A} {day.day} {day:%B}"
+
+
+def date_record(raw: str, pretty: str | None = None) -> DateRecord:
+    """A date as the /dates endpoint would have listed it."""
+    return DateRecord.of(raw, pretty or pretty_date(raw), raw == date.today().isoformat())
+
+
+class PageExtractor(HTMLParser):
+    """
+    Incremental extractor: feed() chunks of the page, then close() and read
+    dates() and slots().
+    """
+    
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self._dates: dict[str, DateRecord] = {}
+        self._slots: dict[str, list[SlotRecord]] = {}
+        self._script: list[str] | None = None
+        self._script_is_json = False
+        # Script text taken out of the stream before html.parser saw it,
+        # and a tail that may be the start of the end tag
+        self._diverted: list[str] = []
+        self._tail = ""
+        self.blobs = 0
+    
+    def feed(self, data: str) -> None:
+        # html.parser holds an unterminated <script> back and rescans all of
+        # it on every feed, which is quadratic in the size of a large state
+        # blob. While one is open, its text goes into our own buffer
+        # instead, and the parser only sees the end tag and what follows.
+        if self._script is None:
+            super().feed(data)
+            return
+        data = self._tail + data
+        self._tail = ""
+        match = SCRIPT_END.search(data)
+        if match is None:
+            cut = data.rfind("<", max(0, len(data) - SCRIPT_END_MAX))
+            if cut != -1:
+                data, self._tail = data[:cut], data[cut:]
+            self._diverted.append(data)
+            return
+        self._diverted.append(data[:match.start()])
+        super().feed(data[match.start():])
+    
+    def close(self) -> None:
+        data, self._tail = self._tail, ""
+        super().feed(data)
+        super().close()
+    
+    def handle_starttag(self, tag: str, attrs: list[tuple[str, str | None]]) -> None:
+        if tag == "script":
+            attributes = dict(attrs)
+            if "src" not in attributes:
+                self._script = []
+                self._script_is_json = (attributes.get("type") or "").lower() in JSON_SCRIPT_TYPES
+            return
+        
+        for name, value in attrs:
+            if value and (name == "data-date" or (tag == "time" and name == "datetime")):
+                raw = value[:10]
+                if ISO_DATE.fullmatch(raw) and raw not in self._dates:
+                    try:
+                        self._dates[raw] = date_record(raw, dict(attrs).get("aria-label"))
+                    except SchemaDrift:
+                        pass  # matches the pattern but isn't a real date
+    
+    def handle_startendtag(self, tag: str, attrs: list[tuple[str, str | None]]) -> None:
+        if tag != "script":
+            self.handle_starttag(tag, attrs)
+    
+    def handle_data(self, data: str) -> None:
+        if self._script is not None:
+            self._script.append(data)
+    
+    def handle_endtag(self, tag: str) -> None:
+        if tag != "script" or self._script is None:
+            return
+        # What the parser already held when the script opened comes first
+        self._script.extend(self._diverted)
+        text = "".join(self._script)
+        self._script = None
+        self._diverted = []
+        if self._script_is_json:
+            self._load_blob(text, 0)
+        else:
+            for match in STATE_ASSIGNMENT.finditer(text):
+                self._load_blob(text, match.end())
+    
+    def _load_blob(self, text: str, start: int) -> None:
+        start = WHITESPACE.match(text, start).end()
+        try:
+            value, _ = _decoder.raw_decode(text, start)
+        except ValueError:
+            return
+        self.blobs += 1
+        self._walk(value)
+    
+    def _walk(self, value) -> None:
+        """Collect date and session records from the known lists in a decoded blob."""
+        stack = [value]
+        while stack:
+            item = stack.pop()
+            if isinstance(item, list):
+                stack.extend(v for v in item if isinstance(v, (list, dict)))
+            elif isinstance(item, dict):
+                for key, child in item.items():
+                    if isinstance(child, list):
+                        self._collect(key, child)
+                        stack.append(child)
+                    elif isinstance(child, dict):
+                        stack.append(child)
+    
+    def _collect(self, key: str, records: list) -> None:
+        is_dates = key in DATE_LIST_KEYS
+        is_sessions = key in SESSION_LIST_KEYS
+        if not (is_dates or is_sessions):
+            return
+        for record in records:
+            if not isinstance(record, dict):
+                continue
+            raw = record.get("raw") or record.get("date")
+            if not isinstance(raw, str) or not ISO_DATE.match(raw):
+                continue
+            raw = raw[:10]
+            pretty = record.get("full_date_pretty")
+            pretty = pretty if isinstance(pretty, str) else None
+            try:
+                if "starts_at" in record:
+                    if is_sessions:
+                        self._slots.setdefault(raw, []).append(SlotRecord.from_api(record))
+                elif not is_dates:
+                    continue
+                elif "raw" in record:
+                    # Already in the API's shape: keep its flags as they are
+                    self._dates[raw] = DateRecord.of(raw, pretty, record.get("today") is True)
+                elif key != "data" and raw not in self._dates:
+                    # A bare "date" only counts in a list named for dates
+                    self._dates[raw] = date_record(raw, pretty)
+            except SchemaDrift:
+                pass
+    
+    def dates(self) -> list[DateRecord]:
+        """Every date found, oldest first, like fetch_active_dates()."""
+        return [self._dates[raw] for raw in sorted(self._dates)]
+    
+    def slots(self) -> dict[str, list[SlotRecord]]:
+        """Sessions found in embedded state, by raw date."""
+        return self._slots
+
+
+def extract(chunks: Iterable[bytes | str], encoding: str = "utf-8") -> PageExtractor:
+    """Parse a page from a stream of chunks and return the finished extractor."""
+    import codecs
+    
+    decoder = codecs.getincrementaldecoder(encoding)("replace")
+    extractor = PageExtractor()
+    for chunk in chunks:
+        extractor.feed(decoder.decode(chunk) if isinstance(chunk, bytes) else chunk)
+    extractor.feed(decoder.decode(b"", final=True))
+    extractor.close()
+    return extractor
+
+
+def extract_file(path: Path) -> PageExtractor:
+    """Parse a saved page; .gz files (such as snapshot objects) are decompressed."""
+    opener = gzip.open if path.suffix == ".gz" else open
+    with opener(path, "rb") as f:
+        return extract(iter(lambda: f.read(CHUNK_SIZE), b""))
+
+
+def response_chunks(response) -> Iterable[bytes]:
+    """Body chunks of a requests response, or the whole body of one that
+    has already been read (fast_http, replay)."""
+    if hasattr(response, "iter_content"):
+        return response.iter_content(CHUNK_SIZE)
+    return [response.content]
+
+
+def main() -> None:
+    """Print the dates and sessions found in saved pages."""
+    parser = argparse.ArgumentParser(description="Extract class dates from saved booking pages.")
+    parser.add_argument("paths", type=Path, nargs="+", help="HTML files or .gz snapshot objects")
+    args = parser.parse_args()
+    
+    for path in args.paths:
+        extractor = extract_file(path)
+        print(f"{path}: {len(extractor.dates())} dates, "
+              f"{sum(map(len, extractor.slots().values()))} sessions "
+              f"({extractor.blobs} state blobs)")
+        for record in extractor.dates():
+            sessions = extractor.slots().get(record.raw, [])
+            suffix = f" - {len(sessions)} sessions" if sessions else ""
+            print(f"  {record.raw}  {record.pretty}{suffix}")
+
+
+if __name__ == "__main__":
+    main()
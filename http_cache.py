@@ -0,0 +1,103 @@
+"""
+Persistent conditional-request cache for the Better API.
+
+Each URL gets an entry on disk holding the response validators (ETag and
+Last-Modified), a SHA-256 of the body and the body itself. Later requests
+send If-None-Match / If-Modified-Since so the server can answer 304 Not
+Modified with no body at all. When the server sends no validators, the
+body hash tells us whether anything changed, so callers can still skip
+JSON decoding and change detection.
+
+Counters (hits, misses, not_modified) are persisted alongside the entries
+so they add up across scheduled runs.
+"""
+
+import hashlib
+import threading
+from pathlib import Path
+
+from state_files import read_json, write_bytes_atomic, write_json_atomic
+
+
+DEFAULT_CACHE_DIR = Path(".http_cache")
+
+
+class HttpCache:
+    """On-disk cache of validators and bodies, keyed by URL."""
+    
+    def __init__(self, directory: Path = DEFAULT_CACHE_DIR):
+        self.directory = directory
+        self._stats_file = directory / "stats.json"
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "not_modified": 0}
+        self.stats.update(read_json(self._stats_file, {}))
+    
+    def _paths(self, url: str) -> tuple[Path, Path]:
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()[:32]
+        return self.directory / f"{key}.json", self.directory / f"{key}.body"
+    
+    def _count(self, counter: str) -> None:
+        with self._lock:
+            self.stats[counter] += 1
+    
+    def get(self, session, url: str, headers: dict, timeout: float = 30) -> tuple[bytes, bool]:
+        """
+        Make a conditional GET and report whether the body changed.
+        
+        Args:
+            session: requests module or Session used to send the request
+            url: URL to fetch
+            headers: Request headers (validators are added to a copy)
+            timeout: Request timeout in seconds
+            
+        Returns:
+            tuple: (body, changed) - changed is False on a 304 or when the
+            body hash matches the cached one
+        """
+        meta_file, body_file = self._paths(url)
+        # Without a stored body a 304 would leave us with nothing to return
+        entry = read_json(meta_file, {}) if body_file.exists() else {}
+        
+        request_headers = dict(headers)
+        if entry.get("etag"):
+            request_headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            request_headers["If-Modified-Since"] = entry["last_modified"]
+        
+        response = session.get(url, headers=request_headers, timeout=timeout)
+        
+        if response.status_code == 304:
+            self._count("not_modified")
+            return body_file.read_bytes(), False
+        
+        response.raise_for_status()
+        body = response.content
+        digest = hashlib.sha256(body).hexdigest()
+        
+        new_entry = {
+            "url": url,
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "sha256": digest,
+        }
+        
+        if digest == entry.get("sha256"):
+            self._count("hits")
+            if new_entry != entry:
+                write_json_atomic(meta_file, new_entry)
+            return body, False
+        
+        self._count("misses")
+        write_bytes_atomic(body_file, body)
+        write_json_atomic(meta_file, new_entry)
+        return body, True
+    
+    def save_stats(self) -> None:
+        """Persist the counters."""
+        with self._lock:
+            write_json_atomic(self._stats_file, self.stats)
+    
+    def describe(self) -> str:
+        """One-line summary of the counters."""
+        return (f"{self.stats['hits']} hits, {self.stats['misses']} misses, "
+                f"{self.stats['not_modified']} not modified (304)")
@@ -26,7 +26,7 @@ fi
 # Update run-scraper.sh with the current directory path
 echo "Updating run-scraper.sh with current directory path..."
 sed -i "s|cd ~/mcr_fit_sniper|cd $REPO_DIR|g" "$REPO_DIR/run-scraper.sh"
-sed -i "s|>> ~/mcr_fit_sniper/scrape.log|>> $REPO_DIR/scrape.log|g" "$REPO_DIR/run-scraper.sh"
+sed -i "s|> ~/mcr_fit_sniper/last-run.log|> $REPO_DIR/last-run.log|g" "$REPO_DIR/run-scraper.sh"
 echo "✓ Updated run-scraper.sh"
 echo ""
 
@@ -48,8 +48,10 @@ if [ $? -eq 0 ]; then
     echo ""
     echo "The scraper will now run automatically every 30 minutes."
     echo ""
-    echo "To view logs:"
-    echo "  tail -f $REPO_DIR/scrape.log"
+    echo "To view logged changes and errors:"
+    echo "  python3 $REPO_DIR/event_log.py --dir $REPO_DIR/logs --since $(date +%Y-%m-%d)"
+    echo "To view the output of the last run:"
+    echo "  cat $REPO_DIR/last-run.log"
     echo ""
     echo "To check scheduled jobs:"
     echo "  termux-job-scheduler --pending"
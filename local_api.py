@@ -0,0 +1,221 @@
+"""
+Local availability API: the poller's latest state over HTTP, with changes
+pushed as server-sent events.
+
+Phones, dashboards and scripts on the same network can ask "what's
+bookable right now?" without running scrape.py or touching Better
+themselves. They read what the running poller (scrape.py --daemon
+--serve-port PORT) already knows, so any number of them add no upstream
+requests at all.
+
+    GET /availability                      every watched pair
+    GET /availability/{venue}/{category}   one pair
+    GET /events                            text/event-stream of changes
+
+JSON bodies and their ETags are rendered once, when the poller's state
+changes, so a GET only looks up bytes and compares If-None-Match (304 if
+the client is up to date). /events starts with a "snapshot" event of the
+whole state, then sends a "change" event (added and removed dates, new
+latest) the moment a poll sees one, including a pair's first listing, with a keep-alive comment every 15s.
+Event ids are state versions: a client that reconnects with a
+Last-Event-ID that is still current skips the snapshot.
+"""
+
+import hashlib
+import json
+import queue
+import threading
+import time
+
+from records import DateRecord
+
+
+KEEPALIVE_SECONDS = 15
+
+# Events a slow client may fall behind by before it is disconnected
+CLIENT_BACKLOG = 100
+
+
+def _render(data) -> tuple[bytes, str]:
+    body = json.dumps(data, separators=(",", ":")).encode("utf-8")
+    return body, '"' + hashlib.sha1(body).hexdigest()[:16] + '"'
+
+
+class Availability:
+    """
+    The latest dates per (venue, category), pre-rendered for serving, and
+    the event streams subscribed to changes.
+    """
+    
+    def __init__(self):
+        self.version = 0
+        self._pairs: dict[tuple[str, str], dict] = {}
+        # path -> (body, etag); replaced as a whole, so readers need no lock
+        self._bodies: dict[str, tuple[bytes, str]] = {
+            "/availability": _render({"version": 0, "pairs": []}),
+        }
+        self._clients: list[queue.Queue] = []
+        self._lock = threading.Lock()
+    
+    def update(self, venue: str, category: str, dates: list[DateRecord],
+               publish: bool = True) -> bool:
+        """
+        Record a poll's dates. Nothing is re-rendered or sent unless the
+        dates differ from what is already served.
+        
+        Returns:
+            bool: True if the pair's dates changed
+        """
+        listed = {d.raw: d.pretty for d in dates}
+        with self._lock:
+            previous = self._pairs.get((venue, category))
+            before = previous["dates"] if previous else {}
+            if previous is not None and before == listed:
+                return False
+            
+            latest = max(listed) if listed else None
+            self._pairs[(venue, category)] = {"dates": listed, "latest": latest,
+                                              "changed_at": time.time()}
+            self.version += 1
+            self._rebuild()
+            if publish:
+                # A pair's first listing is a change too (from nothing), so
+                # clients connected before the first poll still get it
+                self._publish("change", {
+                    "venue": venue,
+                    "category": category,
+                    "added": sorted(listed.keys() - before.keys()),
+                    "removed": sorted(before.keys() - listed.keys()),
+                    "latest": latest,
+                    "previous_latest": max(before) if before else None,
+                })
+        return True
+    
+    def _pair_json(self, venue: str, category: str) -> dict:
+        pair = self._pairs[(venue, category)]
+        return {
+            "venue": venue,
+            "category": category,
+            "latest": pair["latest"],
+            "changed_at": pair["changed_at"],
+            "dates": [{"raw": raw, "full_date_pretty": pretty}
+                      for raw, pretty in sorted(pair["dates"].items())],
+        }
+    
+    def _rebuild(self) -> None:
+        pairs = [self._pair_json(venue, category) for venue, category in self._pairs]
+        bodies = {f"/availability/{p['venue']}/{p['category']}": _render(p) for p in pairs}
+        bodies["/availability"] = _render({"version": self.version, "pairs": pairs})
+        self._bodies = bodies
+    
+    def get(self, path: str) -> tuple[bytes, str] | None:
+        """Pre-rendered body and ETag for a path, or None."""
+        return self._bodies.get(path.rstrip("/"))
+    
+    def _publish(self, event: str, data: dict) -> None:
+        message = self._message(event, data)
+        for client in list(self._clients):
+            try:
+                client.put_nowait(message)
+            except queue.Full:
+                # Too far behind: end its stream; it will reconnect and resync
+                self._clients.remove(client)
+                with client.mutex:
+                    client.queue.clear()
+                client.put_nowait(None)
+    
+    def _message(self, event: str, data: dict) -> bytes:
+        return (f"id: {self.version}\nevent: {event}\n"
+                f"data: {json.dumps(data, separators=(',', ':'))}\n\n").encode("utf-8")
+    
+    def subscribe(self, last_event_id: str | None = None) -> queue.Queue:
+        """
+        A queue of encoded events for one stream, starting with a snapshot
+        unless last_event_id is the current version. None means the stream
+        should close.
+        """
+        client = queue.Queue(CLIENT_BACKLOG)
+        with self._lock:
+            if last_event_id != str(self.version):
+                body, _ = self._bodies["/availability"]
+                client.put_nowait(self._message("snapshot", json.loads(body)))
+            self._clients.append(client)
+        return client
+    
+    def unsubscribe(self, client: queue.Queue) -> None:
+        with self._lock:
+            if client in self._clients:
+                self._clients.remove(client)
+    
+    @property
+    def client_count(self) -> int:
+        return len(self._clients)
+
+
+def serve_availability(availability: Availability, port: int, host: str = "127.0.0.1"):
+    """
+    Serve the availability API on a background thread; each client
+    (including each event stream) gets its own thread.
+    
+    Returns:
+        The running server; call shutdown() to stop it
+    """
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        
+        def do_GET(self):
+            path = self.path.split("?")[0]
+            if path == "/events":
+                self._stream()
+                return
+            found = availability.get(path)
+            if found is None:
+                self.send_error(404)
+                return
+            body, etag = found
+            if self.headers.get("If-None-Match") == etag:
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("ETag", etag)
+            self.send_header("Cache-Control", "no-cache")
+            self.end_headers()
+            self.wfile.write(body)
+        
+        def _stream(self):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Cache-Control", "no-cache")
+            self.end_headers()
+            self.close_connection = True
+            client = availability.subscribe(self.headers.get("Last-Event-ID"))
+            try:
+                self.wfile.write(b"retry: 5000\n\n")
+                self.wfile.flush()
+                while True:
+                    try:
+                        message = client.get(timeout=KEEPALIVE_SECONDS)
+                    except queue.Empty:
+                        message = b": keep-alive\n\n"
+                    if message is None:
+                        return
+                    self.wfile.write(message)
+                    self.wfile.flush()
+            except OSError:
+                pass  # the client went away
+            finally:
+                availability.unsubscribe(client)
+        
+        def log_message(self, format, *args):
+            pass
+    
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="availability", daemon=True).start()
+    return server
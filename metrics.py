@@ -0,0 +1,232 @@
+"""
+Per-phase latency instrumentation for the poll hot path.
+
+Each phase of a poll (DNS, connect, TLS, wait for the server, read,
+decode, save, notify, ...) is timed with the monotonic clock and recorded per venue.
+Metrics keeps a rolling window of recent samples for every (phase, venue)
+so p50/p95/p99 reflect current behaviour rather than the whole run, plus
+running counts and sums. The numbers can be appended to a JSON-lines file
+after every cycle or scraped from a Prometheus text endpoint.
+
+InstrumentedSession wraps any session-like object (see transport.py) and
+splits each request into dns, connect, tls, wait and read where the
+response says how long they took. profile_cycle() writes cProfile and tracemalloc
+output for one cycle.
+"""
+
+import re
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from pathlib import Path
+
+
+PROMETHEUS_PREFIX = "mcr_fit_sniper"
+QUANTILES = (50, 95, 99)
+
+_VENUE_IN_URL = re.compile(r"/(?:venue|location)/([^/]+)/")
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+class Metrics:
+    """Rolling per-(phase, venue) timings. Safe to use from worker threads."""
+    
+    def __init__(self, window: int = 1024):
+        self.window = window
+        self._samples: dict[tuple[str, str], deque] = {}
+        self._counts: dict[tuple[str, str], int] = defaultdict(int)
+        self._sums: dict[tuple[str, str], float] = defaultdict(float)
+        self._cycle: dict[str, float] = defaultdict(float)
+        self._lock = threading.Lock()
+    
+    def observe(self, phase: str, seconds: float, venue: str = "") -> None:
+        """Record one timing."""
+        key = (phase, venue)
+        with self._lock:
+            samples = self._samples.get(key)
+            if samples is None:
+                samples = self._samples[key] = deque(maxlen=self.window)
+            samples.append(seconds)
+            self._counts[key] += 1
+            self._sums[key] += seconds
+            self._cycle[phase] += seconds
+    
+    @contextmanager
+    def phase(self, name: str, venue: str = ""):
+        """Time the body of a with block as one sample of a phase."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, venue)
+    
+    def end_cycle(self) -> dict[str, float]:
+        """Return the seconds spent in each phase since the last call, summed
+        over venues, and start counting a new cycle."""
+        with self._lock:
+            cycle, self._cycle = dict(self._cycle), defaultdict(float)
+        return cycle
+    
+    def summary(self) -> list[dict]:
+        """Count, sum and rolling percentiles (in ms) for every (phase, venue)."""
+        with self._lock:
+            keys = sorted(self._samples)
+            windows = {key: list(self._samples[key]) for key in keys}
+            counts = dict(self._counts)
+            sums = dict(self._sums)
+        rows = []
+        for phase, venue in keys:
+            samples = windows[(phase, venue)]
+            row = {"phase": phase, "venue": venue, "count": counts[(phase, venue)],
+                   "sum_ms": round(sums[(phase, venue)] * 1000, 3)}
+            for pct in QUANTILES:
+                row[f"p{pct}_ms"] = round(percentile(samples, pct) * 1000, 3)
+            rows.append(row)
+        return rows
+    
+    def write_jsonl(self, path: Path, cycle: dict[str, float]) -> None:
+        """Append one line: this cycle's phase totals and the rolling summary."""
+        import json
+        from datetime import datetime
+        
+        record = {
+            "at": datetime.now().isoformat(timespec="seconds"),
+            "cycle_ms": {phase: round(seconds * 1000, 3) for phase, seconds in cycle.items()},
+            "phases": self.summary(),
+        }
+        with path.open("a", encoding="utf-8") as f:
+            f.write(json.dumps(record, separators=(",", ":")) + "\n")
+    
+    def render_prometheus(self) -> str:
+        """The summary in Prometheus text exposition format."""
+        name = f"{PROMETHEUS_PREFIX}_phase_seconds"
+        lines = [f"# HELP {name} Time spent in each poll phase.",
+                 f"# TYPE {name} summary"]
+        for row in self.summary():
+            labels = f'phase="{row["phase"]}",venue="{row["venue"]}"'
+            for pct in QUANTILES:
+                lines.append(f'{name}{{{labels},quantile="{pct / 100:g}"}} '
+                             f'{row[f"p{pct}_ms"] / 1000:g}')
+            lines.append(f"{name}_sum{{{labels}}} {row['sum_ms'] / 1000:g}")
+            lines.append(f"{name}_count{{{labels}}} {row['count']}")
+        return "\n".join(lines) + "\n"
+
+
+def describe_cycle(cycle: dict[str, float]) -> str:
+    """One-line summary of where a cycle's time went."""
+    return ", ".join(f"{phase} {seconds * 1000:.0f} ms" for phase, seconds in cycle.items())
+
+
+def serve_prometheus(metrics: Metrics, port: int, host: str = "127.0.0.1"):
+    """
+    Serve metrics.render_prometheus() at /metrics on a background thread.
+    
+    Returns:
+        The running server; call shutdown() to stop it
+    """
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = metrics.render_prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        
+        def log_message(self, format, *args):
+            pass
+    
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+    return server
+
+
+class InstrumentedSession:
+    """
+    Time every get() of a wrapped session, per venue.
+    
+    fast_http responses carry a timings dict, which is recorded phase by
+    phase: dns, connect (TCP only) and tls for a new connection, connect
+    (near zero) for a reused one, then wait and read. requests responses
+    only know the time to the response headers (elapsed), which is
+    recorded as wait.
+    """
+    
+    def __init__(self, session, metrics: Metrics):
+        self.session = session
+        self.metrics = metrics
+    
+    def get(self, url: str, headers: dict | None = None, timeout: float | None = None):
+        match = _VENUE_IN_URL.search(url)
+        venue = match.group(1) if match else ""
+        started = time.perf_counter()
+        response = self.session.get(url, headers=headers, timeout=timeout)
+        self.metrics.observe("http", time.perf_counter() - started, venue)
+        
+        timings = getattr(response, "timings", None)
+        if timings:
+            for phase, seconds in timings.items():
+                self.metrics.observe(phase, seconds, venue)
+        elif getattr(response, "elapsed", None) is not None:
+            self.metrics.observe("wait", response.elapsed.total_seconds(), venue)
+        return response
+    
+    def close(self) -> None:
+        self.session.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
+
+
+@contextmanager
+def profile_cycle(prefix: Path, top: int = 30):
+    """
+    Run the body under cProfile and tracemalloc.
+    
+    Writes prefix.prof (pstats, open with python -m pstats or snakeviz) and
+    prefix.txt (top functions by cumulative time and top allocations).
+    """
+    import cProfile
+    import io
+    import pstats
+    import tracemalloc
+    
+    profiler = cProfile.Profile()
+    tracemalloc.start()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        snapshot = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        
+        prof_file = prefix.with_name(prefix.name + ".prof")
+        text_file = prefix.with_name(prefix.name + ".txt")
+        profiler.dump_stats(prof_file)
+        
+        report = io.StringIO()
+        pstats.Stats(profiler, stream=report).sort_stats("cumulative").print_stats(top)
+        report.write(f"\nPeak traced memory: {peak / 1024:.1f} KiB\n")
+        report.write(f"Top {top} allocations by line:\n")
+        for stat in snapshot.statistics("lineno")[:top]:
+            report.write(f"  {stat}\n")
+        text_file.write_text(report.getvalue(), encoding="utf-8")
+        print(f"\nProfile written to {prof_file} and {text_file}")
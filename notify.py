@@ -0,0 +1,261 @@
+"""
+Non-blocking notification dispatcher with coalescing, dedupe and retries.
+
+Detection code calls NotificationDispatcher.submit(), which only puts the
+alert on a queue. A background thread collects alerts for a short window
+and coalesces them (12 new dates across 4 venues become one notification),
+drops alerts already sent recently, and delivers to every sink, retrying
+failures with exponential backoff. A slow or broken Termux:API call can no
+longer stall a poll or raise out of main() after state has been written.
+
+Sinks: TermuxSink (termux-notification), WebhookSink (JSON POST) and
+StdoutSink.
+"""
+
+import heapq
+import itertools
+import json
+import os
+import queue
+import threading
+import time
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True, slots=True)
+class Alert:
+    """One thing worth telling the user about."""
+    venue: str
+    category: str
+    title: str
+    message: str
+    key: str  # alerts with the same key are only sent once per dedupe window
+    dates: tuple[str, ...] = ()  # raw dates the alert is about, for subscriber filters
+
+
+def is_termux() -> bool:
+    """
+    Check if the script is running in Termux environment.
+    
+    Returns:
+        bool: True if running in Termux, False otherwise
+    """
+    # Check for TERMUX_VERSION environment variable
+    if os.environ.get("TERMUX_VERSION"):
+        return True
+    else:
+        return False
+
+
+def send_termux_notification(title: str, content: str) -> bool:
+    """
+    Send a notification via Termux if available.
+    
+    Args:
+        title: The notification title
+        content: The notification content
+    
+    Returns:
+        bool: True if notification was sent successfully, False otherwise
+    """
+    if not is_termux():
+        return False
+    
+    import subprocess
+    
+    subprocess.run(
+            ["termux-notification", "--title", title, "--content", content],
+            check=True,
+            capture_output=True,
+            timeout=5
+        )
+    
+    return True
+
+
+class TermuxSink:
+    """Android notification through Termux:API."""
+    name = "termux"
+    
+    def send(self, title: str, content: str) -> None:
+        send_termux_notification(title, content)
+
+
+class WebhookSink:
+    """POST {"title": ..., "content": ...} as JSON to a URL."""
+    name = "webhook"
+    
+    def __init__(self, url: str, timeout: float = 5):
+        self.url = url
+        self.timeout = timeout
+    
+    def send(self, title: str, content: str) -> None:
+        import urllib.request
+        
+        body = json.dumps({"title": title, "content": content}).encode("utf-8")
+        request = urllib.request.Request(self.url, data=body, method="POST",
+                                         headers={"Content-Type": "application/json"})
+        # urlopen raises HTTPError (an OSError) for non-2xx responses
+        with urllib.request.urlopen(request, timeout=self.timeout):
+            pass
+
+
+class StdoutSink:
+    """Print notifications; handy when testing or running headless."""
+    name = "stdout"
+    
+    def __init__(self, label: str | None = None):
+        self.prefix = f"[{label}] " if label else ""
+    
+    def send(self, title: str, content: str) -> None:
+        print(f"🔔 {self.prefix}{title}: {content}")
+
+
+def build_sinks(names: list[str], webhook_url: str | None = None,
+                label: str | None = None) -> list:
+    """Create sinks by name. The Termux sink is skipped outside Termux.
+    label marks stdout output, e.g. with a subscriber's name."""
+    sinks = []
+    for name in names:
+        if name == "termux":
+            if is_termux():
+                sinks.append(TermuxSink())
+        elif name == "stdout":
+            sinks.append(StdoutSink(label))
+        elif name == "webhook":
+            if not webhook_url:
+                raise ValueError("The webhook sink needs a webhook URL")
+            sinks.append(WebhookSink(webhook_url))
+        else:
+            raise ValueError(f"Unknown notification sink: {name}")
+    return sinks
+
+
+def coalesce(alerts: list[Alert]) -> tuple[str, str]:
+    """Merge a burst of alerts into one (title, content)."""
+    if len(alerts) == 1:
+        return alerts[0].title, alerts[0].message
+    venues = {alert.venue for alert in alerts}
+    title = f"{len(alerts)} class date alerts across {len(venues)} venue(s)"
+    return title, "\n".join(alert.message for alert in alerts)
+
+
+_WAKE = object()
+
+
+class NotificationDispatcher:
+    """Deliver alerts on a background thread; see the module docstring."""
+    
+    def __init__(self, sinks: list, coalesce_window: float = 2.0,
+                 dedupe_ttl: float = 6 * 3600, max_attempts: int = 4,
+                 retry_delay: float = 2.0):
+        self.sinks = sinks
+        self.coalesce_window = coalesce_window
+        self.dedupe_ttl = dedupe_ttl
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.stats = {"submitted": 0, "deduped": 0, "sent": 0, "retried": 0, "failed": 0}
+        
+        self._queue: queue.Queue = queue.Queue()
+        self._retries: list[tuple] = []
+        self._sequence = itertools.count()
+        # key -> when it was submitted, oldest first (see _forget_expired)
+        self._seen: dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="notifier", daemon=True)
+        self._thread.start()
+    
+    def submit(self, alert: Alert) -> bool:
+        """
+        Queue an alert for delivery without blocking.
+        
+        Returns:
+            bool: False if the alert was dropped as a recent duplicate
+        """
+        now = time.monotonic()
+        with self._lock:
+            self._forget_expired(now)
+            if alert.key in self._seen:
+                self.stats["deduped"] += 1
+                return False
+            self._seen[alert.key] = now
+            self.stats["submitted"] += 1
+        self._queue.put(alert)
+        return True
+    
+    def _forget_expired(self, now: float) -> None:
+        # Keys are only added once expired ones are gone, so insertion order
+        # is submission order and expired keys are always at the front
+        while self._seen:
+            key = next(iter(self._seen))
+            if now - self._seen[key] < self.dedupe_ttl:
+                break
+            del self._seen[key]
+    
+    def close(self, timeout: float = 15) -> None:
+        """Deliver anything pending (skipping the coalesce window), then stop.
+        Waits at most timeout seconds for deliveries and retries."""
+        self._stopping.set()
+        self._queue.put(_WAKE)
+        self._thread.join(timeout)
+    
+    def _next_retry_in(self) -> float | None:
+        if not self._retries:
+            return None
+        return max(0.0, self._retries[0][0] - time.monotonic())
+    
+    def _run(self) -> None:
+        while True:
+            if self._stopping.is_set() and self._queue.empty() and not self._retries:
+                return
+            try:
+                item = self._queue.get(timeout=self._next_retry_in())
+            except queue.Empty:
+                item = _WAKE
+            
+            if item is not _WAKE:
+                self._deliver([item] + self._collect())
+            self._run_due_retries()
+    
+    def _collect(self) -> list[Alert]:
+        """Gather more alerts until the coalesce window closes."""
+        batch = []
+        deadline = time.monotonic() + self.coalesce_window
+        while True:
+            remaining = 0 if self._stopping.is_set() else deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                return batch
+            if item is not _WAKE:
+                batch.append(item)
+    
+    def _deliver(self, batch: list[Alert]) -> None:
+        title, content = coalesce(batch)
+        for sink in self.sinks:
+            self._attempt(sink, title, content, attempt=1)
+    
+    def _attempt(self, sink, title: str, content: str, attempt: int) -> None:
+        try:
+            sink.send(title, content)
+        except Exception as e:
+            if attempt < self.max_attempts:
+                due = time.monotonic() + self.retry_delay * 2 ** (attempt - 1)
+                heapq.heappush(self._retries, (due, next(self._sequence), sink, title,
+                                               content, attempt + 1))
+                with self._lock:
+                    self.stats["retried"] += 1
+            else:
+                with self._lock:
+                    self.stats["failed"] += 1
+                print(f"✗ {sink.name} notification failed after {attempt} attempts: {e}")
+            return
+        with self._lock:
+            self.stats["sent"] += 1
+    
+    def _run_due_retries(self) -> None:
+        now = time.monotonic()
+        while self._retries and self._retries[0][0] <= now:
+            _, _, sink, title, content, attempt = heapq.heappop(self._retries)
+            self._attempt(sink, title, content, attempt)
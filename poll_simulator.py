@@ -0,0 +1,492 @@
+# /// script
+# requires-python = ">=3.12"
+# dependencies = []
+# ///
+
+"""
+Polling-strategy simulator: replay recorded /dates history under
+different schedules and compare how soon each sees new dates, and at what
+cost.
+
+A timeline is the sequence of distinct listings a pair's /dates endpoint
+returned, each with the time it was first seen. It comes from one of:
+
+- a fixture archive written by scrape.py --transport record (every
+  recorded /dates response, per venue);
+- the poll history database (when each date was first and last seen);
+- --synthetic DAYS: a generated timeline with one release a day around
+  07:00, for trying strategies before much history has been recorded.
+
+A recorded timeline only knows when the recorder saw each change, so its
+release times are upper bounds: record with a short interval.
+
+Strategies:
+
+    fixed:SECONDS                       every SECONDS, from a random phase
+    jitter:SECONDS:FRACTION             intervals uniform in SECONDS * (1 ± FRACTION)
+    windows:BASE:FAST:HH:MM-HH:MM[,...] FAST inside the windows (local time), BASE elsewhere
+    learned:BASE:FAST                   windows learned by scheduler.ReleaseModel from
+                                        the timeline's own releases (in-sample)
+
+A poll sees a release if it is the first poll at or after it; that is
+the poll in which report_dates() gets a DateAdded. Polls are never
+stepped through one at a time: each strategy's poll times are generated
+in one batch (running sums of its intervals, or a one-day template
+repeated across the days), and each release and each listing is matched
+to its first poll with a binary search. Bytes count the full body for
+the first poll of each listing and a 304 for the rest, as with the
+conditional-request cache, plus headers for every request.
+
+--verify N pushes the first N polls of every strategy through the real
+DateDiffer and save_latest_date, against an in-memory history database,
+and checks that they detect the same releases in the same polls.
+
+    python3 poll_simulator.py --synthetic 120 fixed:1800 fixed:300 jitter:600:0.3 \\
+        windows:1800:10:06:45-07:45 learned:1800:10
+    python3 poll_simulator.py --fixtures fixtures.jsonl.gz fixed:1800 fixed:60
+    python3 poll_simulator.py --db history.sqlite3 fixed:1800 learned:1800:30
+"""
+
+import argparse
+import json
+import math
+import random
+import re
+import time
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from itertools import accumulate, repeat
+from pathlib import Path
+
+from metrics import percentile
+from records import DateRecord, SchemaDrift, decode_dates
+
+
+DAY = 86400
+
+# Request and response headers of one poll; a 304 is nothing else
+HEADER_BYTES = 700
+
+_DATES_URL = re.compile(r"/venue/([^/]+)/activity-category/([^/]+)/dates")
+
+
+@dataclass
+class Timeline:
+    """Successive listings of one (venue, category), with when each was first seen."""
+    venue: str
+    category: str
+    start: float
+    end: float
+    times: list[float] = field(default_factory=list)
+    listings: list[tuple[str, ...]] = field(default_factory=list)
+    sizes: list[int] = field(default_factory=list)  # body bytes of each listing
+    
+    def add(self, at: float, listing: tuple[str, ...], size: int) -> None:
+        if not self.listings or listing != self.listings[-1]:
+            self.times.append(at)
+            self.listings.append(listing)
+            self.sizes.append(size)
+    
+    def releases(self) -> list[float]:
+        """Times of the listings that added at least one date."""
+        return [self.times[i] for i in range(1, len(self.listings))
+                if not set(self.listings[i]) <= set(self.listings[i - 1])]
+    
+    def listing_at(self, when: float) -> tuple[str, ...]:
+        return self.listings[max(0, bisect_right(self.times, when) - 1)]
+
+
+def body_size(raws: tuple[str, ...]) -> int:
+    """Size of a /dates body listing these dates, in the API's own format."""
+    return len(json.dumps({"data": [
+        {"raw": raw, "full_date_pretty": pretty_date(raw), "today": False} for raw in raws
+    ]}))
+
+
+def pretty_date(raw: str) -> str:
+    day = date.fromisoformat(raw)
+    return f"{day:%A} {day.day} {day:%B}"
+
+
+def load_fixtures(path: Path) -> list[Timeline]:
+    """Timelines from the /dates responses in a fixture archive."""
+    from transport import read_fixtures, record_body
+    
+    responses: dict[tuple[str, str], list[tuple[float, bytes]]] = {}
+    for record in read_fixtures(path):
+        match = _DATES_URL.search(record.get("url", ""))
+        if match and record.get("status") == 200:
+            responses.setdefault(match.groups(), []).append((record["at"], record_body(record)))
+    
+    timelines = []
+    for (venue, category), recorded in responses.items():
+        recorded.sort(key=lambda response: response[0])
+        timeline = Timeline(venue, category, recorded[0][0], recorded[-1][0])
+        for at, body in recorded:
+            try:
+                listing = tuple(d.raw for d in decode_dates(body))
+            except SchemaDrift:
+                continue
+            timeline.add(at, listing, len(body))
+        timelines.append(timeline)
+    return timelines
+
+
+def load_history(path: Path) -> list[Timeline]:
+    """
+    Timelines rebuilt from the history database. A date joins the listing
+    at its first_seen; one no longer listed leaves at the first poll after
+    its last_seen.
+    """
+    from history_store import HistoryStore
+    
+    timelines = []
+    with HistoryStore(path) as store:
+        pairs = store.conn.execute(
+            "SELECT DISTINCT venue, category FROM polls WHERE status = 'ok'").fetchall()
+        for venue, category in pairs:
+            polled = [row[0] for row in store.conn.execute(
+                "SELECT polled_at FROM polls WHERE venue = ? AND category = ?"
+                " AND status IN ('ok', 'unchanged') ORDER BY polled_at", (venue, category))]
+            spans = []
+            for raw, first_seen, last_seen, present in store.conn.execute(
+                    "SELECT raw, first_seen, last_seen, present FROM observed_dates"
+                    " WHERE venue = ? AND category = ?", (venue, category)):
+                gone = bisect_right(polled, last_seen)
+                left = math.inf if present or gone == len(polled) else polled[gone]
+                spans.append((raw, first_seen, left))
+            
+            timeline = Timeline(venue, category, polled[0], polled[-1])
+            changes = sorted({t for _, first, left in spans for t in (first, left)
+                              if t != math.inf})
+            for at in changes:
+                listing = tuple(sorted(raw for raw, first, left in spans if first <= at < left))
+                timeline.add(max(at, timeline.start), listing, body_size(listing))
+            timelines.append(timeline)
+    return timelines
+
+
+def synthetic_timeline(days: int, seed: int = 0, release_minute: float = 7 * 60,
+                       spread_minutes: float = 20, horizon: int = 14) -> Timeline:
+    """
+    days of a venue that lists the next horizon days: each day's date
+    drops off at midnight, and a new one is released at about
+    release_minute past midnight (normal, spread_minutes).
+    """
+    rng = random.Random(seed)
+    first = date.today() - timedelta(days=days)
+    midnight = datetime.combine(first, datetime.min.time()).timestamp()
+    timeline = Timeline("synthetic-venue", "fitness-classes-c", midnight, midnight + days * DAY)
+    
+    def listing(start: date, count: int) -> tuple[str, ...]:
+        return tuple((start + timedelta(days=i)).isoformat() for i in range(count))
+    
+    for day in range(days):
+        today = first + timedelta(days=day)
+        midnight = datetime.combine(today, datetime.min.time()).timestamp()
+        before = listing(today, horizon)
+        timeline.add(midnight, before, body_size(before))
+        release = midnight + max(0.0, rng.gauss(release_minute, spread_minutes)) * 60
+        after = listing(today, horizon + 1)
+        timeline.add(release, after, body_size(after))
+    return timeline
+
+
+@dataclass
+class Strategy:
+    """A polling schedule; poll_times() generates all of its polls at once."""
+    name: str
+    kind: str
+    interval: float
+    fast: float = 0
+    jitter: float = 0
+    windows: list[tuple[int, int]] = field(default_factory=list)  # minutes after midnight
+    
+    def poll_times(self, start: float, end: float, rng: random.Random) -> list[float]:
+        if self.kind == "fixed":
+            phase = rng.uniform(0, self.interval)
+            count = int((end - start - phase) // self.interval) + 1
+            return list(accumulate(repeat(self.interval, count - 1), initial=start + phase))
+        if self.kind == "jitter":
+            low, high = self.interval * (1 - self.jitter), self.interval * (1 + self.jitter)
+            count = int((end - start) // low) + 1
+            polls = list(accumulate((rng.uniform(low, high) for _ in range(count)),
+                                    initial=start + rng.uniform(0, self.interval)))
+            return polls[:bisect_right(polls, end)]
+        return self._windowed_times(start, end, rng)
+    
+    def _windowed_times(self, start: float, end: float, rng: random.Random) -> list[float]:
+        # Offsets of one day's polls, repeated from each local midnight
+        template = []
+        position = 0.0
+        for window_start, window_end in self.windows + [(DAY // 60, DAY // 60)]:
+            while position < window_start * 60:
+                template.append(position)
+                position += self.interval
+            position = window_start * 60
+            while position < window_end * 60:
+                template.append(position)
+                position += self.fast
+        
+        day = datetime.fromtimestamp(start).date()
+        polls = []
+        while True:
+            midnight = datetime.combine(day, datetime.min.time()).timestamp()
+            if midnight > end:
+                break
+            polls.extend(map(midnight.__add__, template))
+            day += timedelta(days=1)
+        return polls[bisect_left(polls, start):bisect_right(polls, end)]
+
+
+def normalise_windows(windows: list[tuple[int, int]]) -> list[tuple[int, int]]:
+    """Sorted, merged windows within one day; ones past midnight are split."""
+    minutes = DAY // 60
+    pieces = []
+    for start, end in windows:
+        if end - start >= minutes:
+            return [(0, minutes)]
+        start, end = start % minutes, start % minutes + (end - start)
+        pieces.extend([(start, minutes), (0, end - minutes)] if end > minutes else [(start, end)])
+    merged: list[tuple[int, int]] = []
+    for start, end in sorted(pieces):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def parse_clock(text: str) -> int:
+    hours, minutes = text.split(":")
+    return int(hours) * 60 + int(minutes)
+
+
+def learned_windows(timelines: list[Timeline]) -> list[tuple[int, int]]:
+    """Release windows ReleaseModel would predict from the timelines' releases."""
+    import os
+    
+    from scheduler import ReleaseModel
+    
+    model = ReleaseModel(Path(os.devnull), max_events=10 ** 9)
+    for timeline in timelines:
+        for released in timeline.releases():
+            model.record_change(timeline.venue, timeline.category,
+                                datetime.fromtimestamp(released))
+    return model.windows()
+
+
+def parse_strategy(text: str, timelines: list[Timeline]) -> Strategy:
+    """A Strategy from its command-line form (see the module docstring)."""
+    kind, _, rest = text.partition(":")
+    params = rest.split(":", 2) if rest else []
+    strategy = None
+    try:
+        if kind == "fixed" and len(params) == 1:
+            strategy = Strategy(text, kind, float(params[0]))
+        elif kind == "jitter" and len(params) == 2:
+            strategy = Strategy(text, kind, float(params[0]), jitter=float(params[1]))
+        elif kind == "windows" and len(params) == 3:
+            windows = []
+            for span in params[2].split(","):
+                start, end = span.split("-")
+                windows.append((parse_clock(start), parse_clock(end)))
+            strategy = Strategy(text, kind, float(params[0]), float(params[1]),
+                                windows=normalise_windows(windows))
+        elif kind == "learned" and len(params) == 2:
+            strategy = Strategy(text, kind, float(params[0]), float(params[1]),
+                                windows=normalise_windows(learned_windows(timelines)))
+    except ValueError:
+        pass
+    if strategy is None:
+        raise ValueError(f"Unrecognised strategy: {text!r}")
+    
+    # A zero or negative interval would never advance the poll times
+    if not strategy.interval > 0:
+        raise ValueError(f"Interval must be more than 0 seconds: {text!r}")
+    if kind in ("windows", "learned") and not strategy.fast > 0:
+        raise ValueError(f"Fast interval must be more than 0 seconds: {text!r}")
+    if kind == "jitter" and not 0 <= strategy.jitter < 1:
+        raise ValueError(f"Jitter fraction must be at least 0 and less than 1: {text!r}")
+    return strategy
+
+
+@dataclass
+class Result:
+    """What one strategy costs and how soon it sees releases, over every timeline."""
+    strategy: Strategy
+    requests: int = 0
+    bytes: int = 0
+    latencies: list[float] = field(default_factory=list)
+    missed: int = 0
+    days: float = 0
+
+
+def evaluate(timeline: Timeline, polls: list[float], result: Result) -> None:
+    """Add one timeline's detection latencies, requests and bytes to result."""
+    polls = polls[bisect_left(polls, timeline.start):bisect_right(polls, timeline.end)]
+    if not polls:
+        return
+    
+    # Releases before the first poll are part of its baseline
+    for released in timeline.releases():
+        if released <= polls[0]:
+            continue
+        i = bisect_left(polls, released)
+        if i == len(polls):
+            result.missed += 1
+        else:
+            result.latencies.append(polls[i] - released)
+    
+    # The first poll of each listing downloads it; the rest get a 304
+    bounds = timeline.times[1:] + [math.inf]
+    for seen, until, size in zip(timeline.times, bounds, timeline.sizes):
+        i = bisect_left(polls, seen)
+        if i < len(polls) and polls[i] < until:
+            result.bytes += size
+    result.requests += len(polls)
+    result.bytes += len(polls) * HEADER_BYTES
+    result.days += (polls[-1] - polls[0]) / DAY
+
+
+def detections(timeline: Timeline, polls: list[float]) -> list[float]:
+    """The polls in which evaluate() counts a release as seen."""
+    polls = polls[bisect_left(polls, timeline.start):bisect_right(polls, timeline.end)]
+    return sorted({polls[i] for released in timeline.releases()
+                   if polls and released > polls[0]
+                   and (i := bisect_left(polls, released)) < len(polls)})
+
+
+def verify(timeline: Timeline, polls: list[float], limit: int) -> tuple[int, bool]:
+    """
+    Push the first limit polls through DateDiffer and save_latest_date.
+    
+    Returns:
+        tuple: (number of polls in which the real logic saw new dates,
+        whether they are exactly the polls evaluate() counts)
+    """
+    from date_diff import DateAdded, DateDiffer
+    from history_store import HistoryStore
+    from scrape import save_latest_date
+    
+    polls = polls[bisect_left(polls, timeline.start):bisect_right(polls, timeline.end)][:limit]
+    seen = []
+    with HistoryStore(Path(":memory:")) as store:
+        differ = DateDiffer(store)
+        for polled in polls:
+            dates = [DateRecord.of(raw) for raw in timeline.listing_at(polled)]
+            with store.cycle():
+                events, is_baseline = differ.diff(timeline.venue, timeline.category, dates)
+                save_latest_date(store, dates, timeline.venue, timeline.category)
+            if not is_baseline and any(isinstance(e, DateAdded) for e in events):
+                seen.append(polled)
+    return len(seen), seen == detections(timeline, polls)
+
+
+def simulate(timelines: list[Timeline], strategies: list[Strategy],
+             seed: int = 0) -> list[Result]:
+    """Every strategy over every timeline, polling all pairs at the same times."""
+    start = min(timeline.start for timeline in timelines)
+    end = max(timeline.end for timeline in timelines)
+    results = []
+    for strategy in strategies:
+        polls = strategy.poll_times(start, end, random.Random(seed))
+        result = Result(strategy)
+        for timeline in timelines:
+            evaluate(timeline, polls, result)
+        results.append(result)
+    return results
+
+
+def format_duration(seconds: float) -> str:
+    if seconds < 120:
+        return f"{seconds:.0f}s"
+    if seconds < 7200:
+        return f"{seconds / 60:.1f}m"
+    return f"{seconds / 3600:.1f}h"
+
+
+def describe_results(results: list[Result]) -> list[str]:
+    """A table: cost and detection latency percentiles per strategy."""
+    lines = [f"{'strategy':<32} {'requests':>9} {'req/day':>8} {'MiB':>8} "
+             f"{'p50':>7} {'p90':>7} {'p99':>7} {'max':>7} {'missed':>6}"]
+    for result in results:
+        per_day = result.requests / result.days if result.days else 0
+        if result.latencies:
+            latency = " ".join(f"{format_duration(percentile(result.latencies, pct)):>7}"
+                               for pct in (50, 90, 99, 100))
+        else:
+            latency = " ".join(f"{'-':>7}" for _ in range(4))
+        lines.append(f"{result.strategy.name[:32]:<32} {result.requests:>9} {per_day:>8.0f} "
+                     f"{result.bytes / 1024 / 1024:>8.2f} {latency} {result.missed:>6}")
+    return lines
+
+
+def main() -> None:
+    """Simulate the strategies given on the command line and print a table."""
+    parser = argparse.ArgumentParser(
+        description="Compare polling strategies on recorded or synthetic /dates history.")
+    parser.add_argument("strategies", nargs="+", metavar="STRATEGY",
+                        help="fixed:SECONDS, jitter:SECONDS:FRACTION, "
+                             "windows:BASE:FAST:HH:MM-HH:MM[,...] or learned:BASE:FAST")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--fixtures", type=Path, help="Fixture archive from --transport record")
+    source.add_argument("--db", type=Path, help="Poll history database")
+    source.add_argument("--synthetic", type=int, metavar="DAYS",
+                        help="Generate DAYS of history with a release around 07:00 each day")
+    parser.add_argument("--seed", type=int, default=0,
+                        help="Seed for phases, jitter and synthetic history (default: 0)")
+    parser.add_argument("--verify", type=int, default=0, metavar="N",
+                        help="Check the first N polls of each strategy against the real "
+                             "change detection")
+    args = parser.parse_args()
+    
+    started = time.perf_counter()
+    if args.fixtures:
+        timelines = load_fixtures(args.fixtures)
+    elif args.db:
+        timelines = load_history(args.db)
+    else:
+        timelines = [synthetic_timeline(args.synthetic, args.seed)]
+    timelines = [timeline for timeline in timelines if len(timeline.listings) > 0]
+    if not timelines:
+        parser.error("No /dates history found")
+    try:
+        strategies = [parse_strategy(text, timelines) for text in args.strategies]
+    except ValueError as e:
+        parser.error(str(e))
+    loaded = time.perf_counter() - started
+    
+    span = (max(t.end for t in timelines) - min(t.start for t in timelines)) / DAY
+    releases = sum(len(timeline.releases()) for timeline in timelines)
+    print(f"{len(timelines)} pairs, {span:.1f} days, {releases} releases "
+          f"(loaded in {loaded:.2f}s)")
+    for strategy in strategies:
+        if strategy.windows:
+            windows = ", ".join(f"{start // 60:02d}:{start % 60:02d}-{end // 60:02d}:{end % 60:02d}"
+                                for start, end in strategy.windows)
+            print(f"  {strategy.name}: fast polling {windows}")
+    
+    started = time.perf_counter()
+    results = simulate(timelines, strategies, args.seed)
+    elapsed = time.perf_counter() - started
+    print()
+    for line in describe_results(results):
+        print(line)
+    print(f"\nSimulated {sum(r.requests for r in results)} polls in {elapsed:.2f}s")
+    
+    if args.verify:
+        start = min(timeline.start for timeline in timelines)
+        end = max(timeline.end for timeline in timelines)
+        for strategy in strategies:
+            polls = strategy.poll_times(start, end, random.Random(args.seed))
+            for timeline in timelines:
+                seen, agreed = verify(timeline, polls, args.verify)
+                status = "ok" if agreed else "MISMATCH"
+                print(f"Verified {strategy.name} on {timeline.venue}: {seen} detections "
+                      f"in {min(args.verify, len(polls))} polls, {status}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,250 @@
+"""
+Shared rate limiting, retries and per-host cool-down for every request.
+
+RateLimitedSession wraps any session-like object (see transport.py) and
+is the one place the project decides how hard it hits Better:
+
+- a token bucket per host caps the request rate (with a small burst), so
+  concurrent watchlist and slot fetches can't stampede the server;
+- 429 and 5xx responses and connection errors are retried with
+  exponential backoff and full jitter, honouring Retry-After;
+- a 429, a Retry-After, or (optionally) a 403 puts the host into a
+  cool-down that is saved to .ratelimit.json, so the next scheduled run
+  doesn't walk straight back into the WAF. Each strike doubles the
+  cool-down; a successful response clears it.
+
+While a host is cooling down, requests fail fast with CoolingDown (an
+OSError, like every other transport error) instead of being sent.
+"""
+
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+from urllib.parse import urlsplit
+
+from state_files import read_json, write_json_atomic
+
+
+DEFAULT_STATE_FILE = Path(".ratelimit.json")
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class CoolingDown(OSError):
+    """The host is in a cool-down; the request was not sent."""
+    
+    def __init__(self, host: str, until: float):
+        remaining = until - time.time()
+        super().__init__(f"{host} is cooling down for another {remaining:.0f}s "
+                         f"(until {time.strftime('%H:%M:%S', time.localtime(until))})")
+        self.host = host
+        self.until = until
+
+
+class TokenBucket:
+    """Allow rate requests per second on average, and up to burst at once."""
+    
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def acquire(self) -> float:
+        """
+        Take a token, sleeping until one is available.
+        
+        Returns:
+            float: Seconds spent waiting
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            # Go into debt for the token; later callers queue up behind us
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if wait:
+            time.sleep(wait)
+        return wait
+
+
+def retry_after(value: str | None) -> float | None:
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date)."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class RateLimitedSession:
+    """Rate-limit, retry and cool down a wrapped session, per host."""
+    
+    def __init__(self, session, rate: float = 5, burst: int = 10, max_attempts: int = 4,
+                 backoff: float = 1.0, max_backoff: float = 30.0,
+                 cooldown: float = 300, max_cooldown: float = 2 * 3600,
+                 cooldown_on_403: bool = True, state_file: Path | None = DEFAULT_STATE_FILE):
+        self.session = session
+        self.rate = rate
+        self.burst = burst
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.cooldown_on_403 = cooldown_on_403
+        self.state_file = state_file
+        # throttled is wall-clock seconds during which at least one request
+        # was held back by a bucket, however many threads were waiting
+        self.stats = {"retries": 0, "throttled": 0.0, "cooldowns": 0}
+        self._waiting = 0
+        self._waiting_since = 0.0
+        self._buckets: dict[str, TokenBucket] = {}
+        self._hosts: dict[str, dict] = read_json(state_file, {}) if state_file else {}
+        self._lock = threading.Lock()
+    
+    def _bucket(self, host: str) -> TokenBucket | None:
+        if self.rate <= 0:
+            return None
+        with self._lock:
+            bucket = self._buckets.get(host)
+            if bucket is None:
+                bucket = self._buckets[host] = TokenBucket(self.rate, self.burst)
+            return bucket
+    
+    def _check_cooldown(self, host: str) -> None:
+        with self._lock:
+            until = self._hosts.get(host, {}).get("cooldown_until", 0)
+        if until > time.time():
+            raise CoolingDown(host, until)
+    
+    def _strike(self, host: str, wait: float | None) -> None:
+        """
+        Start a host's cool-down and persist it. A strike while the host is
+        already cooling down is part of the same incident (e.g. every pair
+        of one cycle being refused): it can extend the cool-down to honour
+        a Retry-After, but doesn't count again or double it.
+        """
+        with self._lock:
+            self._reload()
+            state = self._hosts.setdefault(host, {"strikes": 0, "cooldown_until": 0})
+            now = time.time()
+            if state["cooldown_until"] > now:
+                if wait is None or now + wait <= state["cooldown_until"]:
+                    return
+                state["cooldown_until"] = now + wait
+            else:
+                if wait is None:
+                    wait = min(self.max_cooldown, self.cooldown * 2 ** state["strikes"])
+                    wait *= random.uniform(0.8, 1.2)
+                state["strikes"] += 1
+                state["cooldown_until"] = now + wait
+                self.stats["cooldowns"] += 1
+            self._save()
+    
+    def _clear(self, host: str) -> None:
+        with self._lock:
+            self._reload()
+            if self._hosts.pop(host, None) is not None:
+                self._save()
+    
+    def _reload(self) -> None:
+        # Other runs (or diagnose_403.py) may have struck or cleared hosts
+        # since this one started; the file is rewritten whole, so start
+        # from what it says now rather than from this process's copy
+        if self.state_file is not None:
+            self._hosts = read_json(self.state_file, {})
+    
+    def _save(self) -> None:
+        if self.state_file is not None:
+            write_json_atomic(self.state_file, self._hosts)
+    
+    def _backoff(self, attempt: int) -> float:
+        """Full jitter: uniform between 0 and the capped exponential delay."""
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** (attempt - 1)))
+    
+    def get(self, url: str, headers: dict | None = None, timeout: float | None = None,
+            **kwargs):
+        """GET through the limiter; extra keyword arguments (e.g. stream=True)
+        go to the wrapped session."""
+        host = urlsplit(url).netloc
+        bucket = self._bucket(host)
+        
+        attempt = 0
+        while True:
+            attempt += 1
+            self._check_cooldown(host)
+            if bucket is not None:
+                self._throttle(bucket)
+            
+            try:
+                response = self.session.get(url, headers=headers, timeout=timeout, **kwargs)
+            except OSError:
+                if attempt == self.max_attempts:
+                    raise
+                self._sleep_before_retry(attempt, None)
+                continue
+            
+            status = response.status_code
+            if status < 400:
+                self._clear(host)
+                return response
+            
+            wait = retry_after(response.headers.get("Retry-After"))
+            if status == 403:
+                # Retrying a WAF block only makes it worse
+                if self.cooldown_on_403:
+                    self._strike(host, wait)
+                return response
+            if (status in RETRY_STATUSES and attempt < self.max_attempts
+                    and (wait is None or wait <= self.max_backoff)):
+                if hasattr(response, "close"):
+                    # Release a streamed requests response's connection
+                    response.close()
+                self._sleep_before_retry(attempt, wait)
+                continue
+            # Out of retries, or told to wait longer than is worth blocking a poll for
+            if status == 429 or wait is not None:
+                self._strike(host, wait)
+            return response
+    
+    def _throttle(self, bucket: TokenBucket) -> None:
+        with self._lock:
+            if not self._waiting:
+                self._waiting_since = time.monotonic()
+            self._waiting += 1
+        try:
+            bucket.acquire()
+        finally:
+            with self._lock:
+                self._waiting -= 1
+                if not self._waiting:
+                    self.stats["throttled"] += time.monotonic() - self._waiting_since
+    
+    def _sleep_before_retry(self, attempt: int, wait: float | None) -> None:
+        with self._lock:
+            self.stats["retries"] += 1
+        time.sleep(wait if wait is not None else self._backoff(attempt))
+    
+    def describe(self) -> str:
+        """One-line summary of the counters."""
+        return (f"{self.stats['retries']} retries, {self.stats['throttled']:.1f}s throttled, "
+                f"{self.stats['cooldowns']} cool-downs")
+    
+    def close(self) -> None:
+        self.session.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
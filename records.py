@@ -0,0 +1,237 @@
+"""
+Typed, compact records for class dates and sessions.
+
+The API returns each date as {"raw": "2026-10-24", "full_date_pretty":
+"Saturday 24 October", "today": false}. Rather than passing those dicts
+around and re-parsing "raw" wherever it is needed, decode_dates() turns a
+/dates body straight into DateRecords: frozen, slotted dataclasses with
+the date parsed once into an ordinal. Records are shared: the same date
+listed by a hundred venues is one object (and one set of strings), so a
+long-running daemon watching many venues holds little more than the
+lists themselves.
+
+Decoding uses msgspec when it is installed (bytes straight to typed
+structs), otherwise orjson, otherwise the stdlib json module. Every path
+checks the payload's shape. A record without a valid raw date, or with a
+field of the wrong type, raises SchemaDrift; fields we have never seen
+before are collected so they can be reported once.
+"""
+
+import sys
+import threading
+from dataclasses import dataclass
+from datetime import date
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+DATE_FIELDS = {"raw", "full_date_pretty", "today"}
+
+# Bounds the shared-record and parsed-date tables; a few hundred distinct
+# dates cover years of polling, so this is only hit by malformed input
+_MAX_SHARED = 4096
+
+
+class SchemaDrift(ValueError):
+    """The API's response no longer has the shape the scraper expects."""
+
+
+_parsed: dict[str, tuple[str, int]] = {}
+_shared: dict[tuple, "DateRecord"] = {}
+
+
+def parse_raw(raw: str) -> tuple[str, int]:
+    """Interned raw date string and its ordinal, parsed once per distinct date."""
+    parsed = _parsed.get(raw)
+    if parsed is None:
+        try:
+            ordinal = date.fromisoformat(raw).toordinal()
+        except (TypeError, ValueError):
+            raise SchemaDrift(f"Not a YYYY-MM-DD date: {raw!r}") from None
+        if len(_parsed) >= _MAX_SHARED:
+            _parsed.clear()
+        parsed = _parsed[raw] = (sys.intern(raw), ordinal)
+    return parsed
+
+
+def day_of_month(raw: str) -> int:
+    """Day number of a raw date (YYYY-MM-DD)."""
+    return date.fromordinal(parse_raw(raw)[1]).day
+
+
+@dataclass(frozen=True, slots=True)
+class DateRecord:
+    """One listed date. Build with DateRecord.of() to share equal records."""
+    raw: str                  # YYYY-MM-DD
+    ordinal: int              # date.toordinal() of raw
+    pretty: str | None = None  # full_date_pretty, e.g. "Saturday 24 October"
+    today: bool = False
+    
+    @classmethod
+    def of(cls, raw: str, pretty: str | None = None, today: bool = False) -> "DateRecord":
+        """The shared record for these values, created on first use."""
+        key = (raw, pretty, today)
+        record = _shared.get(key)
+        if record is None:
+            raw, ordinal = parse_raw(raw)
+            if len(_shared) >= _MAX_SHARED:
+                _shared.clear()
+            record = _shared[key] = cls(raw, ordinal,
+                                        sys.intern(pretty) if pretty else None, today)
+        return record
+    
+    @property
+    def date(self) -> date:
+        return date.fromordinal(self.ordinal)
+    
+    @property
+    def day(self) -> int:
+        return self.date.day
+    
+    def as_api(self) -> dict:
+        """The record in the API's own JSON shape."""
+        return {"raw": self.raw, "full_date_pretty": self.pretty, "today": self.today}
+
+
+@dataclass(frozen=True, slots=True)
+class SlotRecord:
+    """One session on a date."""
+    name: str
+    starts_at: str | None  # "HH:MM"
+    spaces: int | None
+    raw: str | None = None  # the session's date, if the API said
+    
+    @classmethod
+    def from_api(cls, item: dict) -> "SlotRecord":
+        if not isinstance(item, dict):
+            raise SchemaDrift(f"Expected a session object, got {type(item).__name__}")
+        starts_at = item.get("starts_at")
+        if isinstance(starts_at, dict):
+            starts_at = starts_at.get("format_24_hour") or starts_at.get("format_12_hour")
+        spaces = item.get("spaces")
+        if spaces is not None and not isinstance(spaces, int):
+            raise SchemaDrift(f"Session spaces is not a number: {spaces!r}")
+        raw = item.get("date")
+        return cls(item.get("name") or item.get("activity_name") or "?", starts_at, spaces,
+                   parse_raw(raw[:10])[0] if isinstance(raw, str) else None)
+    
+    def as_api(self) -> dict:
+        """The record in the API's own JSON shape (for the history store)."""
+        record = {"name": self.name, "starts_at": {"format_24_hour": self.starts_at},
+                  "spaces": self.spaces}
+        if self.raw is not None:
+            record["date"] = self.raw
+        return record
+
+
+BACKENDS = [name for name, module in [("msgspec", msgspec), ("orjson", orjson)]
+            if module is not None] + ["json"]
+
+
+def _loads(body: bytes, backend: str | None = None):
+    if orjson is not None and backend in (None, "orjson"):
+        return orjson.loads(body)
+    import json
+    return json.loads(body)
+
+
+def _data_list(payload) -> list:
+    data = payload.get("data", []) if isinstance(payload, dict) else None
+    if not isinstance(data, list):
+        raise SchemaDrift("Expected a JSON object with a \"data\" list")
+    return data
+
+
+if msgspec is not None:
+    class _WireDate(msgspec.Struct, forbid_unknown_fields=True):
+        raw: str
+        full_date_pretty: str | None = None
+        today: bool = False
+    
+    class _WireDates(msgspec.Struct):
+        data: list[_WireDate] = []
+
+
+class DateDecoder:
+    """Bytes of a /dates response to DateRecords, watching for schema drift."""
+    
+    def __init__(self, backend: str | None = None):
+        """backend: one of BACKENDS; defaults to the fastest installed."""
+        if backend is not None and backend not in BACKENDS:
+            raise ValueError(f"Decoder backend {backend!r} is not installed")
+        self.backend = backend or BACKENDS[0]
+        self.unknown_fields: set[str] = set()
+        self._reported: set[str] = set()
+        self._lock = threading.Lock()
+        self._wire = msgspec.json.Decoder(_WireDates) if self.backend == "msgspec" else None
+    
+    def decode(self, body: bytes) -> list[DateRecord]:
+        """Raises SchemaDrift if the payload isn't a list of dates."""
+        if self._wire is not None:
+            try:
+                wire = self._wire.decode(body)
+            except msgspec.ValidationError as e:
+                # Unknown fields are reported rather than fatal: take the
+                # checked slow path for this payload
+                if "unknown field" not in str(e).lower():
+                    raise SchemaDrift(str(e)) from None
+            except msgspec.DecodeError as e:
+                raise SchemaDrift(str(e)) from None
+            else:
+                return [DateRecord.of(d.raw, d.full_date_pretty, d.today) for d in wire.data]
+        
+        try:
+            payload = _loads(body, self.backend)
+        except ValueError as e:
+            raise SchemaDrift(f"Response is not JSON: {e}") from None
+        records = []
+        unknown = set()
+        for item in _data_list(payload):
+            if not isinstance(item, dict) or not isinstance(item.get("raw"), str):
+                raise SchemaDrift(f"Date record without a raw date: {item!r}")
+            pretty = item.get("full_date_pretty")
+            today = item.get("today", False)
+            if not isinstance(pretty, (str, type(None))) or not isinstance(today, bool):
+                raise SchemaDrift(f"Unexpected field types in date record: {item!r}")
+            unknown.update(item.keys() - DATE_FIELDS)
+            records.append(DateRecord.of(item["raw"], pretty, today))
+        if unknown:
+            with self._lock:
+                self.unknown_fields |= unknown
+        return records
+    
+    def new_unknown_fields(self) -> set[str]:
+        """Unknown fields seen since the last call (each is reported once)."""
+        with self._lock:
+            new = self.unknown_fields - self._reported
+            self._reported |= new
+        return new
+
+
+_decoder = DateDecoder()
+
+
+def decode_dates(body: bytes) -> list[DateRecord]:
+    """Decode a /dates body with the shared decoder; see DateDecoder."""
+    return _decoder.decode(body)
+
+
+def new_unknown_fields() -> set[str]:
+    return _decoder.new_unknown_fields()
+
+
+def decode_slots(body: bytes) -> list[SlotRecord]:
+    """Decode a /times body into SlotRecords."""
+    try:
+        payload = _loads(body)
+    except ValueError as e:
+        raise SchemaDrift(f"Response is not JSON: {e}") from None
+    return [SlotRecord.from_api(item) for item in _data_list(payload)]
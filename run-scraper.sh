@@ -6,5 +6,15 @@
 # Note: Update this path to match your actual repository location
 cd ~/mcr_fit_sniper
 
-# Run the scraper script using uv and log the output
-uv run scrape.py >> ~/mcr_fit_sniper/scrape.log 2>&1
+# Run the scraper script using uv. Changes and errors go to the rotating
+# event log in logs/ (see event_log.py); the full output of the most recent
+# run is kept in last-run.log, overwritten each time so it never grows.
+# Output goes to a file of this run's own and replaces last-run.log only
+# when the run ends, so a run started while another is still going (which
+# waits for it or skips, see .scrape.lock) can't wipe the log it is writing.
+log=~/mcr_fit_sniper/last-run.log
+tmp="$log.$$.tmp"
+uv run scrape.py > "$tmp" 2>&1
+status=$?
+mv -f "$tmp" "$log"
+exit $status
@@ -0,0 +1,110 @@
+"""
+Single-instance lock for scrape.py runs.
+
+termux-job-scheduler starts a new run on its own timer, whether or not the
+previous one has finished; one stuck in a 30-second request timeout or a
+slow notification can still be running when the next starts. Two runs at
+once fetch the same URLs twice and race on the state files (cache,
+cool-downs, release model), which can lose or repeat an alert.
+
+RunLock is an advisory fcntl lock on .scrape.lock. The kernel drops it
+when the holder exits, however it exits, so a crashed run never leaves a
+stale lock behind. The lock file also says who holds it (pid, start
+time, mode) and, once the holder has finished, how its run ended, so a
+run that waited for it can tell whether the poll it would have made has
+just been made for it.
+"""
+
+import json
+import os
+import time
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # not on Windows; runs are then never serialised
+    fcntl = None
+
+
+DEFAULT_LOCK_PATH = Path(".scrape.lock")
+
+
+class RunLock:
+    """Advisory exclusive lock held for the length of one run."""
+    
+    def __init__(self, path: Path = DEFAULT_LOCK_PATH):
+        self.path = path
+        self.previous: dict | None = None  # what the last holder left in the file
+        self._file = None
+        self._info: dict = {}
+    
+    @property
+    def held(self) -> bool:
+        return self._file is not None
+    
+    def acquire(self, timeout: float = 0, poll: float = 0.1, **info) -> bool:
+        """
+        Take the lock, waiting up to timeout seconds for another holder.
+        
+        info (e.g. mode="daemon") is written to the lock file alongside
+        the pid so that waiting runs can see what holds it.
+        
+        Returns:
+            bool: True if the lock is now held by this process
+        """
+        if fcntl is None:
+            return True
+        f = open(self.path, "a+", encoding="utf-8")
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                break
+            except BlockingIOError:
+                if time.monotonic() >= deadline:
+                    f.close()
+                    return False
+                time.sleep(poll)
+        
+        self._file = f
+        self.previous = self._read()
+        self._info = {"pid": os.getpid(), "started": time.time(), **info}
+        self._write(self._info)
+        return True
+    
+    def release(self, **result) -> None:
+        """
+        Record how the run ended (e.g. ok=True) and drop the lock. Without
+        a result, the file is left as the previous holder left it.
+        """
+        if self._file is None:
+            return
+        if result:
+            self._write({**self._info, "finished": time.time(), **result})
+        elif self.previous is not None:
+            self._write(self.previous)
+        fcntl.flock(self._file, fcntl.LOCK_UN)
+        self._file.close()
+        self._file = None
+    
+    def holder(self) -> dict | None:
+        """What the lock file says about the current (or last) holder."""
+        try:
+            return json.loads(self.path.read_text(encoding="utf-8"))
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+    
+    def _read(self) -> dict | None:
+        self._file.seek(0)
+        try:
+            return json.loads(self._file.read())
+        except json.JSONDecodeError:
+            return None
+    
+    def _write(self, data: dict) -> None:
+        # Rewritten in place: the lock belongs to this inode, so the file
+        # can't be replaced by a rename like the other state files
+        self._file.seek(0)
+        self._file.truncate()
+        self._file.write(json.dumps(data))
+        self._file.flush()
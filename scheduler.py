@@ -0,0 +1,150 @@
+"""
+Adaptive polling schedule that learns when new class dates are released.
+
+Every time the latest date for a (venue, category) pair changes, the time
+of day is recorded in release_history.json. The ReleaseModel turns those
+observations into predicted release windows (time-of-day buckets where
+changes have been seen), and the AdaptiveScheduler polls every few seconds
+inside a window while backing off exponentially outside one, never
+sleeping past the start of the next window.
+"""
+
+from datetime import datetime
+from pathlib import Path
+
+from state_files import read_json, write_json_atomic
+
+
+DEFAULT_HISTORY_FILE = Path("release_history.json")
+MINUTES_PER_DAY = 24 * 60
+
+
+class ReleaseModel:
+    """Time-of-day histogram of observed latest-date changes per pair."""
+    
+    def __init__(self, path: Path = DEFAULT_HISTORY_FILE, bucket_minutes: int = 10,
+                 max_events: int = 500):
+        self.path = path
+        self.bucket_minutes = bucket_minutes
+        self.max_events = max_events
+        self.history: dict[str, list[str]] = read_json(path, {})
+        self._changed = False
+    
+    @staticmethod
+    def key(venue: str, activity_category: str) -> str:
+        return f"{venue}/{activity_category}"
+    
+    def record_change(self, venue: str, activity_category: str,
+                      when: datetime | None = None) -> None:
+        """Remember that the latest date for a pair changed at `when`."""
+        when = when or datetime.now()
+        events = self.history.setdefault(self.key(venue, activity_category), [])
+        events.append(when.isoformat(timespec="seconds"))
+        del events[:-self.max_events]
+        self._changed = True
+    
+    def save(self) -> None:
+        """Write the history, if a change has been recorded since the last save."""
+        if not self._changed:
+            return
+        write_json_atomic(self.path, self.history)
+        self._changed = False
+    
+    def bucket_counts(self, pairs: list[tuple[str, str]] | None = None) -> list[int]:
+        """Count changes per time-of-day bucket, optionally for some pairs only."""
+        counts = [0] * (MINUTES_PER_DAY // self.bucket_minutes)
+        keys = self.history.keys() if pairs is None else [self.key(*p) for p in pairs]
+        for key in keys:
+            for stamp in self.history.get(key, []):
+                when = datetime.fromisoformat(stamp)
+                counts[(when.hour * 60 + when.minute) // self.bucket_minutes] += 1
+        return counts
+    
+    def windows(self, pairs: list[tuple[str, str]] | None = None,
+                min_share: float = 0.2, margin_minutes: int = 10) -> list[tuple[int, int]]:
+        """
+        Predicted release windows as (start, end) minutes after midnight.
+        
+        A bucket is part of a window if it holds at least min_share of the
+        busiest bucket's count. Each window is widened by margin_minutes on
+        both sides; windows may run past midnight (end > MINUTES_PER_DAY).
+        """
+        counts = self.bucket_counts(pairs)
+        busiest = max(counts)
+        if busiest == 0:
+            return []
+        
+        windows = []
+        for i, count in enumerate(counts):
+            if count >= max(1, busiest * min_share):
+                start = i * self.bucket_minutes - margin_minutes
+                end = (i + 1) * self.bucket_minutes + margin_minutes
+                if windows and start <= windows[-1][1]:
+                    windows[-1] = (windows[-1][0], end)
+                else:
+                    windows.append((start, end))
+        return windows
+
+
+class AdaptiveScheduler:
+    """Choose the delay before the next poll from the release model."""
+    
+    def __init__(self, model: ReleaseModel, pairs: list[tuple[str, str]] | None = None,
+                 fast_interval: float = 5, base_interval: float = 60,
+                 max_interval: float = 1800):
+        self.model = model
+        self.pairs = pairs
+        self.fast_interval = fast_interval
+        self.base_interval = base_interval
+        self.max_interval = max_interval
+        self._backoff = base_interval
+    
+    def _window_state(self, now: datetime) -> tuple[bool, float]:
+        """Return (inside_window, seconds_until_next_window_start)."""
+        windows = self.model.windows(self.pairs)
+        if not windows:
+            return False, float("inf")
+        
+        minute = now.hour * 60 + now.minute + now.second / 60
+        until_next = float("inf")
+        for start, end in windows:
+            # Check today's, yesterday's (wrapping past midnight) and tomorrow's window
+            for offset in (-MINUTES_PER_DAY, 0, MINUTES_PER_DAY):
+                if start + offset <= minute < end + offset:
+                    return True, 0.0
+                if start + offset > minute:
+                    until_next = min(until_next, (start + offset - minute) * 60)
+        return False, until_next
+    
+    def next_delay(self, now: datetime | None = None) -> tuple[float, str]:
+        """
+        Seconds to wait before the next poll, plus a short reason.
+        
+        Inside a predicted window we poll every fast_interval seconds and
+        reset the backoff. Outside, the delay doubles after every poll up to
+        max_interval, but is cut short to wake up when the next window opens.
+        """
+        now = now or datetime.now()
+        inside, until_next = self._window_state(now)
+        
+        if inside:
+            self._backoff = self.base_interval
+            return self.fast_interval, "inside predicted release window"
+        
+        delay = min(self._backoff, self.max_interval)
+        self._backoff = min(self._backoff * 2, self.max_interval)
+        
+        if until_next < delay:
+            return max(until_next, self.fast_interval), "waking for next release window"
+        return delay, "backing off outside release windows"
+    
+    def describe_windows(self) -> str:
+        windows = self.model.windows(self.pairs)
+        if not windows:
+            return "no release history yet"
+        return ", ".join(f"{_clock(start)}-{_clock(end)}" for start, end in windows)
+
+
+def _clock(minute: int) -> str:
+    minute %= MINUTES_PER_DAY
+    return f"{minute // 60:02d}:{minute % 60:02d}"
@@ -5,153 +5,1038 @@
 # ]
 # ///
 
-import requests
-import json
-from datetime import datetime
+# Heavy or rarely needed modules (requests, subprocess, json, concurrent.futures,
+# signal, ...) are imported inside the functions that use them, so a one-shot
+# run only pays for what it uses. Check with: python3 bench_startup.py
+
+from __future__ import annotations
+
+from datetime import date, datetime, timedelta
 from pathlib import Path
+from typing import TYPE_CHECKING
+import argparse
 import os
-import subprocess
-import shutil
+import time
+from dataclasses import dataclass
 
+from date_diff import DateAdded, DateDiffer, DateEvent, DateRemoved
 
-def fetch_active_dates(venue: str = "hough-end-leisure-centre", 
-                       activity_category: str = "fitness-classes-c") -> list[dict]:
-    """Fetch available dates from the Better API."""
-    api_url = f"https://better-admin.org.uk/api/activities/venue/{venue}/activity-category/{activity_category}/dates"
-    
-    headers = {
+from history_store import DEFAULT_DB_PATH, HistoryStore
+from http_cache import DEFAULT_CACHE_DIR, HttpCache
+from metrics import InstrumentedSession, Metrics, describe_cycle
+from notify import Alert, NotificationDispatcher, build_sinks
+from ratelimit import CoolingDown, RateLimitedSession
+from records import DateRecord, SchemaDrift, day_of_month, decode_dates, new_unknown_fields
+from run_lock import DEFAULT_LOCK_PATH, RunLock
+from scheduler import AdaptiveScheduler, ReleaseModel
+
+if TYPE_CHECKING:
+    import requests
+    from event_log import EventLog
+    from local_api import Availability
+    from slots import SlotFetcher
+
+
+DEFAULT_VENUE = "hough-end-leisure-centre"
+DEFAULT_CATEGORY = "fitness-classes-c"
+
+# Point the scraper at a different server, e.g. a local stub for benchmarks
+API_BASE = os.environ.get("MCR_FIT_SNIPER_API_BASE", "https://better-admin.org.uk")
+# The booking page, read instead of the API when the API is blocked
+PAGE_BASE = os.environ.get("MCR_FIT_SNIPER_PAGE_BASE", "https://bookings.better.org.uk")
+
+
+# Browser identity headers from a captured profile (--headers-profile);
+# they replace the matching defaults in api_headers()
+profile_headers: dict = {}
+
+
+def api_headers(venue: str, activity_category: str) -> dict:
+    """Headers sent with every Better API request for a venue/category."""
+    return {
         "User-Agent": "mcr_fit_sniper/1.0 (+https://github.com/davegoopot/mcr_fit_sniper)",
         "Accept": "application/json",
         "Accept-Language": "en-GB,en;q=0.9",
         "Origin": "https://bookings.better.org.uk",
         "Referer": f"https://bookings.better.org.uk/location/{venue}/{activity_category}",
+        **profile_headers,
     }
+
+
+def dates_url(venue: str, activity_category: str) -> str:
+    """The API endpoint listing a venue/category's dates."""
+    return f"{API_BASE}/api/activities/venue/{venue}/activity-category/{activity_category}/dates"
+
+
+def page_headers() -> dict:
+    """Headers sent when loading a booking page like a browser would."""
+    return {
+        "User-Agent": "mcr_fit_sniper/1.0 (+https://github.com/davegoopot/mcr_fit_sniper)",
+        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+        "Accept-Language": "en-GB,en;q=0.9",
+        **profile_headers,
+    }
+
+
+def fetch_active_dates(venue: str = DEFAULT_VENUE, 
+                       activity_category: str = DEFAULT_CATEGORY,
+                       session: requests.Session | None = None,
+                       cache: HttpCache | None = None,
+                       metrics: Metrics | None = None) -> list[DateRecord] | None:
+    """
+    Fetch available dates from the Better API, as DateRecords (see records.py).
+    
+    Pass a session to reuse its pooled keep-alive connections; without one
+    every call opens a fresh connection (DNS, TCP and TLS handshake).
+    
+    With a cache the request is conditional, and None is returned when the
+    response is unchanged since the last poll (304 or identical body), so
+    the caller can skip parsing and change detection entirely.
+    
+    With metrics, JSON decoding is timed as the "decode" phase. Raises
+    SchemaDrift if the response no longer looks like a list of dates.
+    """
+    api_url = dates_url(venue, activity_category)
+    headers = api_headers(venue, activity_category)
     
     print(f"Fetching available dates from API...")
     print(f"URL: {api_url}")
     
-    response = requests.get(api_url, headers=headers, timeout=30)
-    response.raise_for_status()
+    if session is not None:
+        http = session
+    else:
+        import requests
+        http = requests
     
-    data = response.json()
-    return data.get("data", [])
+    if cache is not None:
+        body, changed = cache.get(http, api_url, headers, timeout=30)
+        if not changed:
+            return None
+    else:
+        response = http.get(api_url, headers=headers, timeout=30)
+        response.raise_for_status()
+        body = response.content
+    
+    started = time.perf_counter()
+    dates = decode_dates(body)
+    if metrics is not None:
+        metrics.observe("decode", time.perf_counter() - started, venue)
+    
+    unknown = new_unknown_fields()
+    if unknown:
+        print(f"⚠️  The dates API has new fields: {', '.join(sorted(unknown))}")
+    return dates
 
 
-def is_termux() -> bool:
+def fetch_page_dates(venue: str = DEFAULT_VENUE,
+                     activity_category: str = DEFAULT_CATEGORY,
+                     session: requests.Session | None = None,
+                     metrics: Metrics | None = None) -> list[DateRecord]:
     """
-    Check if the script is running in Termux environment.
+    Extract available dates from the booking page instead of the API.
     
-    Returns:
-        bool: True if running in Termux, False otherwise
+    Returns the same records as fetch_active_dates(); see html_extract.py.
+    Parsing the page is timed as the "decode" phase.
     """
-    # Check for TERMUX_VERSION environment variable
-    if os.environ.get("TERMUX_VERSION"):
-        return True
+    from html_extract import extract, response_chunks
+    
+    page_url = f"{PAGE_BASE}/location/{venue}/{activity_category}"
+    print(f"Fetching available dates from the booking page...")
+    print(f"URL: {page_url}")
+    
+    if session is not None:
+        http = session
     else:
-        return False
+        import requests
+        http = requests
+    
+    response = http.get(page_url, headers=page_headers(), timeout=30)
+    response.raise_for_status()
+    started = time.perf_counter()
+    dates = extract(response_chunks(response)).dates()
+    if metrics is not None:
+        metrics.observe("decode", time.perf_counter() - started, venue)
+    return dates
+
+
+def api_blocked(error: OSError) -> bool:
+    """True for a 403 from the API, or a cool-down started by one."""
+    if isinstance(error, CoolingDown):
+        return True
+    response = getattr(error, "response", None)
+    return getattr(response, "status_code", None) == 403
 
 
-def send_termux_notification(title: str, content: str) -> bool:
+def fetch_dates(venue: str = DEFAULT_VENUE,
+                activity_category: str = DEFAULT_CATEGORY,
+                session: requests.Session | None = None,
+                cache: HttpCache | None = None,
+                metrics: Metrics | None = None,
+                source: str = "auto") -> list[DateRecord] | None:
     """
-    Send a notification via Termux if available.
+    Fetch available dates from the chosen source.
+    
+    source is "api", "page", or "auto": the API, falling back to the
+    booking page when the API is blocked.
+    """
+    if source == "page":
+        return fetch_page_dates(venue, activity_category, session, metrics)
+    try:
+        return fetch_active_dates(venue, activity_category, session, cache, metrics)
+    except OSError as e:
+        if source != "auto" or not api_blocked(e):
+            raise
+        print(f"API blocked ({e}); reading the booking page instead.")
+        return fetch_page_dates(venue, activity_category, session, metrics)
+
+
+def fetch_watchlist(watchlist: list[tuple[str, str]],
+                    max_workers: int = 8,
+                    session: requests.Session | None = None,
+                    cache: HttpCache | None = None,
+                    metrics: Metrics | None = None,
+                    source: str = "auto") -> tuple[dict, dict]:
+    """
+    Fetch active dates for every (venue, category) pair concurrently.
+    
+    Each pair is fetched on its own worker thread, so a cycle takes roughly
+    as long as the slowest single request (as long as max_workers is at
+    least the number of pairs). A failing pair never stops the others.
     
     Args:
-        title: The notification title
-        content: The notification content
-        
+        watchlist: (venue, activity_category) pairs to fetch
+        max_workers: Maximum number of requests in flight at once
+        session: Optional shared session (see create_session)
+        cache: Optional conditional-request cache
+        metrics: Optional per-phase timings
+        source: Where to read dates from (see fetch_dates)
+    
     Returns:
-        bool: True if notification was sent successfully, False otherwise
+        tuple: (results, errors) - dicts keyed by (venue, category) holding
+        the list of dates (None if unchanged) or the exception raised
     """
-    if not is_termux():
-        return False
+    from concurrent.futures import ThreadPoolExecutor
     
+    results = {}
+    errors = {}
     
-    subprocess.run(
-            ["termux-notification", "--title", title, "--content", content],
-            check=True,
-            capture_output=True,
-            timeout=5
-        )
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {
+            pool.submit(fetch_dates, venue, category, session, cache, metrics, source): (venue, category)
+            for venue, category in watchlist
+        }
+        for future, pair in futures.items():
+            try:
+                results[pair] = future.result()
+            except (OSError, SchemaDrift) as e:
+                # requests.RequestException and fast_http.TransportError are both OSErrors
+                errors[pair] = e
     
-    return True
+    return results, errors
+
+
+def create_session(pool_size: int = 8) -> requests.Session:
+    """
+    Create a session with a keep-alive connection pool.
+    
+    Connections to better-admin.org.uk stay open between polls, so only the
+    first request pays for DNS resolution, the TCP connect and the TLS
+    handshake. pool_size should be at least the number of concurrent workers.
+    """
+    import requests
+    
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=pool_size,
+                                            pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def load_watchlist(path: Path) -> list[tuple[str, str]]:
+    """
+    Load (venue, category) pairs from a watchlist file.
+    
+    One pair per line as "venue/category" or "venue category". Blank lines
+    and lines starting with # are ignored.
+    """
+    watchlist = []
+    for line in path.read_text().splitlines():
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        watchlist.append(parse_pair(line))
+    return watchlist
+
+
+def parse_pair(text: str) -> tuple[str, str]:
+    """Parse "venue/category" (or "venue category") into a tuple."""
+    venue, _, category = text.replace(" ", "/", 1).partition("/")
+    if not venue or not category:
+        raise ValueError(f"Expected venue/category, got: {text!r}")
+    return venue.strip(), category.strip()
+
+
+def legacy_state_file(venue: str, activity_category: str) -> Path:
+    """Return the latestclass file older versions used to remember a pair."""
+    if (venue, activity_category) == (DEFAULT_VENUE, DEFAULT_CATEGORY):
+        return Path("latestclass.txt")
+    return Path(f"latestclass-{venue}-{activity_category}.txt")
 
 
-def save_latest_date(latest_date: str) -> tuple[str | None, bool]:
+def save_latest_date(store: HistoryStore, dates: list[DateRecord], venue: str = DEFAULT_VENUE,
+                     activity_category: str = DEFAULT_CATEGORY) -> tuple[str | None, bool]:
     """
-    Save the latest date to latestclass.txt and check if it changed.
+    Record a poll in the history store and check if the latest date changed.
+    
+    The previous latest date comes from the store's index. The first time a
+    pair is seen, a latestclass.txt left by an older version is imported so
+    the change check carries on from where it left off.
     
     Returns:
         tuple: (previous_date, has_changed)
     """
-    latest_class_file = Path("latestclass.txt")
-    previous_date = None
+    previous_date = store.previous_latest(venue, activity_category)
     
-    # Read previous date if file exists
-    if latest_class_file.exists():
-        previous_date = latest_class_file.read_text().strip()
+    legacy_file = legacy_state_file(venue, activity_category)
+    if previous_date is None and legacy_file.exists():
+        previous_date = legacy_file.read_text().strip() or None
+        if previous_date:
+            store.import_latest(venue, activity_category, previous_date,
+                                legacy_file.stat().st_mtime)
     
-    # Write the new latest date
-    latest_class_file.write_text(latest_date)
+    store.record_poll(venue, activity_category, dates)
     
-    # Check if date has changed
+    latest_date = dates[-1].raw if dates else ""
     has_changed = previous_date is not None and previous_date != latest_date
     
     return previous_date, has_changed
 
 
-def main() -> None:
+@dataclass
+class PollContext:
+    """Long-lived state shared by every poll cycle in one process."""
+    store: HistoryStore
+    session: requests.Session | None = None
+    cache: HttpCache | None = None
+    model: ReleaseModel | None = None
+    differ: DateDiffer | None = None
+    slots: SlotFetcher | None = None
+    notifier: NotificationDispatcher | None = None
+    metrics: Metrics | None = None
+    metrics_file: Path | None = None
+    profile: Path | None = None
+    log: EventLog | None = None
+    limiter: RateLimitedSession | None = None
+    source: str = "auto"
+    slot_days: int = 14
+    max_workers: int = 8
+    availability: Availability | None = None
+    
+    def __post_init__(self):
+        if self.differ is None:
+            self.differ = DateDiffer(self.store)
+        if self.metrics is None:
+            self.metrics = Metrics()
+
+
+def print_events(events: list[DateEvent]) -> None:
+    """Print only what changed since the previous poll."""
+    if not events:
+        return
+    print(f"\nChanges since last poll ({len(events)}):")
+    for event in events:
+        day = day_of_month(event.raw)
+        if isinstance(event, DateAdded):
+            print(f"  + {day} - {event.pretty}")
+        elif isinstance(event, DateRemoved):
+            print(f"  - {day} - {event.pretty}")
+        else:
+            print(f"  ~ {day} - {event.before} -> {event.after}")
+
+
+def log_event(ctx: PollContext, level: str, event: str, **fields) -> None:
+    """Write a structured event to the run's log, if it has one."""
+    if ctx.log is not None:
+        ctx.log.log(level, event, **fields)
+
+
+def notify(ctx: PollContext, alert: Alert) -> None:
+    """Hand an alert to the background dispatcher; never blocks the poll."""
+    if ctx.notifier is None or not ctx.notifier.sinks:
+        return
+    with ctx.metrics.phase("notify", alert.venue):
+        queued = ctx.notifier.submit(alert)
+    if queued:
+        print(f"   📱 Notification queued")
+
+
+def report_dates(dates: list[DateRecord] | None, ctx: PollContext,
+                 venue: str = DEFAULT_VENUE,
+                 activity_category: str = DEFAULT_CATEGORY) -> bool:
+    """
+    Report what changed for one (venue, category), record the poll and
+    alert on new dates.
+    
+    Only the added/removed/changed dates are printed, not the whole list.
+    
+    Returns:
+        bool: True if the latest date changed since the previous poll
+    """
+    store = ctx.store
+    
+    print(f"\n--- Results ---")
+    if dates is None:
+        with ctx.metrics.phase("save", venue):
+            store.record_unchanged(venue, activity_category)
+        print("ℹ️  Not modified since the last poll (cached) - nothing to check.")
+        log_event(ctx, "DEBUG", "not_modified", venue=venue, category=activity_category)
+        return False
+    
+    # Diff against the previous list before the poll is recorded
+    with ctx.metrics.phase("diff", venue):
+        events, is_baseline = ctx.differ.diff(venue, activity_category, dates)
+    with ctx.metrics.phase("save", venue):
+        previous_date, has_changed = save_latest_date(store, dates, venue, activity_category)
+    if ctx.availability is not None:
+        # Pushed to local event streams straight away, before printing
+        ctx.availability.update(venue, activity_category, dates)
+    
+    if events and not is_baseline:
+        log_event(ctx, "INFO", "dates_changed", venue=venue, category=activity_category,
+                  added=[e.raw for e in events if isinstance(e, DateAdded)],
+                  removed=[e.raw for e in events if isinstance(e, DateRemoved)],
+                  changed=[e.raw for e in events
+                           if not isinstance(e, (DateAdded, DateRemoved))])
+    if ctx.log is not None and ctx.log.enabled("DEBUG"):
+        ctx.log.debug("polled", venue=venue, category=activity_category,
+                      dates=[d.raw for d in dates])
+    
+    if not dates:
+        print("No active class dates found.")
+        print_events(events)
+        return False
+    
+    print(f"Found {len(dates)} active class dates.")
+    print_events(events)
+    
+    # Find the latest date (dates are returned in order, last one is latest)
+    latest_date = dates[-1].raw
+    latest_date_pretty = dates[-1].pretty or ""
+    
+    print(f"\n--- Latest Class Date ---")
+    print(f"Latest date: {latest_date_pretty} ({latest_date})")
+    print(f"Saved to: {store.path}")
+    
+    reopened = [e for e in events if isinstance(e, DateAdded) and e.raw != latest_date]
+    
+    if has_changed:
+        print(f"\n⚠️  ALERT: Latest class date has changed!")
+        print(f"   Previous: {previous_date}")
+        print(f"   Current:  {latest_date}")
+        log_event(ctx, "INFO", "latest_changed", venue=venue, category=activity_category,
+                  previous=previous_date, current=latest_date)
+        
+        content = f"{venue}: new latest date: {latest_date_pretty} (was: {previous_date})"
+        if reopened:
+            content += f", plus {len(reopened)} other new date(s)"
+        
+        notify(ctx, Alert(venue, activity_category, "Fitness Class Date Changed", content,
+                          key=f"latest:{venue}/{activity_category}:{latest_date}",
+                          dates=(latest_date, *(e.raw for e in reopened))))
+        return True
+    elif reopened:
+        print(f"\n⚠️  ALERT: {len(reopened)} date(s) newly available!")
+        raws = ",".join(e.raw for e in reopened)
+        notify(ctx, Alert(venue, activity_category, "Fitness Class Dates Available",
+                          f"{venue}: " + ", ".join(e.pretty or e.raw for e in reopened),
+                          key=f"added:{venue}/{activity_category}:{raws}",
+                          dates=tuple(e.raw for e in reopened)))
+    elif previous_date is not None and not is_baseline:
+        print(f"\nℹ️  No change in latest class date.")
+    elif previous_date is not None:
+        print(f"\nℹ️  No change in latest class date (now tracking every listed date).")
+    else:
+        print(f"\nℹ️  First time tracking - no previous date to compare.")
+        log_event(ctx, "INFO", "tracking_started", venue=venue, category=activity_category,
+                  latest=latest_date)
+    
+    return False
+
+
+def refresh_slots(ctx: PollContext, pairs: list[tuple[str, str]]) -> None:
+    """
+    Second stage: make sure the sessions for every listed date in the next
+    ctx.slot_days days are known, fetching only new or expired dates.
+    
+    Run after the cycle's dates are committed. Nothing is written while the
+    fetches are in flight; snapshots of freshly fetched dates are recorded
+    in the history store afterwards, in a transaction of their own, so the
+    database's write lock is never held across a request.
+    """
+    horizon = (date.today() + timedelta(days=ctx.slot_days)).isoformat()
+    keys = [
+        (venue, category, raw)
+        for venue, category in pairs
+        for raw in ctx.store.current_dates(venue, category)
+        if raw <= horizon
+    ]
+    
+    ctx.slots.warm_from_store(ctx.store, keys)
+    if ctx.session is not None:
+        http = ctx.session
+    else:
+        import requests
+        http = requests
+    _, fetched, errors = ctx.slots.refresh(http, keys)
+    
+    from slots import describe_slot
+    
+    if fetched:
+        with ctx.store.cycle():
+            for (venue, category, raw), slots in fetched.items():
+                ctx.store.record_slots(venue, category, raw, [slot.as_api() for slot in slots])
+    
+    print(f"\n--- Sessions ---")
+    print(f"{len(keys)} dates in the next {ctx.slot_days} days: {len(fetched)} fetched, "
+          f"{len(keys) - len(fetched) - len(errors)} cached, {len(errors)} failed")
+    for venue, category, raw in sorted(fetched):
+        sessions = fetched[(venue, category, raw)]
+        print(f"  {venue} {raw}: {len(sessions)} sessions")
+        for slot in sessions:
+            print(f"    {describe_slot(slot)}")
+    for (venue, category, raw), error in errors.items():
+        print(f"  {venue} {raw}: error: {error}")
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Watch Better venues for new class dates.")
+    parser.add_argument("--watch", action="append", default=[], metavar="VENUE/CATEGORY",
+                        help="Venue and activity category to watch (repeatable)")
+    parser.add_argument("--watchlist", type=Path, metavar="FILE",
+                        help="File with one venue/category pair per line")
+    parser.add_argument("--max-workers", type=int, default=8,
+                        help="Maximum concurrent requests in watchlist mode (default: 8)")
+    parser.add_argument("--daemon", action="store_true",
+                        help="Keep running and poll on a fixed interval with pooled connections")
+    parser.add_argument("--interval", type=float, default=1800,
+                        help="Seconds between polls in daemon mode (default: 1800)")
+    parser.add_argument("--adaptive", action="store_true",
+                        help="Daemon mode with a learned schedule: poll fast around "
+                             "predicted release times, back off elsewhere")
+    parser.add_argument("--fast-interval", type=float, default=5,
+                        help="Seconds between polls inside a release window (default: 5)")
+    parser.add_argument("--cache-dir", type=Path, default=DEFAULT_CACHE_DIR,
+                        help=f"Conditional-request cache directory (default: {DEFAULT_CACHE_DIR})")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Always download and parse the full response")
+    parser.add_argument("--slots", action="store_true",
+                        help="Also fetch the sessions on each listed date (new or expired dates only)")
+    parser.add_argument("--slot-ttl", type=float, default=900,
+                        help="Seconds before a date's sessions are fetched again (default: 900)")
+    parser.add_argument("--slot-days", type=int, default=14,
+                        help="Only fetch sessions for dates this many days ahead (default: 14)")
+    parser.add_argument("--cycles", type=int, metavar="N",
+                        help="Stop daemon mode after N polls")
+    parser.add_argument("--fast", action="store_true",
+                        help="Fetch with the stdlib http.client transport instead of requests "
+                             "(faster cold start)")
+    parser.add_argument("--transport", choices=["live", "record", "replay"], default="live",
+                        help="live: fetch from the API; record: fetch and save responses to "
+                             "--fixtures; replay: serve --fixtures with no network")
+    parser.add_argument("--fixtures", type=Path, default=Path("fixtures.jsonl.gz"),
+                        help="Fixture archive for record/replay (default: fixtures.jsonl.gz)")
+    parser.add_argument("--notify", default="termux", metavar="SINKS",
+                        help="Comma-separated notification sinks: termux, stdout, webhook "
+                             "(default: termux; ignored outside Termux)")
+    parser.add_argument("--webhook-url", help="URL the webhook sink POSTs JSON alerts to")
+    parser.add_argument("--subscriptions", type=Path, metavar="FILE",
+                        help="Also watch every pair in this subscriptions file (see "
+                             "subscriptions.py), fetching each unique pair once and sending "
+                             "each subscriber the alerts that match their filters")
+    parser.add_argument("--rate-limit", type=float, default=5,
+                        help="Maximum requests per second to each host, 0 for no limit "
+                             "(default: 5)")
+    parser.add_argument("--burst", type=int, default=10,
+                        help="Requests allowed at once before the rate limit applies (default: 10)")
+    parser.add_argument("--max-attempts", type=int, default=4,
+                        help="Attempts per request on 429/5xx/connection errors (default: 4)")
+    parser.add_argument("--snipe", metavar="TIME",
+                        help="Snipe mode: sync with the server clock, then fire a burst of "
+                             "requests at TIME on the server's clock (HH:MM[:SS[.fff]], the "
+                             "next occurrence, or +SECONDS)")
+    parser.add_argument("--snipe-shots", type=int, default=3,
+                        help="Requests in the snipe burst, one per warm connection (default: 3)")
+    parser.add_argument("--snipe-hedge", type=float, default=50, metavar="MS",
+                        help="Milliseconds between snipe shots; later shots are only sent if no "
+                             "earlier one has seen a new date (default: 50)")
+    parser.add_argument("--snipe-deadline", type=float, default=2, metavar="SECONDS",
+                        help="Timeout for each snipe request (default: 2)")
+    parser.add_argument("--source", choices=["auto", "api", "page"], default="auto",
+                        help="api: the JSON API; page: extract dates from the booking page; "
+                             "auto: the API, or the page while the API is blocked (default: auto)")
+    parser.add_argument("--headers-profile", metavar="KEY",
+                        help="Send the User-Agent and language headers of a browser profile "
+                             "saved by capture_headers.py (fingerprint, name or latest)")
+    parser.add_argument("--metrics", type=Path, metavar="FILE",
+                        help="Append per-phase timings (p50/p95/p99 per venue) to this "
+                             "JSON-lines file after every poll")
+    parser.add_argument("--serve-port", type=int, metavar="PORT",
+                        help="With --daemon or --adaptive, serve the latest dates at "
+                             "http://127.0.0.1:PORT/availability, with changes pushed as "
+                             "server-sent events at /events")
+    parser.add_argument("--serve-host", default="127.0.0.1",
+                        help="Address for --serve-port; 0.0.0.0 for the local network "
+                             "(default: 127.0.0.1)")
+    parser.add_argument("--metrics-port", type=int, metavar="PORT",
+                        help="Serve the timings in Prometheus text format at "
+                             "http://127.0.0.1:PORT/metrics")
+    parser.add_argument("--profile", type=Path, metavar="PREFIX",
+                        help="Profile the first poll: writes PREFIX.prof (cProfile) and "
+                             "PREFIX.txt (top functions and tracemalloc allocations)")
+    parser.add_argument("--log-dir", type=Path, default=Path("logs"),
+                        help="Directory for the structured event log (default: logs)")
+    parser.add_argument("--log-level", choices=["DEBUG", "INFO", "WARNING", "ERROR"],
+                        default="INFO",
+                        help="INFO logs only changes and errors; DEBUG also logs every "
+                             "poll and cycle timings (default: INFO)")
+    parser.add_argument("--log-max-bytes", type=int, default=256 * 1024,
+                        help="Compress the log into a new segment at this size "
+                             "(default: 262144)")
+    parser.add_argument("--log-keep", type=int, default=20,
+                        help="Number of compressed log segments to keep (default: 20)")
+    parser.add_argument("--db", type=Path, default=DEFAULT_DB_PATH,
+                        help=f"Poll history database (default: {DEFAULT_DB_PATH})")
+    parser.add_argument("--on-overlap", choices=["wait", "skip"], default="wait",
+                        help="If another run is in progress, wait for it and reuse its poll, "
+                             "or skip this run (default: wait)")
+    parser.add_argument("--lock-timeout", type=float, default=120, metavar="SECONDS",
+                        help="Longest to wait for another run with --on-overlap wait "
+                             "(default: 120)")
+    parser.add_argument("--lock-file", type=Path, default=DEFAULT_LOCK_PATH,
+                        help=f"Single-instance lock file (default: {DEFAULT_LOCK_PATH})")
+    args = parser.parse_args(argv)
+    if args.serve_port is not None and not (args.daemon or args.adaptive):
+        parser.error("--serve-port needs --daemon or --adaptive: a single poll exits "
+                     "as soon as it is done")
+    return args
+
+
+def run_watchlist(watchlist: list[tuple[str, str]], ctx: PollContext) -> float:
+    """
+    Fetch every pair concurrently, then report each one in turn.
+    
+    Every pair's dates are written in one transaction. Pairs whose
+    latest date changed are recorded in the release model.
+    
+    Returns:
+        float: Wall-clock seconds spent fetching
+    """
+    print(f"Watching {len(watchlist)} venue/category pairs "
+          f"(max {ctx.max_workers} concurrent requests)...")
+    
+    started = time.perf_counter()
+    results, errors = fetch_watchlist(watchlist, max_workers=ctx.max_workers,
+                                      session=ctx.session, cache=ctx.cache,
+                                      metrics=ctx.metrics, source=ctx.source)
+    fetch_seconds = time.perf_counter() - started
+    ctx.metrics.observe("fetch", fetch_seconds)
+    
+    with ctx.store.cycle():
+        for venue, category in watchlist:
+            print(f"\n=== {venue} / {category} ===")
+            if (venue, category) in errors:
+                print(f"Error fetching dates: {errors[(venue, category)]}")
+                ctx.store.record_error(venue, category, str(errors[(venue, category)]))
+                log_event(ctx, "WARNING", "fetch_error", venue=venue, category=category,
+                          error=str(errors[(venue, category)]))
+            elif report_dates(results[(venue, category)], ctx, venue, category) and ctx.model:
+                ctx.model.record_change(venue, category)
+    
+    if ctx.slots is not None:
+        refresh_slots(ctx, [pair for pair in watchlist if pair not in errors])
+    
+    if errors:
+        print(f"\n✗ {len(errors)} of {len(watchlist)} pairs failed.")
+    
+    finish_cycle(ctx)
+    return fetch_seconds
+
+
+def finish_cycle(ctx: PollContext) -> None:
+    """Persist the release model, cache counters and phase timings after a
+    poll cycle."""
+    if ctx.model is not None:
+        ctx.model.save()
+    
+    if ctx.cache is not None:
+        ctx.cache.save_stats()
+        print(f"\nCache: {ctx.cache.describe()}")
+    
+    if ctx.limiter is not None:
+        print(f"Requests: {ctx.limiter.describe()}")
+    
+    cycle = ctx.metrics.end_cycle()
+    print(f"⏱  Phases: {describe_cycle(cycle)}")
+    log_event(ctx, "DEBUG", "cycle",
+              phases_ms={phase: round(seconds * 1000, 1) for phase, seconds in cycle.items()})
+    if ctx.metrics_file is not None:
+        ctx.metrics.write_jsonl(ctx.metrics_file, cycle)
+
+
+def profiled(ctx: PollContext):
+    """
+    Context manager for one poll cycle: profiles it if --profile was given
+    and no cycle has been profiled yet, otherwise does nothing.
+    """
+    from contextlib import nullcontext
+    
+    if ctx.profile is None:
+        return nullcontext()
+    
+    from metrics import profile_cycle
+    
+    prefix, ctx.profile = ctx.profile, None
+    return profile_cycle(prefix)
+
+
+def run_daemon(watchlist: list[tuple[str, str]], ctx: PollContext, interval: float,
+               scheduler: AdaptiveScheduler | None = None,
+               max_cycles: int | None = None) -> None:
+    """
+    Poll the watchlist until SIGTERM/SIGINT (or max_cycles polls), reusing
+    the context's pooled session.
+    
+    The first poll pays for DNS, TCP and TLS like a scheduled cold start
+    does; later polls reuse the open connections. After each poll the
+    saving per poll (cold fetch time minus warm median) is printed.
+    
+    With a scheduler the delay between polls comes from the learned release
+    windows instead of the fixed interval.
+    """
+    import signal
+    import threading
+    
+    stop = threading.Event()
+    
+    def request_stop(signum, frame):
+        print(f"\nReceived {signal.Signals(signum).name}, stopping after this poll...")
+        stop.set()
+    
+    signal.signal(signal.SIGTERM, request_stop)
+    signal.signal(signal.SIGINT, request_stop)
+    
+    if scheduler is not None:
+        print(f"Daemon mode: adaptive polling, release windows: "
+              f"{scheduler.describe_windows()} (send SIGTERM to stop)")
+    else:
+        print(f"Daemon mode: polling every {interval:g}s (send SIGTERM to stop)")
+    
+    fetch_times = []
+    while not stop.is_set():
+        print(f"\n##### Poll at {datetime.now().isoformat(timespec='seconds')} #####")
+        with profiled(ctx):
+            fetch_times.append(run_watchlist(watchlist, ctx))
+        print_latency_report(fetch_times)
+        
+        if max_cycles is not None and len(fetch_times) >= max_cycles:
+            break
+        
+        delay = interval
+        if scheduler is not None:
+            delay, reason = scheduler.next_delay()
+            print(f"Next poll in {delay:.0f}s ({reason})")
+        stop.wait(delay)
+    
+    print("Daemon stopped.")
+
+
+def print_latency_report(fetch_times: list[float]) -> None:
+    """Compare the cold first poll with the warm (pooled) polls since."""
+    import statistics
+    
+    cold_ms = fetch_times[0] * 1000
+    if len(fetch_times) == 1:
+        print(f"\n⏱  Cold poll: {cold_ms:.0f} ms (connect + TLS handshake)")
+        return
+    
+    warm_ms = statistics.median(fetch_times[1:]) * 1000
+    print(f"\n⏱  Poll: {fetch_times[-1] * 1000:.0f} ms | cold: {cold_ms:.0f} ms | "
+          f"warm median: {warm_ms:.0f} ms | saved per poll: {cold_ms - warm_ms:.0f} ms "
+          f"(plus interpreter and uv startup)")
+
+
+def open_transport(args: argparse.Namespace, pool_size: int):
+    """
+    Build the session-like object every request in this run goes through.
+    
+    live (default) uses a pooled requests.Session, or the stdlib transport
+    with --fast; record wraps that and writes each response to the fixture
+    archive; replay serves the archive back with no network at all.
+    """
+    if args.transport == "replay":
+        from transport import ReplayTransport
+        return ReplayTransport.load(args.fixtures)
+    
+    if args.fast:
+        # No requests import at all: http.client is enough for these GETs
+        from fast_http import StdlibSession
+        session = StdlibSession()
+    else:
+        session = create_session(pool_size=pool_size)
+    
+    if args.transport == "record":
+        from transport import RecordingTransport
+        return RecordingTransport(session, args.fixtures)
+    return session
+
+
+def main(argv: list[str] | None = None) -> None:
+    args = parse_args(argv)
+    
+    watchlist = [parse_pair(pair) for pair in args.watch]
+    if args.watchlist:
+        watchlist.extend(load_watchlist(args.watchlist))
+    
+    if args.headers_profile:
+        from header_profiles import identity_headers, load_profile
+        profile_headers.update(identity_headers(load_profile(args.headers_profile)))
+    
+    sinks = build_sinks([name.strip() for name in args.notify.split(",") if name.strip()],
+                        args.webhook_url)
+    notifier = NotificationDispatcher(sinks)
+    if args.subscriptions:
+        from subscriptions import SubscriptionDispatcher, SubscriptionRegistry
+        registry = SubscriptionRegistry(args.subscriptions)
+        # One fetch per unique pair, however many subscribers share it
+        watchlist.extend(pair for pair in registry.pairs() if pair not in watchlist)
+        notifier = SubscriptionDispatcher(registry, notifier)
+        print(f"Subscriptions: {registry.describe()}")
+    
+    lock = RunLock(args.lock_file)
+    ok = False
     try:
-        # Fetch available dates from the API
-        dates = fetch_active_dates()
+        if take_run_lock(lock, args, watchlist or [(DEFAULT_VENUE, DEFAULT_CATEGORY)]):
+            run(args, watchlist, notifier)
+        ok = True
+    finally:
+        # Give queued alerts a bounded chance to go out before exiting
+        notifier.close()
+        if lock.held:
+            lock.release(ok=ok)
+
+
+def take_run_lock(lock: RunLock, args: argparse.Namespace,
+                  pairs: list[tuple[str, str]]) -> bool:
+    """
+    Take the single-instance lock, or decide this run isn't needed.
+    
+    If another run holds the lock, this one exits straight away with
+    --on-overlap skip, or when the other is a daemon that won't finish.
+    Otherwise it waits up to --lock-timeout. A one-shot poll whose pairs
+    the other run polled successfully after this one started reuses that
+    poll (its alerts have gone out, its dates are in the store) rather
+    than fetching the same URLs again.
+    
+    Returns:
+        bool: True if the lock is held and this run should go ahead
+    """
+    mode = "snipe" if args.snipe else "daemon" if args.daemon or args.adaptive else "poll"
+    watched = [f"{venue}/{category}" for venue, category in pairs]
+    started = time.time()
+    if lock.acquire(mode=mode, pairs=watched):
+        return True
+    
+    holder = lock.holder() or {}
+    running = f", running for {started - holder['started']:.0f}s" if "started" in holder else ""
+    print(f"Another run is in progress (pid {holder.get('pid', '?')}, "
+          f"{holder.get('mode', 'poll')}{running}).")
+    if args.on_overlap == "skip" or holder.get("mode") == "daemon":
+        print("Exiting without polling.")
+        return False
+    
+    print(f"Waiting up to {args.lock_timeout:.0f}s for it to finish...")
+    if not lock.acquire(args.lock_timeout, mode=mode, pairs=watched):
+        print("Still running; exiting without polling.")
+        return False
+    
+    previous = lock.previous or {}
+    if (mode == "poll" and previous.get("ok") and previous.get("mode") == "poll"
+            and previous.get("finished", 0) >= started
+            and set(watched) <= set(previous.get("pairs", []))):
+        lock.release()
+        print_reused_poll(args.db, pairs, previous)
+        return False
+    return True
+
+
+def print_reused_poll(db: Path, pairs: list[tuple[str, str]], previous: dict) -> None:
+    """Report the latest dates another run has just recorded for our pairs."""
+    print(f"\n--- Results ---")
+    print(f"Reusing the poll by pid {previous.get('pid', '?')}, "
+          f"finished {time.time() - previous['finished']:.0f}s ago (alerts already sent).")
+    with HistoryStore(db) as store:
+        for venue, category in pairs:
+            print(f"  {venue}/{category}: latest date "
+                  f"{store.previous_latest(venue, category) or 'none'}")
+
+
+def run(args: argparse.Namespace, watchlist: list[tuple[str, str]],
+        notifier: NotificationDispatcher) -> None:
+    """Run the mode selected on the command line."""
+    if args.slots:
+        from slots import SlotFetcher
+    
+    metrics = Metrics()
+    if args.metrics_port is not None:
+        from metrics import serve_prometheus
+        serve_prometheus(metrics, args.metrics_port)
+        print(f"Serving metrics at http://127.0.0.1:{args.metrics_port}/metrics")
+    
+    from event_log import EventLog
+    
+    with EventLog(args.log_dir, args.log_level, args.log_max_bytes, args.log_keep) as event_log, \
+            HistoryStore(args.db) as store, open_transport(args, args.max_workers) as session:
+        session = InstrumentedSession(session, metrics)
+        limiter = None
+        if args.transport != "replay":
+            # Every live request goes through the shared limiter; replays send
+            # nothing. A snipe hedges instead of retrying, so it never waits on a backoff.
+            session = limiter = RateLimitedSession(
+                session, rate=args.rate_limit, burst=max(args.burst, args.snipe_shots),
+                max_attempts=1 if args.snipe else args.max_attempts)
         
-        print(f"\n--- Results ---")
-        if dates:
-            print(f"Found {len(dates)} active class dates:\n")
-            for date_info in dates:
-                raw_date = date_info.get("raw", "")
-                full_date = date_info.get("full_date_pretty", "")
-                is_today = date_info.get("today", False)
-                
-                # Extract just the day number from the raw date (YYYY-MM-DD)
-                day = raw_date.split("-")[-1].lstrip("0") if raw_date else ""
-                
-                today_marker = " (TODAY)" if is_today else ""
-                print(f"  {day} - {full_date}{today_marker}")
-            
-            # Find the latest date (dates are returned in order, last one is latest)
-            latest_date_info = dates[-1]
-            latest_date = latest_date_info.get("raw", "")
-            latest_date_pretty = latest_date_info.get("full_date_pretty", "")
-            
-            if latest_date:
-                # Save to file and check for changes
-                previous_date, has_changed = save_latest_date(latest_date)
-                
-                print(f"\n--- Latest Class Date ---")
-                print(f"Latest date: {latest_date_pretty} ({latest_date})")
-                print(f"Saved to: latestclass.txt")
-                
-                if has_changed:
-                    print(f"\n⚠️  ALERT: Latest class date has changed!")
-                    print(f"   Previous: {previous_date}")
-                    print(f"   Current:  {latest_date}")
-                    
-                    # Send Termux notification if running in Termux
-                    if send_termux_notification(
-                        title="Fitness Class Date Changed",
-                        content=f"New latest date: {latest_date_pretty} (was: {previous_date})"
-                    ):
-                        print(f"   📱 Termux notification sent")
-                elif previous_date is not None:
-                    print(f"\nℹ️  No change in latest class date.")
-                else:
-                    print(f"\nℹ️  First time tracking - no previous date to compare.")
-        else:
-            print("No active class dates found.")
-            
-    except requests.exceptions.RequestException as e:
+        ctx = PollContext(
+            store=store,
+            session=session,
+            cache=None if args.no_cache else HttpCache(args.cache_dir),
+            model=ReleaseModel(),
+            slots=SlotFetcher(api_headers, API_BASE, ttl=args.slot_ttl,
+                              max_workers=args.max_workers) if args.slots else None,
+            notifier=notifier,
+            metrics=metrics,
+            metrics_file=args.metrics,
+            profile=args.profile,
+            log=event_log,
+            limiter=limiter,
+            source=args.source,
+            slot_days=args.slot_days,
+            max_workers=args.max_workers,
+        )
+        
+        if args.serve_port is not None:
+            ctx.availability = start_availability_server(
+                ctx, watchlist or [(DEFAULT_VENUE, DEFAULT_CATEGORY)],
+                args.serve_port, args.serve_host)
+        
+        if args.snipe:
+            venue, category = watchlist[0] if watchlist else (DEFAULT_VENUE, DEFAULT_CATEGORY)
+            run_snipe(ctx, args.snipe, venue, category, shots=args.snipe_shots,
+                      hedge=args.snipe_hedge / 1000, deadline=args.snipe_deadline)
+            return
+        
+        if args.daemon or args.adaptive:
+            watchlist = watchlist or [(DEFAULT_VENUE, DEFAULT_CATEGORY)]
+            scheduler = None
+            if args.adaptive:
+                scheduler = AdaptiveScheduler(ctx.model, watchlist, fast_interval=args.fast_interval,
+                                              max_interval=args.interval)
+            run_daemon(watchlist, ctx, args.interval, scheduler, args.cycles)
+            return
+        
+        with profiled(ctx):
+            if watchlist:
+                run_watchlist(watchlist, ctx)
+            else:
+                run_single(ctx)
+
+
+def start_availability_server(ctx: PollContext, pairs: list[tuple[str, str]], port: int,
+                              host: str = "127.0.0.1") -> Availability:
+    """Serve the local availability API, starting from the dates in the store."""
+    from local_api import Availability, serve_availability
+    
+    availability = Availability()
+    for venue, category in pairs:
+        if ctx.store.has_listing(venue, category):
+            current = ctx.store.current_dates(venue, category)
+            availability.update(venue, category,
+                                [DateRecord.of(raw, pretty) for raw, pretty in current.items()],
+                                publish=False)
+    serve_availability(availability, port, host)
+    print(f"Serving availability at http://{host}:{port}/availability (events at /events)")
+    return availability
+
+
+def run_snipe(ctx: PollContext, at: str, venue: str = DEFAULT_VENUE,
+              activity_category: str = DEFAULT_CATEGORY, shots: int = 3,
+              hedge: float = 0.05, deadline: float = 2.0) -> None:
+    """
+    Sync with the server's clock, fire a hedged burst at `at` (see
+    snipe.parse_target) and report the first response with a new date.
+    """
+    from snipe import Sniper, describe_shots, parse_target
+    
+    sniper = Sniper(ctx.session, dates_url(venue, activity_category),
+                    api_headers(venue, activity_category), shots=shots, hedge=hedge,
+                    deadline=deadline)
+    print(f"Syncing with the server clock...")
+    clock = sniper.sync()
+    print(f"Clock: {clock.describe()}")
+    
+    target = parse_target(at, time.time() + clock.offset)
+    print(f"🎯 T-0 at {datetime.fromtimestamp(target).isoformat(timespec='milliseconds')} "
+          f"server time (in {target - time.time() - clock.offset:.1f}s), {shots} shots "
+          f"{hedge * 1000:.0f} ms apart")
+    shots_fired = sniper.run(target)
+    
+    print(f"\n--- Snipe ---")
+    for line in describe_shots(shots_fired):
+        print(line)
+    
+    if sniper.winner is None:
+        print(f"No new date seen (latest is still {sniper.baseline}).")
+        log_event(ctx, "INFO", "snipe", venue=venue, category=activity_category,
+                  found=False, offset=round(clock.offset, 4))
+    else:
+        shot, dates = sniper.winner
+        seen_ms = (shot.sent + shot.latency) * 1000
+        print(f"First new date seen at T{seen_ms:+.1f} ms (shot {shot.index + 1})")
+        log_event(ctx, "INFO", "snipe", venue=venue, category=activity_category,
+                  found=True, latest=shot.latest, seen_ms=round(seen_ms, 1),
+                  offset=round(clock.offset, 4))
+        with ctx.store.cycle():
+            if report_dates(dates, ctx, venue, activity_category):
+                ctx.model.record_change(venue, activity_category)
+    finish_cycle(ctx)
+
+
+def run_single(ctx: PollContext) -> None:
+    """One poll of the default venue and category."""
+    store = ctx.store
+    try:
+        # Fetch available dates from the API (or the booking page)
+        with ctx.metrics.phase("fetch"):
+            dates = fetch_dates(session=ctx.session, cache=ctx.cache, metrics=ctx.metrics,
+                                source=ctx.source)
+    except (OSError, SchemaDrift) as e:
+        with store.cycle():
+            store.record_error(DEFAULT_VENUE, DEFAULT_CATEGORY, str(e))
         print(f"Error fetching dates: {e}")
+        log_event(ctx, "WARNING", "fetch_error", venue=DEFAULT_VENUE,
+                  category=DEFAULT_CATEGORY, error=str(e))
+        if isinstance(e, CoolingDown):
+            # Nothing failed: we chose not to send the request
+            return
         raise
+    
+    with store.cycle():
+        if report_dates(dates, ctx):
+            ctx.model.record_change(DEFAULT_VENUE, DEFAULT_CATEGORY)
+    if ctx.slots is not None:
+        refresh_slots(ctx, [(DEFAULT_VENUE, DEFAULT_CATEGORY)])
+    finish_cycle(ctx)
 
 
 if __name__ == "__main__":
@@ -2,6 +2,7 @@
 # requires-python = ">=3.12"
 # dependencies = [
 #     "requests",
+#     "brotli",
 # ]
 # ///
 
@@ -10,10 +11,23 @@ Updated scrape script with proper headers to avoid 403 errors.
 
 This version uses a scraper-friendly User-Agent that identifies the bot
 and references the repository URL, following web scraping best practices.
+
+The page is streamed into the snapshot archive (see snapshots.py) rather
+than read into memory, and fit.html is only rewritten when the page has
+actually changed since the last run.
 """
 
+import shutil
+from pathlib import Path
+
 import requests
 
+from ratelimit import CoolingDown, RateLimitedSession
+from snapshots import SnapshotArchive, download_snapshot
+
+
+OUTPUT_PATH = Path("fit.html")
+
 
 def main() -> None:
     """Download the fitness classes page with proper headers."""
@@ -29,23 +43,35 @@ def main() -> None:
         # Accept headers tell the server what content types we can handle
         "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
         "Accept-Language": "en-US,en;q=0.9",
-        "Accept-Encoding": "gzip, deflate, br",
+        # Accept-Encoding is added by download_snapshot(), listing only the
+        # codings it can decode (br needs the optional brotli package)
     }
     
     print(f"Downloading content from {url}...")
     print("Using scraper-friendly User-Agent that identifies this bot...")
     
     try:
-        response = requests.get(url, headers=headers, timeout=30)
-        response.raise_for_status()
-        
-        with open("fit.html", "w", encoding="utf-8") as f:
-            f.write(response.text)
-        
-        print(f"✓ Success! Content saved to fit.html")
-        print(f"  Status Code: {response.status_code}")
-        print(f"  Content Length: {len(response.text)} bytes")
+        with RateLimitedSession(requests.Session()) as session, SnapshotArchive() as archive:
+            previous = archive.latest(url)
+            digest, is_new, status = download_snapshot(session, archive, url, headers)
+            size = archive.size(digest)
+            
+            if digest == previous and OUTPUT_PATH.exists():
+                print(f"✓ Success! Page unchanged since the last run; {OUTPUT_PATH} left as is")
+            else:
+                with archive.open(digest) as body, OUTPUT_PATH.open("wb") as f:
+                    shutil.copyfileobj(body, f)
+                print(f"✓ Success! Content saved to {OUTPUT_PATH}")
         
+        print(f"  Status Code: {status}")
+        print(f"  Content Length: {size} bytes")
+        print(f"  Snapshot: {digest[:12]} ({'new' if is_new else 'already archived'})")
+    
+    except CoolingDown as e:
+        # Not an error: a recent 403/429 put the host in a cool-down, and
+        # no request was sent
+        print(f"✗ Not downloading: {e}")
+        print("  Run again once the cool-down has passed.")
     except requests.exceptions.HTTPError as e:
         print(f"✗ HTTP Error: {e}")
         if e.response.status_code == 403:
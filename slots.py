@@ -0,0 +1,128 @@
+"""
+Per-date slot (session) fetcher with an LRU + TTL cache.
+
+The /dates endpoint only says that a day has classes. The /times endpoint
+lists the sessions on one day and how many spaces each has. Polling /times
+for every date on every cycle would multiply our request count by the
+length of the booking window, so the SlotFetcher only fetches dates that
+are new or whose cached entry has expired, runs those fetches
+concurrently and keeps the results (as SlotRecords) in a bounded LRU cache.
+"""
+
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Hashable
+
+from history_store import HistoryStore
+from records import SlotRecord, decode_slots
+
+
+TIMES_PATH = "/api/activities/venue/{venue}/activity-category/{category}/times?date={date}"
+
+
+class TTLCache:
+    """Least-recently-used cache whose entries also expire after ttl seconds."""
+    
+    def __init__(self, maxsize: int = 512, ttl: float = 900):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+    
+    def get(self, key: Hashable, now: float | None = None) -> Any | None:
+        """Return the cached value, or None if missing or expired."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        stored_at, value = entry
+        if (now or time.time()) - stored_at > self.ttl:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+    
+    def put(self, key: Hashable, value: Any, stored_at: float | None = None) -> None:
+        self._entries[key] = (stored_at or time.time(), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+    
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get(key) is not None
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SlotFetcher:
+    """Fetch the sessions for many (venue, category, date) keys, cache-first."""
+    
+    def __init__(self, headers_for: Callable[[str, str], dict],
+                 api_base: str = "https://better-admin.org.uk", ttl: float = 900,
+                 maxsize: int = 512, max_workers: int = 8):
+        self.headers_for = headers_for
+        self.api_base = api_base
+        self.cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.max_workers = max_workers
+    
+    def _fetch(self, session, venue: str, category: str, date: str) -> list[SlotRecord]:
+        url = self.api_base + TIMES_PATH.format(venue=venue, category=category, date=date)
+        response = session.get(url, headers=self.headers_for(venue, category), timeout=30)
+        response.raise_for_status()
+        return decode_slots(response.content)
+    
+    def warm_from_store(self, store: HistoryStore, keys: list[tuple[str, str, str]]) -> None:
+        """Seed missing keys from the latest snapshots in the history store,
+        so one-shot runs don't refetch slots that are still fresh."""
+        for key in keys:
+            if key in self.cache:
+                continue
+            snapshot = store.latest_slots(*key)
+            if snapshot is not None:
+                captured_at, slots = snapshot
+                self.cache.put(key, [SlotRecord.from_api(slot) for slot in slots],
+                               stored_at=captured_at)
+    
+    def refresh(self, session, keys: list[tuple[str, str, str]]) -> tuple[dict, dict, dict]:
+        """
+        Make sure every (venue, category, date) key has fresh slots.
+        
+        Args:
+            session: requests module or Session used for the fetches
+            keys: (venue, category, raw date) keys to refresh
+        
+        Returns:
+            tuple: (slots, fetched, errors) - slots for every key that has a
+            value, the subset fetched during this call, and per-key errors
+        """
+        now = time.time()
+        slots = {}
+        due = []
+        for key in keys:
+            cached = self.cache.get(key, now)
+            if cached is None:
+                due.append(key)
+            else:
+                slots[key] = cached
+        
+        fetched = {}
+        errors = {}
+        if due:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+                futures = {pool.submit(self._fetch, session, *key): key for key in due}
+                for future, key in futures.items():
+                    try:
+                        fetched[key] = future.result()
+                    except Exception as e:
+                        errors[key] = e
+        
+        for key, value in fetched.items():
+            self.cache.put(key, value, now)
+            slots[key] = value
+        return slots, fetched, errors
+
+
+def describe_slot(slot: SlotRecord) -> str:
+    """Short human-readable summary of one session."""
+    spaces_text = "" if slot.spaces is None else f" ({slot.spaces} spaces)"
+    return f"{slot.starts_at or '??:??'} {slot.name}{spaces_text}"
@@ -0,0 +1,290 @@
+# /// script
+# requires-python = ">=3.12"
+# dependencies = []
+# ///
+
+"""
+Content-addressed, compressed archive of downloaded pages.
+
+Each distinct page body is stored once, gzip-compressed, under its
+SHA-256 (snapshots/objects/ab/abcdef....gz). A SQLite index maps
+(url, fetched_at) to the hash, so "what did this URL look like at time
+T" and "what is the latest snapshot" are single index lookups. Fetching
+a page that hasn't changed only adds an index row: no object is
+written.
+
+Bodies are streamed: download_snapshot() reads the response in chunks,
+decodes the Content-Encoding (gzip, deflate, and br when the optional
+brotli package is installed) and hashes and compresses each chunk as it
+arrives, so a page is never held in memory whole.
+
+Also usable from the command line:
+
+    python3 snapshots.py history https://bookings.better.org.uk/location/...
+    python3 snapshots.py cat <hash> > page.html
+"""
+
+import argparse
+import gzip
+import hashlib
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+import zlib
+from pathlib import Path
+from typing import BinaryIO, Iterable
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+DEFAULT_ARCHIVE_DIR = Path("snapshots")
+
+CHUNK_SIZE = 64 * 1024
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    url TEXT NOT NULL,
+    fetched_at REAL NOT NULL,
+    sha256 TEXT NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS snapshots_by_url_time ON snapshots (url, fetched_at);
+"""
+
+
+def accept_encoding() -> str:
+    """The Accept-Encoding value for codings we can actually decode."""
+    return "gzip, deflate, br" if brotli is not None else "gzip, deflate"
+
+
+class _Identity:
+    def process(self, data: bytes) -> bytes:
+        return data
+    
+    def flush(self) -> bytes:
+        return b""
+
+
+class _Zlib:
+    def __init__(self, wbits: int):
+        self._decoder = zlib.decompressobj(wbits)
+    
+    def process(self, data: bytes) -> bytes:
+        return self._decoder.decompress(data)
+    
+    def flush(self) -> bytes:
+        return self._decoder.flush()
+
+
+class _Deflate:
+    """
+    "deflate" as servers actually send it: zlib-wrapped as the RFC says, or
+    raw deflate as some send instead. The zlib header is tried first; if
+    it's rejected before any output, the input so far is replayed raw.
+    """
+    
+    def __init__(self):
+        self._decoder = zlib.decompressobj(zlib.MAX_WBITS)
+        self._pending: bytes | None = b""  # input seen until the first output
+    
+    def process(self, data: bytes) -> bytes:
+        if self._pending is None:
+            return self._decoder.decompress(data)
+        self._pending += data
+        try:
+            out = self._decoder.decompress(data)
+        except zlib.error:
+            self._decoder = zlib.decompressobj(-zlib.MAX_WBITS)
+            out = self._decoder.decompress(self._pending)
+            self._pending = None
+            return out
+        if out:
+            self._pending = None  # the header was right
+        return out
+    
+    def flush(self) -> bytes:
+        return self._decoder.flush()
+
+
+class _Brotli:
+    def __init__(self):
+        self._decoder = brotli.Decompressor()
+    
+    def process(self, data: bytes) -> bytes:
+        return self._decoder.process(data)
+    
+    def flush(self) -> bytes:
+        return b""
+
+
+def make_decoder(content_encoding: str | None):
+    """Incremental decoder for a Content-Encoding header value."""
+    coding = (content_encoding or "identity").strip().lower()
+    if coding in ("identity", ""):
+        return _Identity()
+    if coding in ("gzip", "x-gzip"):
+        return _Zlib(16 + zlib.MAX_WBITS)
+    if coding == "deflate":
+        return _Deflate()
+    if coding == "br":
+        if brotli is None:
+            raise ValueError("Response is brotli-encoded but the brotli package is not installed")
+        return _Brotli()
+    raise ValueError(f"Unsupported Content-Encoding: {content_encoding}")
+
+
+def decode_stream(chunks: Iterable[bytes], content_encoding: str | None) -> Iterable[bytes]:
+    """Decode a stream of raw body chunks. Chained codings are undone in reverse order."""
+    codings = [c for c in (content_encoding or "").split(",") if c.strip()] or [None]
+    for coding in reversed(codings):
+        chunks = _decode(chunks, make_decoder(coding))
+    return chunks
+
+
+def _decode(chunks: Iterable[bytes], decoder) -> Iterable[bytes]:
+    for chunk in chunks:
+        data = decoder.process(chunk)
+        if data:
+            yield data
+    tail = decoder.flush()
+    if tail:
+        yield tail
+
+
+class SnapshotArchive:
+    """Compressed objects by SHA-256, plus a (url, fetched_at) index."""
+    
+    def __init__(self, directory: Path = DEFAULT_ARCHIVE_DIR):
+        self.directory = directory
+        self.objects = directory / "objects"
+        self.objects.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(directory / "index.sqlite3")
+        self.conn.executescript(SCHEMA)
+    
+    def object_path(self, digest: str) -> Path:
+        return self.objects / digest[:2] / f"{digest}.gz"
+    
+    def store(self, url: str, chunks: Iterable[bytes],
+              fetched_at: float | None = None) -> tuple[str, bool]:
+        """
+        Add a snapshot from a stream of decoded body chunks.
+        
+        The chunks are hashed and compressed into a spooled temporary file
+        (in memory unless the page is large), which is only moved into the
+        archive if no object with that hash exists yet.
+        
+        Returns:
+            tuple: (sha256, is_new) - is_new is False when the same content
+            was already archived
+        """
+        hasher = hashlib.sha256()
+        size = 0
+        with tempfile.SpooledTemporaryFile(max_size=1024 * 1024) as spool:
+            with gzip.GzipFile(fileobj=spool, mode="wb", mtime=0) as compressed:
+                for chunk in chunks:
+                    hasher.update(chunk)
+                    compressed.write(chunk)
+                    size += len(chunk)
+            digest = hasher.hexdigest()
+            
+            path = self.object_path(digest)
+            is_new = not path.exists()
+            if is_new:
+                path.parent.mkdir(exist_ok=True)
+                spool.seek(0)
+                tmp = path.with_suffix(".tmp")
+                with tmp.open("wb") as f:
+                    shutil.copyfileobj(spool, f)
+                tmp.replace(path)
+        
+        with self.conn:
+            self.conn.execute("INSERT INTO snapshots VALUES (?, ?, ?, ?)",
+                              (url, fetched_at or time.time(), digest, size))
+        return digest, is_new
+    
+    def latest(self, url: str, at: float | None = None) -> str | None:
+        """Hash of the newest snapshot of url (at or before time at)."""
+        row = self.conn.execute(
+            "SELECT sha256 FROM snapshots WHERE url = ? AND fetched_at <= ? "
+            "ORDER BY fetched_at DESC LIMIT 1",
+            (url, at if at is not None else float("inf")),
+        ).fetchone()
+        return row[0] if row else None
+    
+    def history(self, url: str) -> list[tuple[float, str, int]]:
+        """(fetched_at, sha256, size) for every snapshot of url, oldest first."""
+        return self.conn.execute(
+            "SELECT fetched_at, sha256, size FROM snapshots WHERE url = ? ORDER BY fetched_at",
+            (url,),
+        ).fetchall()
+    
+    def size(self, digest: str) -> int | None:
+        """Uncompressed size of an archived body."""
+        row = self.conn.execute("SELECT size FROM snapshots WHERE sha256 = ? LIMIT 1",
+                                (digest,)).fetchone()
+        return row[0] if row else None
+    
+    def open(self, digest: str) -> BinaryIO:
+        """Open an archived body for streaming reads (decompressed)."""
+        return gzip.open(self.object_path(digest), "rb")
+    
+    def close(self) -> None:
+        self.conn.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
+
+
+def download_snapshot(session, archive: SnapshotArchive, url: str, headers: dict,
+                      timeout: float = 30) -> tuple[str, bool, int]:
+    """
+    Stream url into the archive.
+    
+    session must be a requests.Session (or a wrapper passing stream=True
+    through, such as ratelimit.RateLimitedSession).
+    
+    Returns:
+        tuple: (sha256, is_new, status_code)
+    """
+    headers = {**headers, "Accept-Encoding": accept_encoding()}
+    response = session.get(url, headers=headers, timeout=timeout, stream=True)
+    with response:
+        response.raise_for_status()
+        raw = response.raw.stream(CHUNK_SIZE, decode_content=False)
+        chunks = decode_stream(raw, response.headers.get("Content-Encoding"))
+        digest, is_new = archive.store(url, chunks)
+    return digest, is_new, response.status_code
+
+
+def main() -> None:
+    """Inspect the snapshot archive from the command line."""
+    parser = argparse.ArgumentParser(description="Inspect archived page snapshots.")
+    parser.add_argument("--dir", type=Path, default=DEFAULT_ARCHIVE_DIR,
+                        help=f"Archive directory (default: {DEFAULT_ARCHIVE_DIR})")
+    commands = parser.add_subparsers(dest="command", required=True)
+    history = commands.add_parser("history", help="Snapshots of a URL")
+    history.add_argument("url")
+    cat = commands.add_parser("cat", help="Write an archived body to stdout")
+    cat.add_argument("hash")
+    args = parser.parse_args()
+    
+    with SnapshotArchive(args.dir) as archive:
+        if args.command == "history":
+            for fetched_at, digest, size in archive.history(args.url):
+                stamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(fetched_at))
+                print(f"{stamp}  {digest}  {size} bytes")
+        else:
+            with archive.open(args.hash) as body:
+                shutil.copyfileobj(body, sys.stdout.buffer)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,295 @@
+"""
+Time-critical "snipe" mode: see a release within milliseconds of a known instant.
+
+Polling only notices a new date some time after it appears. When
+bookings are known to open at a given instant, the Sniper:
+
+1. estimates the offset of the server's clock from ours using the 1-second
+   HTTP Date header. Each sample bounds the offset by the request's
+   round trip (NTP-style), and later samples are timed to land on a
+   server second boundary, halving the interval each time;
+2. shortly before the target, warms one pooled keep-alive connection per
+   worker thread (DNS, TCP and TLS are paid for up front), which also
+   fetches the dates as they are before the release;
+3. fires a small burst at T-0 on the server's clock: shot i goes out at
+   T + i * hedge, unless an earlier shot has already seen a new latest
+   date (hedging). Each shot has a strict deadline.
+
+Send times are held with a coarse sleep followed by a short spin on the
+monotonic clock, and the report compares every shot's actual send time
+with its schedule, next to its response latency.
+"""
+
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from email.utils import parsedate_to_datetime
+
+from records import DateRecord, SchemaDrift, decode_dates
+
+
+def precise_sleep_until(deadline: float, spin: float = 0.002) -> None:
+    """Sleep until a time.perf_counter() deadline, spinning for the last
+    few milliseconds since sleep() can overshoot by a scheduler tick."""
+    remaining = deadline - time.perf_counter()
+    if remaining > spin:
+        time.sleep(remaining - spin)
+    while time.perf_counter() < deadline:
+        pass
+
+
+def server_date(response) -> float | None:
+    """The response's Date header as a timestamp, or None."""
+    value = response.headers.get("Date")
+    if not value:
+        return None
+    try:
+        return parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+
+class ClockSync:
+    """
+    Bounds on offset = server clock - local clock, from Date headers.
+    
+    The server stamped Date (whole seconds, rounded down) at some local
+    time between sending and receiving, so each sample gives
+    Date - received <= offset < Date + 1 - sent. The bounds from all
+    samples are intersected.
+    """
+    
+    def __init__(self):
+        self.low = -math.inf
+        self.high = math.inf
+        self.rtts: list[float] = []
+    
+    def add(self, sent: float, received: float, stamp: float) -> None:
+        low, high = stamp - received, stamp + 1 - sent
+        if low > self.high or high < self.low:
+            # Inconsistent with earlier samples (our clock was stepped):
+            # start again from this one
+            self.low, self.high = low, high
+        else:
+            self.low, self.high = max(self.low, low), min(self.high, high)
+        self.rtts.append(received - sent)
+    
+    @property
+    def synced(self) -> bool:
+        return bool(self.rtts)
+    
+    @property
+    def offset(self) -> float:
+        return (self.low + self.high) / 2 if self.synced else 0.0
+    
+    @property
+    def error(self) -> float:
+        return (self.high - self.low) / 2 if self.synced else math.inf
+    
+    @property
+    def rtt(self) -> float:
+        return min(self.rtts) if self.rtts else 0.0
+    
+    def next_send(self, now: float) -> float:
+        """
+        Local time to send the next sample: when the request would reach the
+        server on a server second boundary if the offset were the midpoint
+        of the current bounds. Whichever side of the boundary the Date falls
+        on, about half of the interval is ruled out.
+        """
+        if not self.synced:
+            return now
+        boundary = math.ceil(now + self.offset + self.rtt / 2 + 0.01)
+        return boundary - self.offset - self.rtt / 2
+    
+    def describe(self) -> str:
+        if not self.synced:
+            return "not synced (no Date header); using the local clock"
+        return (f"server is {self.offset:+.3f}s from local (±{self.error * 1000:.0f} ms, "
+                f"{len(self.rtts)} samples, RTT {self.rtt * 1000:.0f} ms)")
+
+
+def sync_clock(session, url: str, headers: dict, samples: int = 8,
+               timeout: float = 5) -> ClockSync:
+    """Sample the server's Date header until samples are taken or the
+    bounds stop narrowing below one round trip."""
+    clock = ClockSync()
+    for _ in range(samples):
+        send_at = clock.next_send(time.time())
+        precise_sleep_until(time.perf_counter() + max(0.0, send_at - time.time()))
+        sent = time.time()
+        response = session.get(url, headers=headers, timeout=timeout)
+        received = time.time()
+        stamp = server_date(response)
+        if stamp is None:
+            break
+        clock.add(sent, received, stamp)
+        if clock.error <= clock.rtt:
+            break
+    return clock
+
+
+def parse_target(text: str, now: float) -> float:
+    """
+    Target time on the server's clock as a timestamp.
+    
+    "+SECONDS" is relative to now; "HH:MM[:SS[.fff]]" is the next
+    occurrence of that local time of day.
+    """
+    if text.startswith("+"):
+        return now + float(text[1:])
+    clock = datetime.strptime(text, "%H:%M:%S.%f" if "." in text
+                              else "%H:%M:%S" if text.count(":") == 2 else "%H:%M").time()
+    current = datetime.fromtimestamp(now)
+    target = datetime.combine(current.date(), clock)
+    if target.timestamp() <= now:
+        target += timedelta(days=1)
+    return target.timestamp()
+
+
+@dataclass
+class Shot:
+    """One request of the burst; times are seconds relative to T-0."""
+    index: int
+    scheduled: float
+    sent: float | None = None
+    latency: float | None = None
+    status: int | None = None
+    latest: str | None = None
+    error: str | None = None
+    
+    @property
+    def send_error(self) -> float | None:
+        return None if self.sent is None else self.sent - self.scheduled
+
+
+def latest_date(response) -> str | None:
+    dates = decode_dates(response.content)
+    return dates[-1].raw if dates else None
+
+
+class Sniper:
+    """Clock sync, connection warm-up and a hedged, deadline-bound burst."""
+    
+    def __init__(self, session, url: str, headers: dict, shots: int = 3,
+                 hedge: float = 0.05, deadline: float = 2.0, warm_lead: float = 3.0,
+                 clock_samples: int = 8):
+        self.session = session
+        self.url = url
+        self.headers = headers
+        self.shots = shots
+        self.hedge = hedge
+        self.deadline = deadline
+        self.warm_lead = warm_lead
+        self.clock_samples = clock_samples
+        self.clock = ClockSync()
+        self.baseline: str | None = None
+        self.winner: tuple[Shot, list[DateRecord]] | None = None
+        self._found = threading.Event()
+        self._lock = threading.Lock()
+    
+    def sync(self) -> ClockSync:
+        self.clock = sync_clock(self.session, self.url, self.headers, self.clock_samples)
+        return self.clock
+    
+    def _warm_one(self, barrier: threading.Barrier) -> str | None:
+        # The barrier holds every worker until all have started, so each
+        # thread (and with fast_http, each thread's connection) is warmed
+        try:
+            barrier.wait(timeout=self.deadline)
+        except threading.BrokenBarrierError:
+            pass
+        response = self.session.get(self.url, headers=self.headers, timeout=self.deadline)
+        response.raise_for_status()
+        return latest_date(response)
+    
+    def warm(self, pool: ThreadPoolExecutor) -> int:
+        """Open one connection per worker; returns how many succeeded."""
+        barrier = threading.Barrier(self.shots)
+        futures = [pool.submit(self._warm_one, barrier) for _ in range(self.shots)]
+        warmed = 0
+        for future in futures:
+            try:
+                latest = future.result()
+            except (OSError, SchemaDrift):
+                continue
+            warmed += 1
+            if latest is not None and (self.baseline is None or latest > self.baseline):
+                self.baseline = latest
+        return warmed
+    
+    def _fire(self, shot: Shot, zero: float) -> Shot:
+        precise_sleep_until(zero + shot.scheduled)
+        if self._found.is_set():
+            return shot  # hedge not needed
+        shot.sent = time.perf_counter() - zero
+        try:
+            response = self.session.get(self.url, headers=self.headers, timeout=self.deadline)
+            shot.latency = time.perf_counter() - zero - shot.sent
+            shot.status = response.status_code
+            response.raise_for_status()
+            dates = decode_dates(response.content)
+        except (OSError, SchemaDrift) as e:
+            shot.latency = shot.latency or time.perf_counter() - zero - shot.sent
+            shot.error = str(e)
+            return shot
+        
+        shot.latest = dates[-1].raw if dates else None
+        if shot.latest is not None and (self.baseline is None or shot.latest > self.baseline):
+            arrived = shot.sent + shot.latency
+            with self._lock:
+                if self.winner is None or arrived < self.winner[0].sent + self.winner[0].latency:
+                    self.winner = (shot, dates)
+            self._found.set()
+        return shot
+    
+    def run(self, target: float, log=print) -> list[Shot]:
+        """
+        Fire at target (a timestamp on the server's clock). Call sync() first.
+        
+        Returns:
+            list: One Shot per scheduled request; shots never sent because
+            an earlier one already saw the release have sent=None
+        """
+        local_target = target - self.clock.offset
+        with ThreadPoolExecutor(max_workers=self.shots) as pool:
+            warm_at = local_target - self.warm_lead
+            if warm_at > time.time():
+                time.sleep(warm_at - time.time())
+            warmed = self.warm(pool)
+            log(f"Warmed {warmed}/{self.shots} connections "
+                f"{local_target - time.time():.1f}s before T-0 "
+                f"(latest before release: {self.baseline or 'none'})")
+            
+            # Map the local wall-clock target onto the monotonic clock once
+            zero = time.perf_counter() + (local_target - time.time())
+            shots = [Shot(i, i * self.hedge) for i in range(self.shots)]
+            futures = [pool.submit(self._fire, shot, zero) for shot in shots]
+            wait(futures, timeout=max(0.0, zero - time.perf_counter())
+                 + shots[-1].scheduled + self.deadline + 1)
+        return shots
+
+
+def describe_shots(shots: list[Shot]) -> list[str]:
+    """Report lines: one per shot, then send accuracy and first sighting."""
+    lines = [f"{'shot':>4} {'at ms':>7} {'sent ms':>8} {'error ms':>8} {'latency':>8} "
+             f"{'status':>6}  result"]
+    for shot in shots:
+        if shot.sent is None:
+            lines.append(f"{shot.index + 1:>4} {shot.scheduled * 1000:>+7.0f} "
+                         f"{'-':>8} {'-':>8} {'-':>8} {'-':>6}  not sent (release already seen)")
+            continue
+        result = shot.error or f"latest {shot.latest}"
+        latency = "-" if shot.latency is None else f"{shot.latency * 1000:.1f}"
+        lines.append(f"{shot.index + 1:>4} {shot.scheduled * 1000:>+7.0f} "
+                     f"{shot.sent * 1000:>+8.2f} {shot.send_error * 1000:>8.2f} "
+                     f"{latency:>8} {shot.status or '-':>6}  {result}")
+    
+    errors = sorted(abs(shot.send_error) for shot in shots if shot.sent is not None)
+    if errors:
+        lines.append(f"Send accuracy: median {errors[len(errors) // 2] * 1000:.2f} ms, "
+                     f"worst {errors[-1] * 1000:.2f} ms")
+    return lines
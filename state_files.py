@@ -0,0 +1,43 @@
+"""
+Small helpers for the JSON state files the scraper keeps between runs.
+
+Writes go to a temporary file in the same directory and are then renamed
+over the target, so a crash or a concurrent reader never sees a
+half-written file.
+"""
+
+import json
+import os
+import tempfile
+from pathlib import Path
+from typing import Any
+
+
+def read_json(path: Path, default: Any = None) -> Any:
+    """Read a JSON file, returning default if it is missing or corrupt."""
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except (FileNotFoundError, json.JSONDecodeError):
+        return default
+
+
+def write_bytes_atomic(path: Path, data: bytes) -> None:
+    """Write data to path via a temporary file and an atomic rename."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            # On disk before the rename, so a power cut leaves the old file
+            # or the new one, never an empty one
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_name, path)
+    except BaseException:
+        os.unlink(tmp_name)
+        raise
+
+
+def write_json_atomic(path: Path, data: Any) -> None:
+    """Serialise data as JSON and write it atomically."""
+    write_bytes_atomic(path, json.dumps(data, indent=2).encode("utf-8"))
@@ -0,0 +1,311 @@
+# /// script
+# requires-python = ">=3.12"
+# dependencies = []
+# ///
+
+"""
+Local stand-in for the Better API, for benchmarks and offline testing.
+
+Serves the same contract as better-admin.org.uk:
+
+    /api/activities/venue/{venue}/activity-category/{category}/dates
+    /api/activities/venue/{venue}/activity-category/{category}/times?date=YYYY-MM-DD
+
+and the booking page those dates are shown on,
+
+    /location/{venue}/{category}
+
+with the dates embedded as a __NEXT_DATA__ JSON blob and as data-date
+markup (see html_extract.py). Latency, payload size, 403/429 injection
+(or blocking the API outright) and "release
+events" (the booking horizon grows by one day every N seconds, like a new
+date being published). Responses carry ETags and honour If-None-Match,
+and their Date header can run ahead of or behind the local clock, for
+testing snipe mode's clock sync.
+POSTs to /webhook are collected in StubBetterAPI.webhooks, for testing the
+webhook notification sink.
+
+Run it standalone and point the scraper at it:
+
+    python3 stub_server.py --port 8001 --release-every 60
+    MCR_FIT_SNIPER_API_BASE=http://127.0.0.1:8001 python3 scrape.py
+"""
+
+import argparse
+import email.utils
+import hashlib
+import http.server
+import json
+import random
+import re
+import threading
+import time
+from dataclasses import dataclass
+from datetime import date, timedelta
+from urllib.parse import parse_qs, urlsplit
+
+
+API_PATH = re.compile(r"^/api/activities/venue/([^/]+)/activity-category/([^/]+)/(dates|times)$")
+PAGE_PATH = re.compile(r"^/location/([^/]+)/([^/]+)$")
+
+
+@dataclass
+class StubConfig:
+    """Behaviour of the stub server."""
+    latency: float = 0.0          # seconds added to every response
+    jitter: float = 0.0           # extra random latency, 0..jitter seconds
+    days: int = 14                # dates listed before any release events
+    pad_bytes: int = 0            # extra bytes per date record, to grow payloads
+    error_rate_403: float = 0.0   # share of requests answered 403
+    error_rate_429: float = 0.0   # share of requests answered 429 (with Retry-After)
+    release_every: float = 0.0    # seconds between new dates appearing, 0 = never
+    block_api: bool = False       # answer every API request 403; the page still works
+    clock_offset: float = 0.0     # seconds the Date header is ahead of the local clock
+    seed: int | None = None
+
+
+class _StubHTTPServer(http.server.ThreadingHTTPServer):
+    daemon_threads = True
+    # The default backlog of 5 drops SYNs when a 100-venue watchlist connects
+    # at once, and the client's 1 s SYN retransmit would swamp the numbers
+    request_queue_size = 256
+
+
+class StubBetterAPI:
+    """Threaded stub server; use start()/stop() or as a context manager."""
+    
+    def __init__(self, config: StubConfig | None = None, host: str = "127.0.0.1", port: int = 0):
+        self.config = config or StubConfig()
+        self.started_at = time.time()
+        self.request_count = 0
+        self.webhooks: list = []
+        self._random = random.Random(self.config.seed)
+        self._lock = threading.Lock()
+        self._payloads: dict[tuple, tuple[bytes, str]] = {}
+        self.server = _StubHTTPServer((host, port), self._handler_class())
+        self._thread = None
+    
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+    
+    def start(self) -> "StubBetterAPI":
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+    
+    def stop(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+    
+    def __enter__(self):
+        return self.start()
+    
+    def __exit__(self, *exc):
+        self.stop()
+    
+    def releases(self) -> int:
+        """Number of release events so far."""
+        if not self.config.release_every:
+            return 0
+        return int((time.time() - self.started_at) / self.config.release_every)
+    
+    def _dates_payload(self, today: date, releases: int) -> tuple[bytes, str]:
+        """Body and ETag for /dates; built once per (day, release) and reused."""
+        key = ("dates", today, releases)
+        with self._lock:
+            cached = self._payloads.get(key)
+        if cached:
+            return cached
+        
+        body = json.dumps({"data": self._date_records(today, releases)}).encode("utf-8")
+        payload = (body, '"' + hashlib.sha1(body).hexdigest() + '"')
+        
+        with self._lock:
+            self._payloads[key] = payload
+        return payload
+    
+    def _date_records(self, today: date, releases: int) -> list[dict]:
+        padding = "x" * self.config.pad_bytes
+        records = []
+        for offset in range(self.config.days + releases):
+            day = today + timedelta(days=offset)
+            record = {
+                "raw": day.isoformat(),
+                "full_date_pretty": f"{day:%A} {day.day} {day:%B}",
+                "today": offset == 0,
+            }
+            if padding:
+                record["padding"] = padding
+            records.append(record)
+        return records
+    
+    def _page_payload(self, today: date, releases: int) -> tuple[bytes, str]:
+        """Booking page HTML; built once per (day, release) like /dates."""
+        key = ("page", today, releases)
+        with self._lock:
+            cached = self._payloads.get(key)
+        if cached:
+            return cached
+        
+        records = self._date_records(today, releases)
+        state = {"props": {"pageProps": {
+            "dates": records,
+            "sessions": json.loads(self._times_payload(today.isoformat())[0])["data"],
+        }}}
+        items = "".join(
+            f'<li class="date" data-date="{r["raw"]}"><a href="#">{r["full_date_pretty"]}</a>'
+            f'<span hidden>{r.get("padding", "")}</span></li>\n'
+            for r in records
+        )
+        page = (
+            "<!DOCTYPE html>\n<html><head><title>Fitness Classes | Better</title>"
+            '<script src="/static/app.js" defer></script></head>\n'
+            f'<body><div id="__next"><ul class="dates">\n{items}</ul></div>\n'
+            '<script id="__NEXT_DATA__" type="application/json">'
+            + json.dumps(state).replace("</", "<\\/") +
+            "</script></body></html>\n"
+        )
+        body = page.encode("utf-8")
+        payload = (body, '"' + hashlib.sha1(body).hexdigest() + '"')
+        
+        with self._lock:
+            self._payloads[key] = payload
+        return payload
+    
+    def _times_payload(self, day: str) -> tuple[bytes, str]:
+        sessions = [
+            {"name": name, "starts_at": {"format_24_hour": start}, "spaces": spaces,
+             "date": day}
+            for name, start, spaces in (("Body Pump", "07:00", 5), ("Yoga", "12:30", 0),
+                                        ("Spin", "18:15", 12))
+        ]
+        body = json.dumps({"data": sessions}).encode("utf-8")
+        return body, '"' + hashlib.sha1(body).hexdigest() + '"'
+    
+    def _injected_error(self) -> int | None:
+        roll = self._random.random()
+        if roll < self.config.error_rate_403:
+            return 403
+        if roll < self.config.error_rate_403 + self.config.error_rate_429:
+            return 429
+        return None
+    
+    def _handler_class(self):
+        stub = self
+        
+        class Handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers and body go out in separate writes; without this,
+            # Nagle + delayed ACK adds ~40 ms to every keep-alive response
+            disable_nagle_algorithm = True
+            
+            def date_time_string(self, timestamp=None):
+                """The Date header, on the stub's (possibly skewed) clock."""
+                return email.utils.formatdate((timestamp or time.time()) + stub.config.clock_offset,
+                                              usegmt=True)
+            
+            def do_GET(self):
+                with stub._lock:
+                    stub.request_count += 1
+                
+                delay = stub.config.latency + stub._random.random() * stub.config.jitter
+                if delay:
+                    time.sleep(delay)
+                
+                parts = urlsplit(self.path)
+                if PAGE_PATH.match(parts.path):
+                    body, etag = stub._page_payload(date.today(), stub.releases())
+                    self._send(200, body, {"ETag": etag, "Content-Type": "text/html; charset=utf-8"})
+                    return
+                
+                match = API_PATH.match(parts.path)
+                if not match:
+                    self._send(404, b'{"message": "Not Found"}')
+                    return
+                
+                status = 403 if stub.config.block_api else stub._injected_error()
+                if status == 429:
+                    self._send(429, b'{"message": "Too Many Requests"}', {"Retry-After": "1"})
+                    return
+                if status == 403:
+                    self._send(403, b"<html><body>403 Forbidden</body></html>",
+                               {"Content-Type": "text/html"})
+                    return
+                
+                if match.group(3) == "dates":
+                    body, etag = stub._dates_payload(date.today(), stub.releases())
+                else:
+                    day = parse_qs(parts.query).get("date", [date.today().isoformat()])[0]
+                    body, etag = stub._times_payload(day)
+                
+                if self.headers.get("If-None-Match") == etag:
+                    self._send(304, b"", {"ETag": etag})
+                else:
+                    self._send(200, body, {"ETag": etag})
+            
+            def do_POST(self):
+                """Accept webhook notifications and keep them for inspection."""
+                length = int(self.headers.get("Content-Length", 0))
+                body = self.rfile.read(length)
+                if urlsplit(self.path).path != "/webhook":
+                    self._send(404, b'{"message": "Not Found"}')
+                    return
+                with stub._lock:
+                    stub.webhooks.append(json.loads(body or b"null"))
+                self._send(204, b"")
+            
+            def _send(self, status: int, body: bytes, headers: dict | None = None):
+                self.send_response(status)
+                headers = {"Content-Type": "application/json", **(headers or {})}
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            
+            def log_message(self, format, *args):
+                pass
+        
+        return Handler
+
+
+def main() -> None:
+    """Run the stub server in the foreground."""
+    parser = argparse.ArgumentParser(description="Local stand-in for the Better API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds per response")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Extra random latency (seconds)")
+    parser.add_argument("--days", type=int, default=14, help="Dates listed initially")
+    parser.add_argument("--pad-bytes", type=int, default=0, help="Extra bytes per date record")
+    parser.add_argument("--error-rate-403", type=float, default=0.0)
+    parser.add_argument("--error-rate-429", type=float, default=0.0)
+    parser.add_argument("--release-every", type=float, default=0.0,
+                        help="Seconds between new dates being released (0 = never)")
+    parser.add_argument("--block-api", action="store_true",
+                        help="Answer every API request 403 (the booking page still works)")
+    parser.add_argument("--clock-offset", type=float, default=0.0,
+                        help="Seconds the Date header runs ahead of the local clock")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+    
+    config = StubConfig(latency=args.latency, jitter=args.jitter, days=args.days,
+                        pad_bytes=args.pad_bytes, error_rate_403=args.error_rate_403,
+                        error_rate_429=args.error_rate_429,
+                        release_every=args.release_every, block_api=args.block_api,
+                        clock_offset=args.clock_offset, seed=args.seed)
+    stub = StubBetterAPI(config, args.host, args.port)
+    print(f"Stub Better API listening on {stub.url}")
+    print(f"  MCR_FIT_SNIPER_API_BASE={stub.url} python3 scrape.py")
+    try:
+        stub.server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nStub server stopped.")
+    finally:
+        stub.server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+# /// script
+# requires-python = ">=3.12"
+# dependencies = []
+# ///
+
+"""
+Subscriptions: many watchers sharing one scraper.
+
+Instead of everyone running their own scrape.py against the same /dates
+URLs, each watcher registers a subscription in subscriptions.json: the
+venue/category pairs they care about, optional filters (weekdays, how
+far ahead) and where their alerts go. scrape.py --subscriptions fetches
+each unique (venue, category) once per cycle, however many subscribers
+share it, and fans the alerts out in memory: every subscriber gets their
+own NotificationDispatcher, so sinks, coalescing and dedupe are per
+person. Upstream requests scale with the number of unique endpoints, not
+the number of users.
+
+Also usable from the command line:
+
+    python3 subscriptions.py add alice --watch hough-end-leisure-centre/fitness-classes-c \\
+        --weekdays Sat,Sun --notify webhook --webhook-url https://example.com/hook
+    python3 subscriptions.py list
+    python3 subscriptions.py remove alice
+"""
+
+import argparse
+import time
+from dataclasses import asdict, dataclass, field
+from datetime import date
+from pathlib import Path
+
+from notify import Alert, NotificationDispatcher, build_sinks
+from state_files import read_json, write_json_atomic
+
+
+DEFAULT_SUBSCRIPTIONS_PATH = Path("subscriptions.json")
+
+WEEKDAYS = ["mon", "tue", "wed", "thu", "fri", "sat", "sun"]
+
+
+@dataclass
+class Subscriber:
+    """One watcher: what they watch, which dates they care about, where alerts go."""
+    name: str
+    watch: list[str]                                   # "venue/category" pairs
+    weekdays: list[str] = field(default_factory=list)  # e.g. ["sat", "sun"]; empty = any day
+    within_days: int | None = None                     # only dates this many days ahead
+    notify: list[str] = field(default_factory=lambda: ["stdout"])
+    webhook_url: str | None = None
+    
+    def pairs(self) -> list[tuple[str, str]]:
+        from scrape import parse_pair
+        return [parse_pair(pair) for pair in self.watch]
+    
+    def wants_date(self, raw: str, today: date | None = None) -> bool:
+        """Does a date (YYYY-MM-DD) pass this subscriber's filters?"""
+        day = date.fromisoformat(raw)
+        if self.weekdays and WEEKDAYS[day.weekday()] not in self.weekdays:
+            return False
+        if self.within_days is not None:
+            return (day - (today or date.today())).days <= self.within_days
+        return True
+    
+    def wants(self, alert: Alert) -> bool:
+        """Alerts without dates always pass; otherwise one date must."""
+        return not alert.dates or any(self.wants_date(raw) for raw in alert.dates)
+
+
+class SubscriptionRegistry:
+    """Subscribers in a JSON file, indexed by the (venue, category) they watch."""
+    
+    def __init__(self, path: Path = DEFAULT_SUBSCRIPTIONS_PATH):
+        self.path = path
+        data = read_json(path, {})
+        self.subscribers: dict[str, Subscriber] = {
+            name: Subscriber(name=name, **fields)
+            for name, fields in data.get("subscribers", {}).items()
+        }
+        self._index()
+    
+    def _index(self) -> None:
+        self._by_pair: dict[tuple[str, str], list[Subscriber]] = {}
+        for subscriber in self.subscribers.values():
+            for pair in subscriber.pairs():
+                self._by_pair.setdefault(pair, []).append(subscriber)
+    
+    def pairs(self) -> list[tuple[str, str]]:
+        """Every unique (venue, category), each listed once however many watch it."""
+        return list(self._by_pair)
+    
+    def subscribers_for(self, venue: str, category: str) -> list[Subscriber]:
+        return self._by_pair.get((venue, category), [])
+    
+    def subscription_count(self) -> int:
+        return sum(len(subscribers) for subscribers in self._by_pair.values())
+    
+    def add(self, subscriber: Subscriber) -> None:
+        """Add or replace a subscriber and save."""
+        subscriber.pairs()  # validate before saving
+        self.subscribers[subscriber.name] = subscriber
+        self._index()
+        self.save()
+    
+    def remove(self, name: str) -> None:
+        del self.subscribers[name]
+        self._index()
+        self.save()
+    
+    def save(self) -> None:
+        write_json_atomic(self.path, {"subscribers": {
+            name: {key: value for key, value in asdict(subscriber).items() if key != "name"}
+            for name, subscriber in self.subscribers.items()
+        }})
+    
+    def describe(self) -> str:
+        return (f"{len(self.subscribers)} subscribers, {self.subscription_count()} subscriptions, "
+                f"{len(self._by_pair)} unique endpoints")
+
+
+class SubscriptionDispatcher:
+    """
+    Fan alerts out to subscribers. Used in place of the run's own
+    NotificationDispatcher, which still gets every alert.
+    """
+    
+    def __init__(self, registry: SubscriptionRegistry, base: NotificationDispatcher):
+        self.registry = registry
+        self.base = base
+        self.dispatchers = {
+            name: NotificationDispatcher(build_sinks(subscriber.notify, subscriber.webhook_url,
+                                                     label=name))
+            for name, subscriber in registry.subscribers.items()
+        }
+        self.sinks = base.sinks + [sink for dispatcher in self.dispatchers.values()
+                                   for sink in dispatcher.sinks]
+    
+    def submit(self, alert: Alert) -> bool:
+        """Queue the alert for the run's sinks and every interested subscriber."""
+        queued = self.base.submit(alert) if self.base.sinks else False
+        for subscriber in self.registry.subscribers_for(alert.venue, alert.category):
+            if subscriber.wants(alert):
+                queued = self.dispatchers[subscriber.name].submit(alert) or queued
+        return queued
+    
+    def close(self, timeout: float = 15) -> None:
+        """Close every dispatcher, within one overall timeout."""
+        deadline = time.monotonic() + timeout
+        for dispatcher in [self.base, *self.dispatchers.values()]:
+            dispatcher.close(max(0.0, deadline - time.monotonic()))
+
+
+def main() -> None:
+    """Manage subscriptions from the command line."""
+    parser = argparse.ArgumentParser(description="Manage shared scraper subscriptions.")
+    parser.add_argument("--file", type=Path, default=DEFAULT_SUBSCRIPTIONS_PATH,
+                        help=f"Subscriptions file (default: {DEFAULT_SUBSCRIPTIONS_PATH})")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("list", help="List subscribers")
+    add = commands.add_parser("add", help="Add or replace a subscriber")
+    add.add_argument("name")
+    add.add_argument("--watch", action="append", required=True, metavar="VENUE/CATEGORY",
+                     help="Venue and activity category (repeatable)")
+    add.add_argument("--weekdays", default="", help="Only these days, e.g. Sat,Sun")
+    add.add_argument("--within-days", type=int, help="Only dates this many days ahead")
+    add.add_argument("--notify", default="stdout",
+                     help="Comma-separated sinks: termux, stdout, webhook (default: stdout)")
+    add.add_argument("--webhook-url")
+    remove = commands.add_parser("remove", help="Remove a subscriber")
+    remove.add_argument("name")
+    args = parser.parse_args()
+    
+    registry = SubscriptionRegistry(args.file)
+    if args.command == "add":
+        weekdays = [day.strip().lower()[:3] for day in args.weekdays.split(",") if day.strip()]
+        unknown = [day for day in weekdays if day not in WEEKDAYS]
+        if unknown:
+            parser.error(f"Unknown weekdays: {', '.join(unknown)}")
+        registry.add(Subscriber(args.name, args.watch, weekdays, args.within_days,
+                                [sink.strip() for sink in args.notify.split(",") if sink.strip()],
+                                args.webhook_url))
+        print(f"Saved {args.name} ({registry.describe()})")
+    elif args.command == "remove":
+        registry.remove(args.name)
+        print(f"Removed {args.name} ({registry.describe()})")
+    else:
+        for subscriber in registry.subscribers.values():
+            filters = ",".join(subscriber.weekdays) or "any day"
+            if subscriber.within_days is not None:
+                filters += f", within {subscriber.within_days} days"
+            print(f"{subscriber.name:<12} {' '.join(subscriber.watch)}  [{filters}] "
+                  f"-> {','.join(subscriber.notify)}")
+        print(registry.describe())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""
+Pluggable transports under the fetch layer: live, record and replay.
+
+Everything the scraper fetches goes through a session-like object with a
+get(url, headers=..., timeout=...) method. This module adds two more of
+them next to the live ones (requests.Session and fast_http.StdlibSession):
+
+- RecordingTransport wraps a live session and appends every response
+  (status, headers, body and timing) to a gzip-compressed JSON-lines
+  fixture archive.
+- ReplayTransport serves an archive back in-process with no network at
+  all, so thousands of poll cycles can be pushed through parsing, diffing
+  and notification in seconds when profiling.
+"""
+
+import base64
+import gzip
+import http.client
+import json
+import threading
+import time
+from collections import defaultdict
+from http import HTTPStatus
+from pathlib import Path
+
+from fast_http import StdlibResponse, TransportError
+
+
+DEFAULT_FIXTURES = Path("fixtures.jsonl.gz")
+
+# Headers that describe the body on the wire; bodies are stored decoded, so
+# replaying them would send gzip headers with plain bytes
+WIRE_HEADERS = {"content-encoding", "content-length", "transfer-encoding"}
+
+
+def _encode_body(body: bytes) -> dict:
+    try:
+        return {"body": body.decode("utf-8")}
+    except UnicodeDecodeError:
+        return {"body_b64": base64.b64encode(body).decode("ascii")}
+
+
+def record_body(record: dict) -> bytes:
+    """The response body of a fixture record."""
+    if "body_b64" in record:
+        return base64.b64decode(record["body_b64"])
+    return record.get("body", "").encode("utf-8")
+
+
+def read_fixtures(path: Path = DEFAULT_FIXTURES) -> list[dict]:
+    """Every record in a fixture archive, in the order it was recorded."""
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def _stored_headers(headers) -> dict:
+    return {name: value for name, value in headers.items() if name.lower() not in WIRE_HEADERS}
+
+
+def _make_headers(pairs: dict) -> http.client.HTTPMessage:
+    headers = http.client.HTTPMessage()
+    # Archives recorded before wire headers were dropped still have them
+    for name, value in _stored_headers(pairs).items():
+        headers[name] = value
+    return headers
+
+
+class RecordingTransport:
+    """Pass requests through to a live session and record each response."""
+    
+    def __init__(self, session, path: Path = DEFAULT_FIXTURES):
+        self.session = session
+        self.path = path
+        self.recorded = 0
+        self._lock = threading.Lock()
+        # Appending adds a new gzip member; readers see one continuous stream
+        self._file = gzip.open(path, "at", encoding="utf-8")
+    
+    def get(self, url: str, headers: dict | None = None, timeout: float | None = None):
+        started = time.time()
+        response = self.session.get(url, headers=headers, timeout=timeout)
+        record = {
+            "url": url,
+            "at": started,
+            "elapsed": time.time() - started,
+            "status": response.status_code,
+            "headers": _stored_headers(response.headers),
+            **_encode_body(response.content),
+        }
+        line = json.dumps(record, separators=(",", ":")) + "\n"
+        with self._lock:
+            self._file.write(line)
+            self.recorded += 1
+        return response
+    
+    def close(self) -> None:
+        with self._lock:
+            self._file.close()
+        self.session.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
+
+
+class ReplayTransport:
+    """
+    Serve recorded responses for each URL in the order they were recorded.
+    
+    When the recordings for a URL run out they keep returning the last one,
+    as a server whose listing has stopped changing would, or with
+    loop=True start again from the first one (which then looks like a
+    change back to the oldest listing). If-None-Match is honoured against
+    the recorded ETag, like a real server.
+    """
+    
+    def __init__(self, records: list[dict], loop: bool = False):
+        self.loop = loop
+        self.served = 0
+        self._lock = threading.Lock()
+        self._responses: dict[str, list[tuple]] = defaultdict(list)
+        self._position: dict[str, int] = defaultdict(int)
+        for record in records:
+            # Decode once up front; serving is then just a list lookup
+            self._responses[record["url"]].append((
+                record["status"], _make_headers(record.get("headers", {})), record_body(record),
+            ))
+    
+    @classmethod
+    def load(cls, path: Path = DEFAULT_FIXTURES, loop: bool = False) -> "ReplayTransport":
+        return cls(read_fixtures(path), loop=loop)
+    
+    def get(self, url: str, headers: dict | None = None, timeout: float | None = None):
+        with self._lock:
+            responses = self._responses.get(url)
+            if not responses:
+                raise TransportError(f"No recorded response for url: {url}")
+            position = self._position[url]
+            if position >= len(responses):
+                position = 0 if self.loop else len(responses) - 1
+            self._position[url] = position + 1
+            self.served += 1
+        
+        status, response_headers, body = responses[position]
+        etag = response_headers.get("ETag")
+        if etag and headers and headers.get("If-None-Match") == etag:
+            status, body = 304, b""
+        
+        return StdlibResponse(url, status, HTTPStatus(status).phrase, response_headers, body)
+    
+    def close(self) -> None:
+        pass
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()